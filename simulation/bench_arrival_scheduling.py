@@ -0,0 +1,24 @@
+# bench_arrival_scheduling.py
+# 对同一个trace分别用 per_request 和 coalesced 到达调度各跑一次模拟，比较事件数、每请求事件数和墙钟时间。
+# 用法: python bench_arrival_scheduling.py [--epsilon-ms 0.0 0.1 ...]
+import argparse
+
+from config import ARRIVAL_COALESCE_EPSILON_MS
+from bench_util import quiet_run
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare SimPy event counts of arrival scheduling modes.")
+    arg_parser.add_argument("--epsilon-ms", type=float, nargs="+", default=[ARRIVAL_COALESCE_EPSILON_MS])
+    args = arg_parser.parse_args()
+
+    runs = [("per_request", None)] + [("coalesced", eps) for eps in args.epsilon_ms]
+    baseline = None
+    print(f"{'mode':<12} {'eps(ms)':>8} {'requests':>10} {'events':>12} {'ev/req':>8} {'wall(s)':>8} {'avg lat(ms)':>12}")
+    for mode, eps in runs:
+        r = quiet_run(arrival_scheduling=mode, coalesce_epsilon_ms=eps)
+        baseline = baseline or r
+        avg = f"{r['avg_latency_ms']:.4f}" if r['avg_latency_ms'] is not None else "-"
+        print(f"{mode:<12} {'-' if eps is None else eps:>8} {r['requests']:>10} {r['events']:>12} "
+              f"{r['events_per_request']:>8.2f} {r['wall_time_s']:>8.2f} {avg:>12}")
+    print(f"(per_request baseline: {baseline['events']} events, {baseline['wall_time_s']:.2f} s)")
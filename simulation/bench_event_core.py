@@ -0,0 +1,30 @@
+# bench_event_core.py
+# 同一个 trace 分别用 simpy.Environment 和 components/event_core.py 的轻量内核各跑一次，
+# 对比每秒处理的事件数，并检查两者的统计结果是否一致 (调度语义相同，应逐位相同)。
+# 用法: python bench_event_core.py [--repeat 1]
+import argparse
+
+from bench_util import quiet_run
+
+_COMPARED_KEYS = ('requests', 'completed', 'events', 'avg_latency_ms', 'p99_latency_ms',
+                  'migration_delay_ms_per_request', 'migration_makespan_max_ms')
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Events/s of the SimPy and heap event cores on the same trace.")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="每个内核运行的次数，取最快的一次")
+    args = arg_parser.parse_args()
+
+    print(f"{'core':>6} {'events':>10} {'wall(s)':>9} {'events/s':>12} {'speedup':>8} {'avg(ms)':>10} {'p99(ms)':>10}")
+    results = {}
+    for core in ("simpy", "heap"):
+        runs = [quiet_run(event_core=core) for _ in range(max(args.repeat, 1))]
+        results[core] = min(runs, key=lambda r: r['wall_time_s'])
+    base_wall = results['simpy']['wall_time_s']
+    for core, r in results.items():
+        rate = r['events'] / r['wall_time_s'] if r['wall_time_s'] > 0 else float('inf')
+        speedup = base_wall / r['wall_time_s'] if r['wall_time_s'] > 0 else float('inf')
+        print(f"{core:>6} {r['events']:>10} {r['wall_time_s']:>9.2f} {rate:>12,.0f} {speedup:>7.2f}x "
+              f"{r['avg_latency_ms']:>10.3f} {r['p99_latency_ms']:>10.3f}")
+    mismatched = [k for k in _COMPARED_KEYS if results['simpy'][k] != results['heap'][k]]
+    print("Results match." if not mismatched else f"Results differ in: {', '.join(mismatched)}")
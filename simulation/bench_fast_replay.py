@@ -0,0 +1,22 @@
+# bench_fast_replay.py
+# 同一个负载分别用 SimPy 引擎和解析式快速回放引擎各跑一次，对比延迟统计和模拟耗时。
+# 两者的延迟只在有迁移I/O时有差别 (解析式引擎不模拟迁移I/O)。
+# 用法: python bench_fast_replay.py [--device-selection round_robin]
+import argparse
+
+from bench_util import quiet_run, fmt
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="SimPy engine vs analytical fast-replay engine.")
+    arg_parser.add_argument("--device-selection", default=None)
+    args = arg_parser.parse_args()
+
+    print(f"{'engine':>10} {'requests':>10} {'avg(ms)':>10} {'p99(ms)':>10} {'wall(s)':>10} {'speedup':>8}")
+    base_wall = None
+    for engine in ("simpy", "analytical"):
+        r = quiet_run(engine=engine, write_buffer=False, device_selection=args.device_selection)
+        base_wall = base_wall or r['wall_time_s']
+        speedup = base_wall / r['wall_time_s'] if r['wall_time_s'] > 0 else float('inf')
+        print(f"{engine:>10} {r['requests']:>10} {fmt(r['avg_latency_ms'])} {fmt(r['p99_latency_ms'])} "
+              f"{r['wall_time_s']:>10.2f} {speedup:>7.1f}x")
@@ -0,0 +1,27 @@
+# bench_migration_interference.py
+# 对比设备队列的调度方式 (FIFO / 前台优先) 和迁移限速，输出迁移给前台I/O带来的额外排队延迟。
+# 用法: python bench_migration_interference.py [--migration-bandwidth-MBps 0 50 200] [--replay-speedup 1]
+import argparse
+
+from bench_util import quiet_run
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Foreground latency added by migration I/O, FIFO vs priority scheduling.")
+    arg_parser.add_argument("--migration-bandwidth-MBps", type=float, nargs="+", default=[0],
+                            help="migration token-bucket rate applied to every tier (0 = unlimited)")
+    arg_parser.add_argument("--replay-speedup", type=float, default=None)
+    args = arg_parser.parse_args()
+
+    print(f"{'scheduling':>16} {'mig MB/s':>9} {'avg(ms)':>9} {'p99(ms)':>9} {'mig delay/req(ms)':>18}")
+    for bandwidth in args.migration_bandwidth_MBps:
+        for priority in (False, True):
+            r = quiet_run(priority_scheduling=priority, migration_bandwidth_MBps=bandwidth,
+                           replay_speedup=args.replay_speedup)
+            label = "foreground first" if priority else "FIFO"
+            bw_label = f"{bandwidth:g}" if bandwidth else "-"
+            if r['avg_latency_ms'] is None:
+                print(f"{label:>16} {bw_label:>9} {'-':>9} {'-':>9} {'-':>18}")
+                continue
+            print(f"{label:>16} {bw_label:>9} {r['avg_latency_ms']:>9.3f} {r['p99_latency_ms']:>9.3f} "
+                  f"{r['migration_delay_ms_per_request']:>18.4f}")
@@ -0,0 +1,22 @@
+# bench_replay_saturation.py
+# 用闭环回放在不同队列深度下各跑一次模拟，输出达到的 IOPS / 吞吐量 / 延迟，用于寻找当前层级配置的饱和点。
+# 用法: python bench_replay_saturation.py [--queue-depths 1 2 4 8 16 32]
+import argparse
+
+from bench_util import quiet_run
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Closed-loop queue depth sweep (IOPS / latency curve).")
+    arg_parser.add_argument("--queue-depths", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    arg_parser.add_argument("--arrival-scheduling", default="coalesced")
+    args = arg_parser.parse_args()
+
+    print(f"{'QD/vol':>6} {'requests':>10} {'IOPS':>10} {'MB/s':>9} {'avg(ms)':>9} {'p99(ms)':>9}")
+    for qd in args.queue_depths:
+        r = quiet_run(replay_mode="closed_loop", queue_depth=qd, arrival_scheduling=args.arrival_scheduling)
+        if r['iops'] is None:
+            print(f"{qd:>6} {r['requests']:>10} {'-':>10} {'-':>9} {'-':>9} {'-':>9}")
+            continue
+        print(f"{qd:>6} {r['completed']:>10} {r['iops']:>10.1f} {r['throughput_MBps']:>9.2f} "
+              f"{r['avg_latency_ms']:>9.3f} {r['p99_latency_ms']:>9.3f}")
@@ -0,0 +1,22 @@
+# bench_ssd_model.py
+# 对比 SSD 层的单队列模型 (a + b * LBA数，一个迁移占住整个设备) 和多通道模型 (按条带切片、每通道一个队列、填充率驱动的写放大)。
+# 用法: python bench_ssd_model.py [--channels 4 8 16] [--stripe-kb 64]
+import argparse
+
+from bench_util import quiet_run, fmt
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Single-queue SSD vs multi-channel SSD model.")
+    arg_parser.add_argument("--channels", type=int, nargs="+", default=[8])
+    arg_parser.add_argument("--stripe-kb", type=int, default=64)
+    args = arg_parser.parse_args()
+
+    print(f"{'ssd model':>14} {'avg(ms)':>10} {'p99(ms)':>10} {'write p99':>10} {'mig delay':>10} {'makespan':>10} {'mean WA':>10}")
+    configs = [("single queue", False)] + [
+        (f"{n} channels", {'channels': n, 'stripe_bytes': args.stripe_kb * 1024}) for n in args.channels]
+    for label, ssd_model in configs:
+        r = quiet_run(ssd_model=ssd_model)
+        print(f"{label:>14} {fmt(r['avg_latency_ms'])} {fmt(r['p99_latency_ms'])} {fmt(r['write_p99_latency_ms'])} "
+              f"{fmt(r['migration_delay_ms_per_request'])} {fmt(r['migration_makespan_max_ms'])} "
+              f"{fmt(r['ssd_mean_write_amplification'])}")
@@ -0,0 +1,30 @@
+# bench_timeseries.py
+# 测量时间序列采样 (components/timeseries.py) 的开销：同一个 trace 关闭 / 开启采样各跑几次，取最快的一次对比墙钟时间，
+# 并检查采样没有改变统计结果 (采样进程只读取状态)。
+# 用法: python bench_timeseries.py [--repeat 3]
+import argparse
+
+from bench_util import quiet_run
+
+_COMPARED_KEYS = ('requests', 'completed', 'avg_latency_ms', 'p99_latency_ms',
+                  'migration_delay_ms_per_request', 'migration_makespan_max_ms')
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Wall-time overhead of the time-series sampler.")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="每种配置运行的次数，取最快的一次")
+    args = arg_parser.parse_args()
+
+    print(f"{'sampling':>9} {'events':>10} {'wall(s)':>9} {'overhead':>9}")
+    results = {}
+    for label, enabled in (("off", False), ("on", True)):
+        runs = [quiet_run(timeseries=enabled) for _ in range(max(args.repeat, 1))]
+        results[label] = min(runs, key=lambda r: r['wall_time_s'])
+    base_wall = results['off']['wall_time_s']
+    for label, r in results.items():
+        overhead = (r['wall_time_s'] / base_wall - 1) * 100 if base_wall > 0 else 0.0
+        print(f"{label:>9} {r['events']:>10} {r['wall_time_s']:>9.2f} {overhead:>8.1f}%")
+    if results['on']['timeseries_path']:
+        print(f"Time series saved to {results['on']['timeseries_path']}")
+    mismatched = [k for k in _COMPARED_KEYS if results['off'][k] != results['on'][k]]
+    print("Results match." if not mismatched else f"Results differ in: {', '.join(mismatched)}")
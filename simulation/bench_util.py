@@ -0,0 +1,17 @@
+# bench_util.py
+# bench_*.py 共用的小工具：静默运行一次模拟、格式化表格中的数值列。
+import contextlib
+import io
+
+from main import run_simulation
+
+
+def quiet_run(**kwargs):
+    """运行一次 run_simulation，丢弃它打印的统计输出，只返回结果字典"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_simulation(**kwargs)
+
+
+def fmt(value):
+    """10 列宽、3 位小数；None 显示为 '-'"""
+    return f"{value:>10.3f}" if value is not None else f"{'-':>10}"
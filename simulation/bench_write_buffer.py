@@ -0,0 +1,18 @@
+# bench_write_buffer.py
+# 关闭 / 开启写回缓冲各跑一次模拟，对比写延迟的尾部和整体延迟。
+# 用法: python bench_write_buffer.py [--replay-speedup 1]
+import argparse
+
+from bench_util import quiet_run, fmt
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Write tail latency with and without the write-back buffer.")
+    arg_parser.add_argument("--replay-speedup", type=float, default=None)
+    args = arg_parser.parse_args()
+
+    print(f"{'write buffer':>12} {'avg(ms)':>10} {'p99(ms)':>10} {'write p99':>10} {'write p99.9':>11}")
+    for enabled in (False, True):
+        r = quiet_run(write_buffer=enabled, replay_speedup=args.replay_speedup)
+        print(f"{'on' if enabled else 'off':>12} {fmt(r['avg_latency_ms'])} {fmt(r['p99_latency_ms'])} "
+              f"{fmt(r['write_p99_latency_ms'])} {fmt(r['write_p999_latency_ms']):>11}")
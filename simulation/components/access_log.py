@@ -0,0 +1,90 @@
+# components/access_log.py
+# chunk 访问日志：列式 (时间, chunk_id, 是否写, 大小) 的类型化缓冲区。
+# RequestGenerator 逐条追加，MigrationController 每个决策窗口 drain() 一次，拿到的是本窗口记录的 NumPy 视图 (不拷贝)。
+# 内部使用两块缓冲区交替写入：drain() 后新记录写入另一块，因此返回的视图在下一次 drain() 之前一直有效，
+# 已消费的记录随之被覆盖，内存只与单个窗口的最大访问数成正比，而不是整个trace的长度。
+import numpy as np
+
+
+class AccessLogWindow:
+    """一个决策窗口内的访问记录 (各列为等长的 NumPy 数组)"""
+    __slots__ = ('times', 'chunk_ids', 'is_write', 'sizes')
+
+    def __init__(self, times, chunk_ids, is_write, sizes):
+        self.times = times
+        self.chunk_ids = chunk_ids
+        self.is_write = is_write
+        self.sizes = sizes
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def __repr__(self):
+        return f"AccessLogWindow({len(self)} records)"
+
+    def head(self, n=5):
+        """前 n 条记录的 (time, chunk_id, 'read'/'write', size) 元组，用于写日志"""
+        return [(t, c, 'write' if w else 'read', s) for t, c, w, s in
+                zip(self.times[:n].tolist(), self.chunk_ids[:n].tolist(),
+                    self.is_write[:n].tolist(), self.sizes[:n].tolist())]
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64),
+                   np.empty(0, dtype=np.bool_), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def concat(cls, windows):
+        windows = list(windows)
+        if not windows:
+            return cls.empty()
+        if len(windows) == 1:
+            return windows[0]
+        return cls(np.concatenate([w.times for w in windows]), np.concatenate([w.chunk_ids for w in windows]),
+                   np.concatenate([w.is_write for w in windows]), np.concatenate([w.sizes for w in windows]))
+
+
+class ChunkAccessLog:
+    def __init__(self, initial_capacity=1 << 16):
+        self.total_appended = 0 # 累计追加的记录数 (统计用)
+        self._buffers = [self._alloc(max(int(initial_capacity), 1)) for _ in range(2)]
+        self._active = 0
+        self._size = 0
+
+    @staticmethod
+    def _alloc(capacity):
+        return (np.empty(capacity, dtype=np.float64), np.empty(capacity, dtype=np.int64),
+                np.empty(capacity, dtype=np.bool_), np.empty(capacity, dtype=np.int64))
+
+    def __len__(self):
+        """尚未被 drain 的记录数"""
+        return self._size
+
+    def _grow(self):
+        old = self._buffers[self._active]
+        new = self._alloc(2 * len(old[0]))
+        for dst, src in zip(new, old):
+            dst[:self._size] = src[:self._size]
+        self._buffers[self._active] = new
+
+    def append(self, time_ms, chunk_id, is_write, size_bytes):
+        buf = self._buffers[self._active]
+        i = self._size
+        if i == len(buf[0]):
+            self._grow()
+            buf = self._buffers[self._active]
+        buf[0][i] = time_ms
+        buf[1][i] = chunk_id
+        buf[2][i] = is_write
+        buf[3][i] = size_bytes
+        self._size = i + 1
+        self.total_appended += 1
+
+    def drain(self):
+        """取出自上次 drain 以来的全部记录 (视图，在下一次 drain 之前有效)，并切换到另一块缓冲区"""
+        times, chunk_ids, is_write, sizes = self._buffers[self._active]
+        n = self._size
+        window = AccessLogWindow(times[:n], chunk_ids[:n], is_write[:n], sizes[:n])
+        self._active ^= 1
+        self._size = 0
+        return window
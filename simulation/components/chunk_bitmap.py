@@ -0,0 +1,49 @@
+# components/chunk_bitmap.py
+# 每个chunk 1 bit 的位图，用于层级的成员关系和脏标记。
+# 底层是 bytearray，创建时整块清零 (memset)，所以创建是 O(n/8) 的，常驻内存就是完整的 n/8 字节。
+# fill=True (初始全部置位) 时内部存的是"取反"的位：清零后的数组直接表示全部置位，
+# 不需要再把整个数组写一遍 0xFF，置位个数也不用数。
+import numpy as np
+
+
+class ChunkBitmap:
+    def __init__(self, size, fill=False):
+        self.size = int(size)
+        self.bits = bytearray((self.size + 7) // 8)
+        self._inverted = bool(fill) # True: 存储位为 0 表示置位
+        self.count = self.size if fill else 0
+
+    def __len__(self):
+        """置位的个数"""
+        return self.count
+
+    def __contains__(self, i):
+        if not 0 <= i < self.size:
+            return False
+        return bool((self.bits[i >> 3] >> (i & 7)) & 1) != self._inverted
+
+    def _flip(self, i):
+        self.bits[i >> 3] ^= 1 << (i & 7)
+
+    def add(self, i):
+        """置位，原来未置位时返回 True"""
+        if not 0 <= i < self.size:
+            raise IndexError(f"chunk {i} out of bitmap range [0, {self.size})")
+        if i in self:
+            return False
+        self._flip(i)
+        self.count += 1
+        return True
+
+    def discard(self, i):
+        """清位，原来已置位时返回 True"""
+        if i not in self:
+            return False
+        self._flip(i)
+        self.count -= 1
+        return True
+
+    def indices(self):
+        """所有置位的下标 (升序 NumPy 数组)"""
+        unpacked = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), bitorder='little')[:self.size]
+        return np.flatnonzero(unpacked == (0 if self._inverted else 1))
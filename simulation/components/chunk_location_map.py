@@ -0,0 +1,87 @@
+# components/chunk_location_map.py
+# chunk_id -> 所在层级下标 的映射，Orchestrator 中数据放置的唯一依据 (I/O 路径直接按它查层级)。
+# 默认用 int8 NumPy 数组 (每个chunk 1 字节，初始化是一次 np.full)；
+# 地址空间超过 CHUNK_LOCATION_DENSE_MAX_CHUNKS 时改用稀疏模式：只在 dict 中记录不在默认层级 (底层) 的chunk。
+import numpy as np
+
+from config import CHUNK_LOCATION_DENSE_MAX_CHUNKS
+
+
+class ChunkLocationMap:
+    def __init__(self, total_chunks, default_tier_idx, dense=None):
+        self.total_chunks = int(total_chunks)
+        self.default_tier_idx = int(default_tier_idx)
+        self.dense = self.total_chunks <= CHUNK_LOCATION_DENSE_MAX_CHUNKS if dense is None else dense
+        if self.dense:
+            self._locations = np.full(self.total_chunks, self.default_tier_idx, dtype=np.int8)
+        else:
+            self._moved = {} # chunk_id -> tier_idx (只记录不在默认层级的chunk)
+
+    def __len__(self):
+        return self.total_chunks
+
+    def __contains__(self, chunk_id):
+        return 0 <= chunk_id < self.total_chunks
+
+    def get(self, chunk_id, default=None):
+        """与 dict.get 相同的语义：超出地址空间的 chunk_id 返回 default"""
+        if not 0 <= chunk_id < self.total_chunks:
+            return default
+        if self.dense:
+            return int(self._locations[chunk_id])
+        return self._moved.get(chunk_id, self.default_tier_idx)
+
+    def __getitem__(self, chunk_id):
+        tier_idx = self.get(chunk_id)
+        if tier_idx is None:
+            raise KeyError(chunk_id)
+        return tier_idx
+
+    def __setitem__(self, chunk_id, tier_idx):
+        if not 0 <= chunk_id < self.total_chunks:
+            raise KeyError(chunk_id)
+        if self.dense:
+            self._locations[chunk_id] = tier_idx
+        elif tier_idx == self.default_tier_idx:
+            self._moved.pop(chunk_id, None)
+        else:
+            self._moved[chunk_id] = tier_idx
+
+    def lookup(self, chunk_ids):
+        """批量查询 (NumPy 数组输入/输出)，超出地址空间的位置为 -1"""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        valid = (chunk_ids >= 0) & (chunk_ids < self.total_chunks)
+        result = np.full(len(chunk_ids), -1, dtype=np.int8)
+        if self.dense:
+            result[valid] = self._locations[chunk_ids[valid]]
+        else:
+            result[valid] = self.default_tier_idx
+            for i in np.flatnonzero(valid).tolist():
+                tier_idx = self._moved.get(int(chunk_ids[i]))
+                if tier_idx is not None:
+                    result[i] = tier_idx
+        return result
+
+    def chunks_in_tier(self, tier_idx):
+        """位于某一层级的全部 chunk_id (升序 NumPy 数组)"""
+        if self.dense:
+            return np.flatnonzero(self._locations == tier_idx)
+        if tier_idx == self.default_tier_idx:
+            moved = np.fromiter(self._moved.keys(), dtype=np.int64, count=len(self._moved))
+            return np.setdiff1d(np.arange(self.total_chunks, dtype=np.int64), moved)
+        return np.array(sorted(cid for cid, t in self._moved.items() if t == tier_idx), dtype=np.int64)
+
+    def moved_chunks(self):
+        """不在默认层级的全部 chunk_id (升序 NumPy 数组)，稀疏模式下开销只与被移动的chunk数成正比"""
+        if self.dense:
+            return np.flatnonzero(self._locations != self.default_tier_idx)
+        return np.array(sorted(self._moved), dtype=np.int64)
+
+    def items(self):
+        """(chunk_id, tier_idx) 按 chunk_id 升序遍历整个地址空间 (兼容原来的 dict 接口，开销与 TOTAL_CHUNKS 成正比)"""
+        if self.dense:
+            return zip(range(self.total_chunks), self._locations.tolist())
+        return ((cid, self._moved.get(cid, self.default_tier_idx)) for cid in range(self.total_chunks))
+
+    def __iter__(self):
+        return iter(range(self.total_chunks))
@@ -0,0 +1,66 @@
+# components/completion_store.py
+# 请求完成记录的列式存储：每个完成的请求只占预分配定长数组中的一行，
+# 不再保留 Request 对象，也不再用 Python list 累积延迟。后处理可以直接在这些列上向量化计算。
+import numpy as np
+
+# 列名 -> dtype
+COMPLETION_COLUMNS = (
+    ('req_id', np.int64),
+    ('arrival_ms', np.float64),
+    ('completion_ms', np.float64),
+    ('tier', np.int8),      # 服务该请求的层级下标，-1 表示chunk不在任何层级 (未实际服务)
+    ('is_write', np.bool_),
+    ('size_bytes', np.int64),
+)
+
+
+class CompletionStore:
+    """按列预分配的完成记录，容量不足时成倍扩容"""
+    def __init__(self, initial_capacity=1 << 16):
+        self.capacity = max(int(initial_capacity), 1)
+        self.size = 0
+        self._columns = {name: np.empty(self.capacity, dtype=dtype) for name, dtype in COMPLETION_COLUMNS}
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, col in self._columns.items():
+            grown = np.empty(self.capacity, dtype=col.dtype)
+            grown[:self.size] = col[:self.size]
+            self._columns[name] = grown
+
+    def record(self, req_id, arrival_ms, completion_ms, tier_idx, is_write, size_bytes):
+        if self.size == self.capacity:
+            self._grow()
+        i = self.size
+        cols = self._columns
+        cols['req_id'][i] = req_id
+        cols['arrival_ms'][i] = arrival_ms
+        cols['completion_ms'][i] = completion_ms
+        cols['tier'][i] = tier_idx
+        cols['is_write'][i] = is_write
+        cols['size_bytes'][i] = size_bytes
+        self.size = i + 1
+
+    def record_many(self, req_ids, arrival_ms, completion_ms, tier_idx, is_write, size_bytes):
+        """批量追加 (NumPy 数组，长度相同)"""
+        n = len(req_ids)
+        while self.size + n > self.capacity:
+            self._grow()
+        i, cols = self.size, self._columns
+        for name, values in (('req_id', req_ids), ('arrival_ms', arrival_ms), ('completion_ms', completion_ms),
+                             ('tier', tier_idx), ('is_write', is_write), ('size_bytes', size_bytes)):
+            cols[name][i:i + n] = values
+        self.size = i + n
+
+    def column(self, name):
+        """已记录部分的视图 (不拷贝)"""
+        return self._columns[name][:self.size]
+
+    def latencies(self):
+        return self.column('completion_ms') - self.column('arrival_ms')
+
+    def save(self, path):
+        np.savez_compressed(path, **{name: self.column(name) for name, _ in COMPLETION_COLUMNS})
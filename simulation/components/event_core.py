@@ -0,0 +1,286 @@
+# components/event_core.py
+# 轻量的离散事件内核，可替代 simpy.Environment (EVENT_CORE = "heap")。
+# 只实现本模拟器组件实际用到的部分：timeout、process、event.succeed、容量为1的 (优先级) 资源和 Store。
+#
+# 事件队列是一个扁平的 heapq，元素为 (时间, 优先级, 序号, 事件) 元组；事件对象用 __slots__，
+# 没有 SimPy 的 BoundClass / 条件事件 / 中断等开销。
+# 调度语义与 SimPy 4 保持一致 (否则同一时刻的事件顺序会不同，结果就对不上)：
+#   - 新进程的启动事件是 URGENT 优先级，其余事件是 NORMAL；同一 (时间, 优先级) 按调度顺序处理
+#   - 资源的 release 本身是一个事件，处理它时才把设备交给队首的请求 (授予也是一个事件)
+#   - PriorityResource 的等待队列按 (priority, 申请时间) 排序，相同时按申请顺序 (非抢占)
+#   - run(until) 在 until 时刻以 URGENT 优先级停止，结束后 now == until (until 事件放回队列，可以继续 run)
+# 因此 events_scheduled 与 CountingEnvironment 的计数也相同。
+from heapq import heappush, heappop
+from itertools import count
+from collections import deque
+
+URGENT = 0
+NORMAL = 1
+
+PENDING = object() # 事件尚未触发时的 _value
+
+
+class Event:
+    __slots__ = ('env', 'callbacks', '_value', '_ok', 'defused')
+
+    def __init__(self, env):
+        self.env = env
+        self.callbacks = [] # 处理之后置为 None
+        self._value = PENDING
+        self._ok = True
+        self.defused = False
+
+    @property
+    def triggered(self):
+        return self._value is not PENDING
+
+    @property
+    def processed(self):
+        return self.callbacks is None
+
+    @property
+    def ok(self):
+        return self._ok
+
+    @property
+    def value(self):
+        if self._value is PENDING:
+            raise AttributeError(f"Value of {self} is not yet available")
+        return self._value
+
+    def succeed(self, value=None):
+        if self._value is not PENDING:
+            raise RuntimeError(f"{self} has already been triggered")
+        self._ok = True
+        self._value = value
+        self.env.schedule(self)
+        return self
+
+    def fail(self, exception):
+        if self._value is not PENDING:
+            raise RuntimeError(f"{self} has already been triggered")
+        if not isinstance(exception, BaseException):
+            raise ValueError(f"{exception} is not an exception.")
+        self._ok = False
+        self._value = exception
+        self.env.schedule(self)
+        return self
+
+
+class Timeout(Event):
+    __slots__ = ()
+
+    def __init__(self, env, delay, value=None):
+        if delay < 0:
+            raise ValueError(f"Negative delay {delay}")
+        self.env = env
+        self.callbacks = []
+        self._value = value
+        self._ok = True
+        self.defused = False
+        env.schedule(self, NORMAL, delay)
+
+
+class Process(Event):
+    """把生成器包装成进程；生成器返回时进程事件以返回值触发，可以被其它进程 yield"""
+    __slots__ = ('_generator',)
+
+    def __init__(self, env, generator):
+        if not hasattr(generator, 'throw'):
+            raise ValueError(f"{generator} is not a generator.")
+        Event.__init__(self, env)
+        self._generator = generator
+        start = Event(env)
+        start._value = None
+        start.callbacks.append(self._resume)
+        env.schedule(start, URGENT)
+
+    @property
+    def is_alive(self):
+        return self._value is PENDING
+
+    def _resume(self, event):
+        generator = self._generator
+        while True:
+            try:
+                if event._ok:
+                    event = generator.send(event._value)
+                else:
+                    event.defused = True
+                    event = generator.throw(event._value)
+            except StopIteration as e:
+                self._ok = True
+                self._value = e.value
+                self.env.schedule(self)
+                return
+            except BaseException as e:
+                self._ok = False
+                self._value = e
+                self.env.schedule(self)
+                return
+            try:
+                callbacks = event.callbacks
+            except AttributeError:
+                raise RuntimeError(f"Invalid yield value {event!r}") from None
+            if callbacks is not None:
+                callbacks.append(self._resume)
+                return
+            # 已经处理过的事件：直接用它的值继续执行
+
+
+class Environment:
+    def __init__(self, initial_time=0):
+        self.now = initial_time
+        self._queue = []
+        self._eid = count()
+        self.events_scheduled = 0
+
+    def schedule(self, event, priority=NORMAL, delay=0):
+        self.events_scheduled += 1
+        heappush(self._queue, (self.now + delay, priority, next(self._eid), event))
+
+    def event(self):
+        return Event(self)
+
+    def timeout(self, delay, value=None):
+        return Timeout(self, delay, value)
+
+    def process(self, generator):
+        return Process(self, generator)
+
+    def peek(self):
+        return self._queue[0][0] if self._queue else float('inf')
+
+    def step(self):
+        self.now, _, _, event = heappop(self._queue)
+        callbacks, event.callbacks = event.callbacks, None
+        for callback in callbacks:
+            callback(event)
+        if not event._ok and not event.defused:
+            raise event._value
+
+    def run(self, until=None):
+        stop = None
+        if until is not None:
+            at = float(until)
+            if at <= self.now:
+                raise ValueError(f"until (={at}) must be > the current simulation time")
+            stop = Event(self)
+            stop._value = None
+            self.schedule(stop, URGENT, at - self.now)
+        queue = self._queue
+        while queue:
+            # 与 step() 相同，内联以省掉每个事件一次方法调用
+            self.now, _, _, event = heappop(queue)
+            if event is stop:
+                # 与 SimPy 相同：until 事件以优先级 -1 放回队列，之后可以继续 run()
+                self.schedule(stop, -1)
+                return None
+            callbacks, event.callbacks = event.callbacks, None
+            for callback in callbacks:
+                callback(event)
+            if not event._ok and not event.defused:
+                raise event._value
+        return None
+
+
+class Request(Event):
+    __slots__ = ('resource', 'priority', 'key', 'usage_since')
+
+
+class PriorityResource:
+    """非抢占的优先级资源 (priority 越小越优先)；接口与 simpy.PriorityResource 的 request/release/count/queue/users 相同"""
+
+    def __init__(self, env, capacity=1):
+        self._env = env
+        self.capacity = capacity
+        self.users = []
+        self.queue = [] # 等待中的请求，按 key 升序
+        self._seq = count()
+
+    @property
+    def count(self):
+        return len(self.users)
+
+    def request(self, priority=0):
+        env = self._env
+        req = Request(env)
+        req.resource = self
+        req.priority = priority
+        req.key = (priority, env.now, next(self._seq))
+        req.usage_since = None
+        queue = self.queue
+        if not queue or queue[-1].key < req.key:
+            queue.append(req)
+        else:
+            i = len(queue) - 1
+            while i > 0 and queue[i - 1].key > req.key:
+                i -= 1
+            queue.insert(i, req)
+        self._trigger_put()
+        return req
+
+    def release(self, request):
+        release = Event(self._env)
+        try:
+            self.users.remove(request)
+        except ValueError:
+            pass
+        release.callbacks.append(self._trigger_put)
+        release.succeed()
+        return release
+
+    def _trigger_put(self, _=None):
+        """有空位时把设备交给队首的请求 (每次最多一个，与 SimPy 相同)"""
+        if self.queue and len(self.users) < self.capacity:
+            req = self.queue.pop(0)
+            self.users.append(req)
+            req.usage_since = self._env.now
+            req.succeed()
+
+
+class Resource(PriorityResource):
+    """不区分优先级的资源：所有请求按申请顺序排队"""
+
+    def request(self):
+        return PriorityResource.request(self, 0)
+
+
+class StorePut(Event):
+    __slots__ = ('item',)
+
+
+class Store:
+    """容量为 capacity 的 FIFO 队列，put/get 返回事件；语义与 simpy.Store 相同"""
+
+    def __init__(self, env, capacity=float('inf')):
+        self._env = env
+        self.capacity = capacity
+        self.items = []
+        self._putters = deque()
+        self._getters = deque()
+
+    def put(self, item):
+        event = StorePut(self._env)
+        event.item = item
+        event.callbacks.append(self._trigger_get)
+        self._putters.append(event)
+        self._trigger_put()
+        return event
+
+    def get(self):
+        event = Event(self._env)
+        event.callbacks.append(self._trigger_put)
+        self._getters.append(event)
+        self._trigger_get()
+        return event
+
+    def _trigger_put(self, _=None):
+        if self._putters and len(self.items) < self.capacity:
+            event = self._putters.popleft()
+            self.items.append(event.item)
+            event.succeed()
+
+    def _trigger_get(self, _=None):
+        if self._getters and self.items:
+            self._getters.popleft().succeed(self.items.pop(0))
@@ -0,0 +1,103 @@
+# components/fast_replay.py
+# 解析式快速回放引擎 (SIMULATION_ENGINE = "analytical")：不经过 SimPy 的事件循环，
+# 把一个决策窗口内的请求整体当作 NumPy 数组处理。
+#
+# 单服务台 FIFO 设备上，请求 i 的完成时间满足 Lindley 递推:
+#     C_i = max(A_i, C_{i-1}) + S_i
+# 令 P_i 为服务时间的前缀和，可以写成 C_i = P_i + max(C_0, max_{j<=i}(A_j - P_{j-1}))，
+# 因此每个设备上的一批请求只需要一次 cumsum 和一次 maximum.accumulate。
+#   - 数据放置来自 Orchestrator.chunk_locations (每个窗口开始时的位置)
+#   - 服务时间来自 StorageDevice.service_times (与 SimPy 路径相同的 a + b * LBA 数模型)
+#   - 设备选择与 StorageTier.get_device 相同 (round_robin / chunk_affinity / striped；jsq 不支持)
+#   - 每个窗口结束时调用策略，迁移决策通过 apply_migration_instant 立即生效，不模拟迁移I/O
+# 因此只适用于只在窗口之间改变数据放置的策略扫描：迁移带来的设备占用、写回缓冲、闭环回放都不在这个模型中，
+# 没有迁移I/O时它的延迟和利用率统计与 SimPy 路径一致 (只差浮点舍入)。
+import numpy as np
+
+from config import LBAS_PER_CHUNK, WINDOW_SIZE, SIMULATION_TIME
+from components.access_log import AccessLogWindow
+
+
+class FastReplayEngine:
+    def __init__(self, orchestrator, request_generator, migration_controller=None):
+        self.orchestrator = orchestrator
+        self.request_generator = request_generator
+        self.migration_controller = migration_controller
+        self.tiers = orchestrator.tiers
+        for tier in self.tiers:
+            if tier.device_selection == "jsq" and len(tier.devices) > 1:
+                raise ValueError(f"Tier {tier.name}: jsq device selection is not supported by the analytical engine")
+            if any(device.seek_model is not None for device in tier.devices):
+                raise ValueError(f"Tier {tier.name}: the HDD seek model is not supported by the analytical engine")
+            if tier.write_amplification is not None:
+                raise ValueError(f"Tier {tier.name}: the multi-channel SSD model is not supported by the analytical engine")
+        if request_generator.replay_mode != "open_loop":
+            raise ValueError("The analytical engine only supports open_loop replay")
+        # 每个设备上一个请求的完成时间 (跨窗口延续)
+        self._free_at = [np.zeros(len(tier.devices)) for tier in self.tiers]
+        self.windows_replayed = 0
+        self.end_time = 0.0
+
+    def _serve(self, arrivals, batch):
+        """按当前数据放置服务一批请求 (按到达顺序)，返回 (完成时间, 服务层级下标)"""
+        chunk_ids = batch.lba // LBAS_PER_CHUNK
+        tier_of = self.orchestrator.chunk_locations.lookup(chunk_ids)
+        completions = arrivals.copy() # 不在任何层级的chunk (tier -1) 立即完成，与 SimPy 路径相同
+        for t in np.unique(tier_of).tolist():
+            if t < 0:
+                continue
+            tier = self.tiers[t]
+            idx = np.flatnonzero(tier_of == t)
+            device_idx = tier.device_indices(batch.lba[idx])
+            for d in np.unique(device_idx).tolist():
+                sel = idx[device_idx == d]
+                device = tier.devices[d]
+                service = device.service_times(batch.size_bytes[sel], batch.is_write[sel])
+                arrive = arrivals[sel]
+                prefix = np.cumsum(service)
+                backlog = np.maximum(np.maximum.accumulate(arrive - (prefix - service)), self._free_at[t][d])
+                done = prefix + backlog
+                completions[sel] = done
+                self._free_at[t][d] = done[-1]
+                device.busy_time += float(service.sum())
+                device.requests_served += len(sel)
+                device.foreground_requests_served += len(sel)
+                device.foreground_wait_time += float(np.sum(np.maximum(done - service - arrive, 0.0)))
+            written = np.unique(chunk_ids[idx][batch.is_write[idx]])
+            for chunk_id in written.tolist():
+                tier.set_dirty(chunk_id)
+        return completions, tier_of
+
+    def _end_window(self, window_id, parts):
+        """窗口 window_id 结束：把本窗口的访问记录交给策略，决策立即生效"""
+        self.windows_replayed += 1
+        if self.migration_controller is not None:
+            self.migration_controller.apply_window_decisions_instant(window_id, AccessLogWindow.concat(parts))
+
+    def run(self):
+        self.orchestrator.populate_bottom_tier()
+        rg = self.request_generator
+        current_window = 0
+        parts = []
+        for arrivals, batch in rg.iter_arrival_batches():
+            window_ids = (arrivals // WINDOW_SIZE).astype(np.int64)
+            # 按窗口号变化的位置把批切成若干段；每段用窗口开始时的数据放置服务
+            cuts = np.flatnonzero(window_ids[1:] != window_ids[:-1]) + 1
+            for start, stop in zip(np.concatenate([[0], cuts]).tolist(), np.concatenate([cuts, [len(batch)]]).tolist()):
+                window_id = int(window_ids[start])
+                while current_window < window_id: # 中间没有请求的窗口也照常调用策略
+                    self._end_window(current_window, parts)
+                    parts = []
+                    current_window += 1
+                segment = batch.take(slice(start, stop))
+                seg_arrivals = arrivals[start:stop]
+                completions, tier_of = self._serve(seg_arrivals, segment)
+                rg.log_completions_many(seg_arrivals, completions, tier_of, segment.is_write, segment.size_bytes)
+                parts.append(AccessLogWindow(seg_arrivals, segment.lba // LBAS_PER_CHUNK,
+                                             segment.is_write, segment.size_bytes))
+                self.end_time = max(self.end_time, float(completions.max()))
+        self._end_window(current_window, parts)
+        # 与 SimPy 路径 (env.run(until=SIMULATION_TIME * 1.2)) 相同的统计区间，用于计算利用率
+        self.end_time = max(self.end_time, (current_window + 1) * WINDOW_SIZE,
+                            SIMULATION_TIME * 1.2 if SIMULATION_TIME is not None else 0.0)
+        return self.end_time
@@ -0,0 +1,160 @@
+# components/latency_histogram.py
+# HDR 风格的对数分桶延迟直方图：桶边界按 (1 + precision) 的等比数列划分，
+# 任意分位数的相对误差不超过 precision/2，内存只与桶数 (由取值范围和精度决定) 有关，与请求数无关。
+# LatencyRecorder 在 log_completion 中逐个记录延迟，同时维护整体、按服务层级、按读写、按决策窗口的直方图，
+# 运行过程中和结束时都可以读取分位数。
+import math
+
+import numpy as np
+
+from config import LATENCY_HISTOGRAM_MIN_MS, LATENCY_HISTOGRAM_MAX_MS, LATENCY_HISTOGRAM_PRECISION
+
+DEFAULT_PERCENTILES = (50, 95, 99, 99.9)
+
+
+class LogHistogram:
+    """桶 0 为下溢 (< min_value)，最后一个桶为上溢 (>= max_value)，精确的 min/max/sum 单独记录"""
+    def __init__(self, min_value=LATENCY_HISTOGRAM_MIN_MS, max_value=LATENCY_HISTOGRAM_MAX_MS,
+                 precision=LATENCY_HISTOGRAM_PRECISION):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        self.log_base = math.log1p(precision)
+        self.num_buckets = int(math.ceil(math.log(max_value / min_value) / self.log_base)) + 2
+        self.counts = np.zeros(self.num_buckets, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def bucket_of(self, value):
+        if value < self.min_value:
+            return 0
+        return min(int(math.log(value / self.min_value) / self.log_base) + 1, self.num_buckets - 1)
+
+    def add(self, bucket, value):
+        """按已经算好的桶下标记录 (同一布局的多个直方图共用一次 bucket_of)"""
+        self.counts[bucket] += 1
+        self.total += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record(self, value):
+        self.add(self.bucket_of(value), value)
+
+    def record_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        buckets = np.floor(np.log(np.maximum(values, self.min_value) / self.min_value) / self.log_base).astype(np.int64) + 1
+        buckets = np.clip(np.where(values < self.min_value, 0, buckets), 0, self.num_buckets - 1)
+        self.counts += np.bincount(buckets, minlength=self.num_buckets)
+        self.total += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bucket_value(self, bucket):
+        """桶的代表值：桶上下界的几何中点，下溢/上溢桶用精确的 min/max"""
+        if bucket == 0:
+            return self.min
+        if bucket == self.num_buckets - 1:
+            return self.max
+        return self.min_value * math.exp((bucket - 0.5) * self.log_base)
+
+    def mean(self):
+        return self.sum / self.total if self.total else None
+
+    def percentile(self, q):
+        """最近秩 (nearest-rank) 分位数，q 为 0-100"""
+        if self.total == 0:
+            return None
+        rank = max(int(math.ceil(q / 100 * self.total)), 1)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank, side='left'))
+        return min(max(self._bucket_value(bucket), self.min), self.max)
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        result = {'count': self.total, 'mean': self.mean(),
+                  'max': self.max if self.total else None}
+        for q in percentiles:
+            result[f"p{q:g}"] = self.percentile(q)
+        return result
+
+
+class LatencyRecorder:
+    """整体 / 按服务层级 / 按读写 / 按决策窗口 (完成时间所在窗口) 的延迟直方图"""
+    def __init__(self, window_ms, tier_names=None):
+        self.window_ms = window_ms
+        self.tier_names = list(tier_names) if tier_names else []
+        self.overall = LogHistogram()
+        self.by_tier = {}
+        self.by_op = {}
+        self.by_window = {}
+
+    def _hist(self, table, key):
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = LogHistogram()
+        return hist
+
+    def record(self, latency_ms, tier_idx, is_write, completion_time_ms):
+        bucket = self.overall.bucket_of(latency_ms)
+        self.overall.add(bucket, latency_ms)
+        self._hist(self.by_tier, tier_idx).add(bucket, latency_ms)
+        self._hist(self.by_op, 'write' if is_write else 'read').add(bucket, latency_ms)
+        self._hist(self.by_window, int(completion_time_ms // self.window_ms)).add(bucket, latency_ms)
+
+    def record_many(self, latencies_ms, tier_idx, is_write, completion_times_ms):
+        """批量记录 (NumPy 数组)，与逐个 record 的结果相同"""
+        latencies_ms = np.asarray(latencies_ms, dtype=np.float64)
+        if len(latencies_ms) == 0:
+            return
+        tier_idx = np.asarray(tier_idx)
+        is_write = np.asarray(is_write, dtype=bool)
+        self.overall.record_many(latencies_ms)
+        for t in np.unique(tier_idx).tolist():
+            self._hist(self.by_tier, t).record_many(latencies_ms[tier_idx == t])
+        for op, mask in (('read', ~is_write), ('write', is_write)):
+            if mask.any():
+                self._hist(self.by_op, op).record_many(latencies_ms[mask])
+        windows = (np.asarray(completion_times_ms, dtype=np.float64) // self.window_ms).astype(np.int64)
+        for w in np.unique(windows).tolist():
+            self._hist(self.by_window, w).record_many(latencies_ms[windows == w])
+
+    def tier_label(self, tier_idx):
+        if tier_idx < 0:
+            return "unserved"
+        return self.tier_names[tier_idx] if tier_idx < len(self.tier_names) else f"Tier{tier_idx}"
+
+    def window_summary(self, window_idx, percentiles=DEFAULT_PERCENTILES):
+        hist = self.by_window.get(window_idx)
+        return hist.summary(percentiles) if hist is not None else None
+
+    def snapshot(self, percentiles=DEFAULT_PERCENTILES):
+        """当前所有分组的分位数 (运行中也可以调用)"""
+        return {
+            'overall': self.overall.summary(percentiles),
+            'by_tier': {self.tier_label(k): h.summary(percentiles) for k, h in sorted(self.by_tier.items())},
+            'by_op': {k: h.summary(percentiles) for k, h in sorted(self.by_op.items())},
+            'by_window': {k: h.summary(percentiles) for k, h in sorted(self.by_window.items())},
+        }
+
+
+def format_summary(summary, percentiles=DEFAULT_PERCENTILES):
+    """把 summary() 的结果格式化为一行"""
+    if not summary or summary['count'] == 0:
+        return "no completions"
+    parts = [f"n={summary['count']}", f"mean {summary['mean']:.3f}"]
+    parts += [f"p{q:g} {summary[f'p{q:g}']:.3f}" for q in percentiles]
+    parts.append(f"max {summary['max']:.3f}")
+    return ", ".join(parts) + " ms"
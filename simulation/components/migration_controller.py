@@ -1,18 +1,31 @@
 # components/migration_controller.py
 # components/migration_controller.py
 import simpy
+import numpy as np
 from config import WINDOW_SIZE, SIMULATION_TIME, LOGS_DIR # 确保导入 LOGS_DIR
+from config import MIGRATION_MAX_PARALLEL, MIGRATION_MAX_PER_SOURCE_DEVICE, MIGRATION_PLANNER_ENABLED, MIGRATION_BOUNCE_HOLD_WINDOWS
+from config import LBAS_PER_CHUNK
+from components.access_log import AccessLogWindow
+from components.latency_histogram import format_summary
+from components.migration_executor import MigrationExecutor
+from components.migration_planner import MigrationPlanner
 import os # 新增导入
 import time
 
 class MigrationController:
-    def __init__(self, env, orchestrator, policy_module, request_generator_ref):
+    def __init__(self, env, orchestrator, policy_module, request_generator_ref, max_parallel_migrations=None):
         self.env = env
         self.orchestrator = orchestrator
         self.policy_module = policy_module
         self.request_generator_ref = request_generator_ref
+        self.planner = MigrationPlanner(orchestrator, MIGRATION_BOUNCE_HOLD_WINDOWS, log=self._log) \
+            if MIGRATION_PLANNER_ENABLED else None
+        self.executor = MigrationExecutor(env, orchestrator,
+                                          MIGRATION_MAX_PARALLEL if max_parallel_migrations is None else max_parallel_migrations,
+                                          log=self._log,
+                                          on_success=self.planner.record_move if self.planner is not None else None,
+                                          max_per_source_device=MIGRATION_MAX_PER_SOURCE_DEVICE)
         self.action = env.process(self.run())
-        self.last_decision_log_idx = 0
 
         # --- 日志文件设置 ---
         if not os.path.exists(LOGS_DIR):
@@ -28,6 +41,66 @@ class MigrationController:
             f.write(f"[MigrationCtrl {self.env.now:.2f}] {message}\n")
 
 
+    def fast_forward(self, skipped_batches, replay_start_ms):
+        """
+        用回放窗口之前被跳过的trace快进策略状态：按 WINDOW_SIZE 切分决策窗口，
+        把每个窗口的访问记录交给策略，决策结果通过 apply_migration_instant 直接更新数据放置，不模拟设备IO。
+        记录中的时间为相对回放起点的毫秒数 (负数)。
+        """
+        self._log(f"Fast-forwarding policy state over skipped trace before {replay_start_ms:.2f} ms (trace time).")
+        self.orchestrator.populate_bottom_tier()
+        window_parts = []
+        current_window = None
+        num_windows = 0
+        num_applied = 0
+        for batch in skipped_batches:
+            if len(batch) == 0:
+                continue
+            rel_times = batch.timestamp_ms - replay_start_ms
+            window_ids = np.floor(rel_times / WINDOW_SIZE).astype(np.int64)
+            chunk_ids = batch.lba // LBAS_PER_CHUNK
+            # 按窗口号变化的位置把批切成若干段
+            cuts = np.flatnonzero(window_ids[1:] != window_ids[:-1]) + 1
+            for start, stop in zip(np.concatenate([[0], cuts]).tolist(), np.concatenate([cuts, [len(batch)]]).tolist()):
+                window_id = int(window_ids[start])
+                if window_id != current_window:
+                    if window_parts:
+                        num_applied += self.apply_window_decisions_instant(current_window, AccessLogWindow.concat(window_parts))
+                        num_windows += 1
+                    window_parts = []
+                    current_window = window_id
+                window_parts.append(AccessLogWindow(rel_times[start:stop], chunk_ids[start:stop],
+                                                    batch.is_write[start:stop], batch.size_bytes[start:stop]))
+        if window_parts:
+            num_applied += self.apply_window_decisions_instant(current_window, AccessLogWindow.concat(window_parts))
+            num_windows += 1
+        self._log(f"Fast-forward finished: {num_windows} windows, {num_applied} placement changes applied.")
+
+    def apply_window_decisions_instant(self, window_id, window_log):
+        """在窗口 window_id 结束时调用策略，决策结果只更新数据放置、不模拟设备IO；返回实际生效的迁移数"""
+        if not self.policy_module:
+            return 0
+        decision_time = (window_id + 1) * WINDOW_SIZE
+        migration_decisions = self._plan(self.policy_module.get_migration_decisions(decision_time, window_log), window_id + 1)
+        applied = 0
+        for action in ('evict', 'promote'): # 与 run() 一致：先驱逐再提升
+            for d in migration_decisions:
+                if d['action'] == action and self.orchestrator.apply_migration_instant(
+                        d['chunk_id'], d['src_tier_idx'], d['dest_tier_idx']):
+                    applied += 1
+                    if self.planner is not None:
+                        self.planner.record_move(d)
+        return applied
+
+    def _plan(self, migration_decisions, decision_window):
+        """
+        经过 MigrationPlanner 去重/合并/取消后的决策 (未启用时原样返回)。
+        decision_window 为决策时刻所在的窗口序号 decision_time // WINDOW_SIZE (快进时为负数)，用于跨窗口的抖动判断。
+        """
+        if self.planner is None or not migration_decisions:
+            return migration_decisions
+        return self.planner.plan(migration_decisions, decision_window)
+
     def run(self):
         self._log("Started.")
         while True:
@@ -35,9 +108,13 @@ class MigrationController:
             current_time = self.env.now # 在 yield 之后获取，才是当前窗口的决策时间
             self._log(f"Decision window begins at SimTime {current_time:.2f}.")
 
-            current_access_log = self.request_generator_ref.chunk_access_log
-            log_for_this_window = current_access_log[self.last_decision_log_idx:]
-            self.last_decision_log_idx = len(current_access_log)
+            # 刚结束的窗口的延迟分位数 (按完成时间归属窗口)
+            finished_window = int(current_time // WINDOW_SIZE) - 1
+            window_latency = self.request_generator_ref.latency_recorder.window_summary(finished_window)
+            self._log(f"Latency of window {finished_window}: {format_summary(window_latency)}")
+
+            # 取出本窗口的访问记录 (NumPy 视图，不拷贝)；已消费的记录由日志缓冲区回收
+            log_for_this_window = self.request_generator_ref.chunk_access_log.drain()
             self._log(f"Processing {len(log_for_this_window)} new access records for this window.")
 
             # 确保 policy_module 存在才调用
@@ -51,38 +128,18 @@ class MigrationController:
                 self._log("No migration tasks received from policy.")
             else:
                 self._log(f"Received {len(migration_decisions)} migration tasks from policy: {migration_decisions}")
+                migration_decisions = self._plan(migration_decisions, int(current_time // WINDOW_SIZE))
 
                 evictions = [d for d in migration_decisions if d['action'] == 'evict']
                 promotions = [d for d in migration_decisions if d['action'] == 'promote']
 
-                migration_tasks_executed_this_window = 0
-                for decision in evictions:
-                    self._log(f"Attempting Eviction: Chunk {decision['chunk_id']} from Tier {decision['src_tier_idx']} to Tier {decision['dest_tier_idx']}")
-                    migration_success = yield self.env.process(
-                        self.orchestrator.execute_migration_command(
-                            decision['chunk_id'], decision['src_tier_idx'], decision['dest_tier_idx'], reason="eviction_by_policy"
-                        )
-                    ) # 传递 reason
-                    if migration_success:
-                        self._log(f"Eviction SUCCEEDED for chunk {decision['chunk_id']}.")
-                        migration_tasks_executed_this_window += 1
-                    else:
-                        self._log(f"Eviction FAILED for chunk {decision['chunk_id']}.")
-
-                for decision in promotions:
-                    self._log(f"Attempting Promotion: Chunk {decision['chunk_id']} from Tier {decision['src_tier_idx']} to Tier {decision['dest_tier_idx']}")
-                    migration_success = yield self.env.process(
-                        self.orchestrator.execute_migration_command(
-                            decision['chunk_id'], decision['src_tier_idx'], decision['dest_tier_idx'], reason="promotion_by_policy"
-                        )
-                    ) # 传递 reason
-                    if migration_success:
-                        self._log(f"Promotion SUCCEEDED for chunk {decision['chunk_id']}.")
-                        migration_tasks_executed_this_window += 1
-                    else:
-                        self._log(f"Promotion FAILED for chunk {decision['chunk_id']}.")
-
-                self._log(f"Finished executing {migration_tasks_executed_this_window} migration tasks for this window.")
+                # 先驱逐后提升；执行器在保证空间依赖的前提下最多并行 MIGRATION_MAX_PARALLEL 个迁移
+                window_result = yield self.env.process(self.executor.execute(evictions + promotions))
+                self._log(f"Finished executing {window_result['succeeded']} migration tasks for this window "
+                          f"({window_result['failed']} failed, makespan {window_result['makespan_ms']:.2f} ms, "
+                          f"max {window_result['max_in_flight']} in flight).")
+                if window_result['makespan_ms'] > WINDOW_SIZE:
+                    self._log(f"WARNING: migrations took longer than the decision window ({WINDOW_SIZE} ms).")
 
             if current_time > SIMULATION_TIME and self.request_generator_ref.requests_generated > 0 and \
                self.request_generator_ref.completed_requests >= self.request_generator_ref.requests_generated :
@@ -0,0 +1,131 @@
+# components/migration_executor.py
+# 有界并行的迁移执行器：一个决策窗口内的迁移任务最多 max_parallel 个同时在途，
+# 不同源/目标设备上的迁移可以重叠，不再一个接一个地串行执行。
+#
+# 依赖关系 (保持与串行执行相同的语义):
+#   - 任务按给定顺序 (先驱逐后提升) 派发；同一个chunk同时只有一个迁移在途
+#   - 目标层级 (非 backing store) 的空间按"已用 + 在途写入预留"计算，空间不足的任务等待在途迁移完成
+#     (驱逐在开始时就从源层级移除chunk，释放出的空间随即可被后面的提升使用)
+#   - 需要读源层级的迁移 (除干净chunk驱逐到 backing store 外都要读) 按源层级限制在途数:
+#     最多 max_per_source_device * 源层级设备数 个，源设备的读带宽不会被一个窗口的迁移全部占满；0 表示不限制
+#   - 被阻塞的任务会挡住后面写入同一目标层级的任务，避免后面的任务抢走前面任务需要的空间
+#   - 没有任何在途迁移时，队首任务直接执行 (空间仍然不足时与串行执行一样失败)
+# max_parallel = 1 时与原来的串行执行完全相同。
+from config import CHUNK_SIZE_BYTES
+
+
+class MigrationExecutor:
+    def __init__(self, env, orchestrator, max_parallel, log=None, on_success=None, max_per_source_device=0):
+        self.env = env
+        self.orchestrator = orchestrator
+        self.max_parallel = max(1, int(max_parallel))
+        self.max_per_source_device = max(0, int(max_per_source_device))
+        self._log = log or (lambda message: None)
+        self._on_success = on_success # 每个成功的迁移回调一次 (参数为该决策)
+        self._reserved_bytes = [0] * len(orchestrator.tiers) # 各层级在途写入的预留空间
+        self._source_reads = [0] * len(orchestrator.tiers) # 各层级作为源层级的在途迁移数
+        self._chunks_in_flight = set()
+        self._in_flight = 0
+        self._wakeup = None
+        self.window_stats = [] # 每个窗口一条: decision_time, tasks, succeeded, failed, makespan_ms, max_in_flight
+
+    def _fits(self, decision):
+        dest_idx = decision['dest_tier_idx']
+        if not 0 <= dest_idx < len(self.orchestrator.tiers) - 1: # backing store (或非法下标，由执行时报错)
+            return True
+        dest_tier = self.orchestrator.tiers[dest_idx]
+        return dest_tier.get_free_space() - self._reserved_bytes[dest_idx] >= CHUNK_SIZE_BYTES
+
+    def _source_tier(self, decision):
+        """需要读源层级时返回源层级下标，不需要 (干净chunk驱逐到 backing store、非法下标) 时返回 None"""
+        src_idx, dest_idx = decision['src_tier_idx'], decision['dest_tier_idx']
+        tiers = self.orchestrator.tiers
+        if not (0 <= src_idx < len(tiers) and 0 <= dest_idx < len(tiers)):
+            return None
+        if dest_idx == len(tiers) - 1 and src_idx < dest_idx and not tiers[src_idx].is_dirty(decision['chunk_id']):
+            return None
+        return src_idx
+
+    def _source_free(self, decision):
+        src_idx = self._source_tier(decision)
+        if src_idx is None or not self.max_per_source_device:
+            return True
+        limit = self.max_per_source_device * len(self.orchestrator.tiers[src_idx].devices)
+        return self._source_reads[src_idx] < limit
+
+    def _next_ready(self, pending):
+        """按顺序找第一个可以派发的任务的下标，没有则返回 None"""
+        blocked_dest = set()
+        for i, decision in enumerate(pending):
+            dest_idx = decision['dest_tier_idx']
+            if dest_idx in blocked_dest:
+                continue
+            if (decision['chunk_id'] in self._chunks_in_flight or not self._fits(decision)
+                    or not self._source_free(decision)):
+                blocked_dest.add(dest_idx)
+                continue
+            return i
+        return None
+
+    def _start(self, decision, result):
+        chunk_id, dest_idx = decision['chunk_id'], decision['dest_tier_idx']
+        reserve = CHUNK_SIZE_BYTES if 0 <= dest_idx < len(self.orchestrator.tiers) - 1 else 0
+        if reserve:
+            self._reserved_bytes[dest_idx] += reserve
+        src_idx = self._source_tier(decision)
+        if src_idx is not None:
+            self._source_reads[src_idx] += 1
+        self._chunks_in_flight.add(chunk_id)
+        self._in_flight += 1
+        result['max_in_flight'] = max(result['max_in_flight'], self._in_flight)
+        self.env.process(self._run_one(decision, reserve, src_idx, result))
+
+    def _run_one(self, decision, reserve, src_idx, result):
+        action = decision['action']
+        label = "Eviction" if action == 'evict' else "Promotion"
+        self._log(f"Attempting {label}: Chunk {decision['chunk_id']} from Tier {decision['src_tier_idx']} to Tier {decision['dest_tier_idx']}")
+        success = yield self.env.process(
+            self.orchestrator.execute_migration_command(
+                decision['chunk_id'], decision['src_tier_idx'], decision['dest_tier_idx'],
+                reason=f"{'eviction' if action == 'evict' else 'promotion'}_by_policy"
+            )
+        )
+        if success:
+            self._log(f"{label} SUCCEEDED for chunk {decision['chunk_id']}.")
+            result['succeeded'] += 1
+            if self._on_success is not None:
+                self._on_success(decision)
+        else:
+            self._log(f"{label} FAILED for chunk {decision['chunk_id']}.")
+            result['failed'] += 1
+        if reserve:
+            self._reserved_bytes[decision['dest_tier_idx']] -= reserve
+        if src_idx is not None:
+            self._source_reads[src_idx] -= 1
+        self._chunks_in_flight.discard(decision['chunk_id'])
+        self._in_flight -= 1
+        if self._wakeup is not None and not self._wakeup.triggered:
+            self._wakeup.succeed()
+
+    def execute(self, decisions):
+        """生成器：执行一个窗口的全部迁移任务，返回该窗口的统计 (含 makespan)"""
+        start_time = self.env.now
+        result = {'decision_time': start_time, 'tasks': len(decisions), 'succeeded': 0, 'failed': 0,
+                  'makespan_ms': 0.0, 'max_in_flight': 0}
+        pending = list(decisions)
+        while pending or self._in_flight:
+            while pending and self._in_flight < self.max_parallel:
+                i = self._next_ready(pending)
+                if i is None:
+                    if self._in_flight:
+                        break
+                    i = 0 # 没有在途迁移可以释放空间了，按串行语义直接执行队首任务
+                self._start(pending.pop(i), result)
+            if not self._in_flight:
+                continue
+            self._wakeup = self.env.event()
+            yield self._wakeup
+        self._wakeup = None
+        result['makespan_ms'] = self.env.now - start_time
+        self.window_stats.append(result)
+        return result
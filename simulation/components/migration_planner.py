@@ -0,0 +1,144 @@
+# components/migration_planner.py
+# 策略输出的迁移决策 -> 实际执行的迁移计划。位于 get_migration_decisions 和 MigrationExecutor 之间:
+#   - 按执行顺序 (先驱逐后提升) 把同一个chunk的多条决策串起来，并以 Orchestrator 的实际位置为起点:
+#       重复的决策、与实际位置不符 (执行时必然失败) 的决策直接丢弃；
+#       多跳 (如 2->1->0) 合并为一次直达迁移；最终回到起点 (如 0->1->0) 的整条链取消
+#   - 跨窗口: 记录每个chunk最近一次成功的迁移，第 w 个决策窗口迁出某层级的chunk在 MIGRATION_BOUNCE_HOLD_WINDOWS
+#     个窗口内又要迁回该层级 (来回抖动) 时，撤销这次迁回；0 (默认) 表示不做跨窗口抑制
+#   - 策略用 'paired_with' 标注成对的决策 (为提升腾位置的驱逐 + 这次提升)，成对的迁移作为一个整体:
+#     其中任何一个被抑制时两个都撤销，避免只驱逐不提升、白白写一次却空出没人用的位置
+# 节省的迁移流量只计算原本确实会发生的物理写 (按 chunk 大小计): 合并掉的中间跳、取消的整条链、抑制的抖动迁移。
+# 重复的决策 (执行时会因位置不符而失败，本来就没有I/O) 和干净chunk驱逐到 backing store (Orchestrator 本来就只更新位置)
+# 只计数。
+from config import CHUNK_SIZE_BYTES
+
+PLANNER_SAVING_KINDS = ('collapsed', 'cancelled', 'bounce')
+PLANNER_COUNTED_KINDS = ('duplicate', 'clean_eviction')
+
+
+class MigrationPlanner:
+    def __init__(self, orchestrator, bounce_hold_windows=0, log=None):
+        self.orchestrator = orchestrator
+        self.bounce_hold_windows = bounce_hold_windows
+        self._log = log or (lambda message: None)
+        self._last_move = {} # chunk_id -> (决策窗口序号, src_tier_idx, dest_tier_idx)，只记录成功的迁移
+        self._window = 0
+        self.stats = {'decisions_in': 0, 'migrations_out': 0, 'invalid': 0}
+        for kind in PLANNER_SAVING_KINDS:
+            self.stats[f'{kind}_moves'] = 0
+            self.stats[f'{kind}_bytes_saved'] = 0
+        for kind in PLANNER_COUNTED_KINDS:
+            self.stats[f'{kind}_moves'] = 0
+
+    @property
+    def bytes_saved(self):
+        return sum(self.stats[f'{kind}_bytes_saved'] for kind in PLANNER_SAVING_KINDS)
+
+    def _saved(self, kind, num_moves=1, num_writes=None):
+        self.stats[f'{kind}_moves'] += num_moves
+        self.stats[f'{kind}_bytes_saved'] += (num_moves if num_writes is None else num_writes) * CHUNK_SIZE_BYTES
+
+    def _chain_writes(self, chunk_id, start, dests):
+        """依次迁移到 dests 中各层级需要的物理写次数 (干净chunk驱逐到 backing store 不写)"""
+        backing_idx = len(self.orchestrator.tiers) - 1
+        dirty = self.orchestrator.tiers[start].is_dirty(chunk_id)
+        writes = 0
+        for dest in dests:
+            if dest == backing_idx:
+                writes += dirty
+                dirty = False
+            else:
+                writes += 1
+        return writes
+
+    def _pair_groups(self, decisions):
+        """按 'paired_with' 把chunk连成组 (并查集)，返回 chunk_id -> 组代表"""
+        parent = {}
+
+        def find(c):
+            parent.setdefault(c, c)
+            while parent[c] != c:
+                parent[c] = parent[parent[c]]
+                c = parent[c]
+            return c
+
+        for d in decisions:
+            partner = d.get('paired_with')
+            if partner is not None:
+                parent[find(d['chunk_id'])] = find(partner)
+        return {c: find(c) for c in parent}
+
+    def plan(self, decisions, window):
+        """
+        window 为本次决策所在的决策窗口序号 (decision_time // WINDOW_SIZE，无论该窗口有没有决策都在递增)。
+        返回按执行顺序排列的迁移列表 (先驱逐后提升，每个chunk至多一条)。
+        action 按最终方向重新标注：目标层级更快为 'promote'，否则为 'evict'。
+        """
+        self._window = window
+        self.stats['decisions_in'] += len(decisions)
+        ordered = [d for d in decisions if d['action'] == 'evict'] + [d for d in decisions if d['action'] != 'evict']
+        chains = {} # chunk_id -> 该chunk的决策 (按执行顺序)；dict 保持chunk首次出现的顺序
+        for d in ordered:
+            chains.setdefault(d['chunk_id'], []).append(d)
+
+        backing_idx = len(self.orchestrator.tiers) - 1
+        candidates = [] # (move, 是否物理写, 是否来回抖动)
+        for chunk_id, chain in chains.items():
+            start = self.orchestrator.chunk_locations.get(chunk_id)
+            location = start
+            dests = []
+            for d in chain:
+                if d['src_tier_idx'] != location or d['dest_tier_idx'] == location:
+                    if d['src_tier_idx'] == start and d['dest_tier_idx'] == location and location != start:
+                        self.stats['duplicate_moves'] += 1 # 与已规划的一跳完全相同
+                    else:
+                        self.stats['invalid'] += 1 # 执行时会因位置不符而失败，本来就没有I/O
+                    continue
+                location = d['dest_tier_idx']
+                dests.append(location)
+            if not dests:
+                continue
+            if location == start:
+                self._saved('cancelled', len(dests), self._chain_writes(chunk_id, start, dests))
+                continue
+            direct_writes = self._chain_writes(chunk_id, start, [location])
+            if len(dests) > 1:
+                self._saved('collapsed', len(dests) - 1, self._chain_writes(chunk_id, start, dests) - direct_writes)
+            last = self._last_move.get(chunk_id)
+            bounce = bool(self.bounce_hold_windows and last is not None and last[1] == location and last[2] == start
+                          and window - last[0] <= self.bounce_hold_windows)
+            move = dict(chain[0])
+            move['src_tier_idx'], move['dest_tier_idx'] = start, location
+            move['action'] = 'promote' if location < start else 'evict'
+            candidates.append((move, direct_writes, bounce))
+
+        # 成对的迁移整体撤销：组内任何一个是来回抖动，整组都不执行
+        groups = self._pair_groups(decisions)
+        held_groups = {groups[m['chunk_id']] for m, _, bounce in candidates if bounce and m['chunk_id'] in groups}
+        planned = []
+        for move, writes, bounce in candidates:
+            if bounce or groups.get(move['chunk_id'], object()) in held_groups:
+                self._saved('bounce', 1, writes)
+                continue
+            if move['dest_tier_idx'] == backing_idx and not writes:
+                self.stats['clean_eviction_moves'] += 1
+            planned.append(move)
+
+        self.stats['migrations_out'] += len(planned)
+        evictions = [m for m in planned if m['action'] == 'evict']
+        promotions = [m for m in planned if m['action'] == 'promote']
+        if len(planned) != len(decisions):
+            self._log(f"Planner: {len(decisions)} decisions -> {len(planned)} migrations "
+                      f"({len(evictions)} evictions, {len(promotions)} promotions).")
+        return evictions + promotions
+
+    def record_move(self, move):
+        """迁移成功后调用 (MigrationExecutor 的 on_success)，记录该chunk最近一次迁移用于抖动判断"""
+        self._last_move[move['chunk_id']] = (self._window, move['src_tier_idx'], move['dest_tier_idx'])
+
+    def summary(self):
+        """一行统计：输入决策数、输出迁移数和各类节省的流量"""
+        parts = [f"{kind} {self.stats[f'{kind}_moves']}" for kind in PLANNER_SAVING_KINDS + PLANNER_COUNTED_KINDS]
+        return (f"{self.stats['decisions_in']} decisions -> {self.stats['migrations_out']} migrations, "
+                f"{self.bytes_saved / 2**20:.0f} MB of migration writes saved ({', '.join(parts)}; "
+                f"{self.stats['invalid']} stale decisions dropped)")
@@ -1,15 +1,17 @@
 # components/orchestrator.py
-import simpy
 from config import TOTAL_CHUNKS, CHUNK_SIZE_BYTES, LOGS_DIR # 确保导入 LOGS_DIR
 import os # 新增导入
 import time
+from components.chunk_location_map import ChunkLocationMap
+from components.sim_env import sim_module
 
 class Orchestrator:
     def __init__(self, env, tiers, request_generator_ref=None):
         self.env = env
         self.tiers = tiers
         self.request_generator_ref = request_generator_ref
-        self.chunk_locations = {i: len(tiers) - 1 for i in range(TOTAL_CHUNKS)}
+        # chunk_id -> 层级下标，I/O 路径和迁移都以它为准；初始所有chunk都在底层
+        self.chunk_locations = ChunkLocationMap(TOTAL_CHUNKS, len(tiers) - 1)
 
         # --- 日志文件设置 ---
         if not os.path.exists(LOGS_DIR):
@@ -19,9 +21,13 @@ class Orchestrator:
             f.write(f"--- Orchestrator Log Started at SimTime {self.env.now:.2f} ---\n")
         # --- 日志文件设置结束 ---
 
+        self.write_buffer = None # 可选的写回缓冲 (WriteBackBuffer)，见 set_write_buffer
+        self.write_buffer_tier_idx = None
+
+        self.bottom_tier_populated = False
         self.initialization_process = env.process(self._initialize_bottom_tier_chunks_instant())
-        self.io_queue = simpy.Store(env)
-        self.migration_queue = simpy.Store(env)
+        self.io_queue = sim_module(env).Store(env)
+        self.migration_queue = sim_module(env).Store(env)
 
 
     def _log(self, message):
@@ -30,20 +36,51 @@ class Orchestrator:
             f.write(f"[Orchestrator {self.env.now:.2f}] {message}\n")
 
     def _initialize_bottom_tier_chunks_instant(self):
+        self.populate_bottom_tier()
+        yield self.env.timeout(0)
+
+    def populate_bottom_tier(self):
+        """
+        底层 backing store 隐式持有所有尚未放到其他层级的chunk (只执行一次)；快进策略状态时需要在模拟开始前调用。
+        用位图表示成员关系和脏标记，不再为每个chunk创建元数据，启动是 O(1) 的。
+        """
+        if self.bottom_tier_populated:
+            return
+        self.bottom_tier_populated = True
         self._log(f"Starting initial (instant) population of bottom tier metadata...")
         bottom_tier_idx = len(self.tiers) - 1
         bottom_tier = self.tiers[bottom_tier_idx]
-        for chunk_id in self.chunk_locations:
-            if self.chunk_locations[chunk_id] == bottom_tier_idx:
-                success = bottom_tier._add_initial_chunk_metadata(chunk_id, is_dirty=False)
-                if not success:
-                    self._log(f"CRITICAL ERROR during initial population of chunk {chunk_id} in {bottom_tier.name}")
-        self._log(f"Finished initial (instant) population of bottom tier metadata.")
-        yield self.env.timeout(0)
+        bottom_tier.use_bitmap_membership(TOTAL_CHUNKS, fill=True)
+        for chunk_id in self.chunk_locations.moved_chunks().tolist(): # 填充前已经放到其他层级的chunk
+            bottom_tier.remove_chunk(chunk_id)
+        self._log(f"Finished initial (instant) population of bottom tier metadata ({bottom_tier.num_chunks} chunks).")
 
     def set_request_generator(self, rg_ref):
         self.request_generator_ref = rg_ref
 
+    def set_write_buffer(self, write_buffer, buffer_tier_idx):
+        self.write_buffer = write_buffer
+        self.write_buffer_tier_idx = buffer_tier_idx
+
+    def _route_io(self, request, chunk_id, target_tier_idx):
+        """
+        写回缓冲开启时，落在 backing store 上的小写、以及被缓冲完整覆盖的读改由缓冲所在层级服务。
+        返回 (服务该I/O的层级下标, 是否经过缓冲)。
+        """
+        if self.write_buffer is None or target_tier_idx != len(self.tiers) - 1:
+            return target_tier_idx, False
+        if request.req_type == 'write':
+            hit = self.write_buffer.try_absorb(request.lba, request.size_bytes, chunk_id)
+        else:
+            hit = self.write_buffer.covers_read(request.lba, request.size_bytes)
+        return (self.write_buffer_tier_idx, True) if hit else (target_tier_idx, False)
+
+    def _take_buffered_data(self, chunk_id, src_tier_idx):
+        """chunk 迁出 backing store 时带走它在写回缓冲中的数据；有缓冲数据时返回 True (目标层级应标记为脏)"""
+        if self.write_buffer is None or src_tier_idx != len(self.tiers) - 1:
+            return False
+        return self.write_buffer.migrate_chunk_away(chunk_id)
+
     def get_chunk_location_tier(self, chunk_id):
         # ... (不变)
         tier_idx = self.chunk_locations.get(chunk_id)
@@ -51,6 +88,34 @@ class Orchestrator:
             return self.tiers[tier_idx]
         return None
 
+    def _locate_chunk_tier_idx(self, chunk_id):
+        """O(1) 查位置表；chunk 超出地址空间时返回 -1"""
+        return self.chunk_locations.get(chunk_id, -1)
+
+    def dispatch_io_request(self, request):
+        """
+        handle_io_request 的无进程版本 (用于合并到达调度模式)：
+        简单I/O直接通过设备的事件回调完成，不为每个请求创建生成器进程，也不嵌套 device.access 进程。
+        """
+        chunk_id, _ = request.get_chunk_id_and_offset()
+        target_tier_idx = self._locate_chunk_tier_idx(chunk_id)
+        if target_tier_idx == -1:
+            if self.request_generator_ref:
+                self.request_generator_ref.log_completion(request)
+            return
+        serve_tier_idx, buffered = self._route_io(request, chunk_id, target_tier_idx)
+        serve_tier = self.tiers[serve_tier_idx]
+        device = serve_tier.get_device(request.lba)
+        device.serve_async(request.size_bytes, request.req_type,
+                           lambda: self._complete_io_request(request, serve_tier_idx, chunk_id, buffered),
+                           lba=serve_tier.device_lba(request.lba))
+
+    def _complete_io_request(self, request, target_tier_idx, chunk_id, buffered=False):
+        if request.req_type == 'write' and not buffered: # 缓冲的写由 destager 刷回时再标记 backing store 中的chunk
+            self.tiers[target_tier_idx].set_dirty(chunk_id)
+        if self.request_generator_ref:
+            self.request_generator_ref.log_completion(request, target_tier_idx)
+
     def handle_io_request(self, request):
         # ... (这个方法中的 print 暂时可以保留在终端，或者您也可以选择将其写入 orchestrator.log)
         # 如果要写入日志，取消下面一行的注释，并替换掉其他 print
@@ -58,11 +123,7 @@ class Orchestrator:
         current_time = self.env.now # 在 Orchestrator 中定义 log_prefix 不是实例变量，所以这里重新获取
         # ... (原有的 handle_io_request 逻辑，如果需要详细日志，可以将内部print改为self._log)
         chunk_id, _ = request.get_chunk_id_and_offset()
-        target_tier_idx = -1
-        for i, tier in enumerate(self.tiers):
-            if tier.has_chunk(chunk_id):
-                target_tier_idx = i
-                break
+        target_tier_idx = self._locate_chunk_tier_idx(chunk_id)
 
         if target_tier_idx == -1:
             # print(f"[Orchestrator {current_time:.2f}] CRITICAL ERROR: Chunk {chunk_id} (LBA {request.lba}) not found in any tier!") # 保持这个重要错误在终端
@@ -70,20 +131,39 @@ class Orchestrator:
                  self.request_generator_ref.log_completion(request)
             return
 
-        target_tier = self.tiers[target_tier_idx]
-        device = target_tier.get_device()
-        with device.resource.request() as dev_req:
-            yield dev_req
-            yield self.env.process(device.access(request.size_bytes, request.req_type))
+        serve_tier_idx, buffered = self._route_io(request, chunk_id, target_tier_idx)
+        serve_tier = self.tiers[serve_tier_idx]
+        device = serve_tier.get_device(request.lba)
+        yield from device.serve(request.size_bytes, request.req_type, lba=serve_tier.device_lba(request.lba))
 
-        if request.req_type == 'write':
-            current_chunk_meta = target_tier.get_chunk_meta(chunk_id)
-            if current_chunk_meta:
-                current_chunk_meta['dirty'] = True
+        self._complete_io_request(request, serve_tier_idx, chunk_id, buffered)
 
-        if self.request_generator_ref:
-            self.request_generator_ref.log_completion(request)
 
+    def apply_migration_instant(self, chunk_id, src_tier_idx, dest_tier_idx):
+        """
+        只更新元数据的"瞬时"迁移，不模拟任何设备IO (用于快进策略状态)。
+        空间不足、位置不一致等情况与 execute_migration_command 一样直接放弃，返回 False。
+        """
+        if not (0 <= src_tier_idx < len(self.tiers) and 0 <= dest_tier_idx < len(self.tiers)):
+            return False
+        if src_tier_idx == dest_tier_idx or self.chunk_locations.get(chunk_id) != src_tier_idx:
+            return False
+        src_tier = self.tiers[src_tier_idx]
+        dest_tier = self.tiers[dest_tier_idx]
+        is_moving_to_backing_store = (dest_tier_idx == len(self.tiers) - 1)
+        if not is_moving_to_backing_store and dest_tier.get_free_space() < CHUNK_SIZE_BYTES:
+            return False
+        chunk_meta = src_tier.remove_chunk(chunk_id)
+        if chunk_meta is None:
+            return False
+        is_dirty = self._take_buffered_data(chunk_id, src_tier_idx) or chunk_meta['dirty']
+        dest_is_dirty = False if is_moving_to_backing_store else is_dirty
+        if dest_tier.has_chunk(chunk_id):
+            dest_tier.set_dirty(chunk_id, dest_is_dirty)
+        else:
+            dest_tier._add_initial_chunk_metadata(chunk_id, is_dirty=dest_is_dirty)
+        self.chunk_locations[chunk_id] = dest_tier_idx
+        return True
 
     def execute_migration_command(self, chunk_id, src_tier_idx, dest_tier_idx, is_eviction_for_new_chunk=False, reason="unknown"): # 添加 reason
         current_time = self.env.now # 获取当前模拟时间
@@ -113,6 +193,17 @@ class Orchestrator:
                 self._log(f"Migration FAILED: Dest Tier {dest_tier.name} has NO SPACE for chunk {chunk_id}.")
                 return False
 
+        # 干净chunk驱逐到 backing store 只更新位置；其余迁移先从源层级读出整个chunk (同样经过源层级的限速令牌桶、
+        # 以迁移优先级排队)，再写入目标层级
+        if not (is_moving_to_backing_store and src_tier_idx < dest_tier_idx and not src_tier.is_dirty(chunk_id)):
+            self._log(f"Reading chunk {chunk_id} from {src_tier.name}...")
+            if (yield self.env.process(src_tier.read_chunk(chunk_id))) is None:
+                self._log(f"Migration FAILED: Could not read chunk {chunk_id} from {src_tier.name}.")
+                return False
+            if not is_moving_to_backing_store and dest_tier.get_free_space() < CHUNK_SIZE_BYTES:
+                self._log(f"Migration FAILED: Dest Tier {dest_tier.name} ran out of space while chunk {chunk_id} was being read.")
+                return False
+
         self._log(f"Removing chunk {chunk_id} from {src_tier.name}...")
         chunk_meta = src_tier.remove_chunk(chunk_id)
         if chunk_meta is None:
@@ -120,6 +211,9 @@ class Orchestrator:
             return False
         self._log(f"Chunk {chunk_id} removed from {src_tier.name}. Meta: {chunk_meta}")
         is_dirty = chunk_meta['dirty']
+        if self._take_buffered_data(chunk_id, src_tier_idx):
+            self._log(f"Chunk {chunk_id} had data in the write-back buffer; it moves with the chunk (dirty).")
+            is_dirty = True
 
         if is_moving_to_backing_store and not is_dirty and src_tier_idx < dest_tier_idx:
             self._log(f"Clean chunk {chunk_id} evicted to backing store {dest_tier.name}. No physical write to dest.")
@@ -129,8 +223,7 @@ class Orchestrator:
             if not dest_tier.has_chunk(chunk_id): # 如果由于某种原因它不在，则添加（作为初始存在）
                 dest_tier._add_initial_chunk_metadata(chunk_id, is_dirty=False)
             else: # 如果在，确保它是干净的
-                dest_tier_meta = dest_tier.get_chunk_meta(chunk_id)
-                if dest_tier_meta: dest_tier_meta['dirty'] = False
+                dest_tier.set_dirty(chunk_id, False)
 
             self.chunk_locations[chunk_id] = dest_tier_idx
             self._log(f"Migration SUCCEEDED (logical for clean chunk {chunk_id} to backing store). Location updated to Tier {dest_tier_idx}.")
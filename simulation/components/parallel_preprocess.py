@@ -0,0 +1,94 @@
+# components/parallel_preprocess.py
+# 并行预处理：把一个大的trace CSV 按行边界切成若干字节区间，每个区间在独立的工作进程中
+# 用现有的 MSRTraceParser / Systor17Parser 批量解析，得到的列分片按文件顺序拼接成预处理缓存 (见 trace_cache.py)。
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+from components.trace_parser import get_parser, TraceBatch
+from components.trace_cache import write_trace_cache, trace_cache_key, trace_cache_path
+
+_SHARD_COLUMNS = ('timestamp_ms', 'lba', 'size_bytes', 'is_write', 'disk')
+
+
+def split_byte_ranges(trace_file_path: str, num_ranges: int) -> List[Tuple[int, int]]:
+    """把文件切成最多 num_ranges 个 [start, end) 字节区间，每个区间都从某一行的行首开始"""
+    file_size = os.path.getsize(trace_file_path)
+    boundaries = [0]
+    with open(trace_file_path, 'rb') as f:
+        for i in range(1, num_ranges):
+            target = file_size * i // num_ranges
+            if target <= boundaries[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline() # 跳到下一个行首 (若 target 恰好是行首，则 target-1 处是换行符)
+            pos = f.tell()
+            if boundaries[-1] < pos < file_size:
+                boundaries.append(pos)
+    boundaries.append(file_size)
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+
+def _parse_range(task: Dict[str, Any]) -> Dict[str, Any]:
+    """工作进程：解析一个字节区间，把各列写成分片文件，返回统计信息"""
+    start_time = time.time()
+    # 文本解析器，不使用缓存；只有从文件开头开始的区间才会消费头部
+    parser = get_parser(task['trace_format'], task['format_options'])
+    shard_parts = list(parser.iter_batches(task['trace_file_path'], task['batch_lines'],
+                                           byte_range=(task['start'], task['end'])))
+    num_lines = parser.lines_read
+
+    shard = TraceBatch.concat(shard_parts)
+    shard_prefix = os.path.join(task['shard_dir'], f"shard{task['shard_idx']:05d}")
+    for name in _SHARD_COLUMNS:
+        np.save(f"{shard_prefix}.{name}.npy", getattr(shard, name))
+    has_host = shard.hostname is not None
+    if has_host:
+        np.save(f"{shard_prefix}.hostname.npy", shard.hostname.astype(str))
+    elapsed = time.time() - start_time
+    return {'shard_idx': task['shard_idx'], 'shard_prefix': shard_prefix, 'has_host': has_host,
+            'lines': num_lines, 'records': len(shard), 'elapsed_s': elapsed,
+            'bytes': task['end'] - task['start'], 'pid': os.getpid()}
+
+
+def _load_shard(result: Dict[str, Any]) -> TraceBatch:
+    prefix = result['shard_prefix']
+    cols = {name: np.load(f"{prefix}.{name}.npy", mmap_mode='r') for name in _SHARD_COLUMNS}
+    hostname = np.load(f"{prefix}.hostname.npy").astype(object) if result['has_host'] else None
+    return TraceBatch(hostname=hostname, **cols)
+
+
+def parallel_build_trace_cache(trace_file_path: str, trace_format: str, format_options: Optional[Dict],
+                               num_workers: int, batch_lines: int) -> Dict[str, Any]:
+    """
+    并行构建预处理缓存。分片按字节区间顺序拼接，因此输出记录顺序与串行解析完全一致；
+    头部 (has_header) 和无效行由同一个解析器逻辑处理。返回缓存 header，其中附带每个工作进程的统计。
+    """
+    ranges = split_byte_ranges(trace_file_path, num_workers)
+    cache_path = trace_cache_path(trace_file_path, trace_format)
+    key = trace_cache_key(trace_file_path, trace_format, format_options)
+    shard_dir = tempfile.mkdtemp(prefix=".trc_shards_", dir=os.path.dirname(os.path.abspath(cache_path)))
+    try:
+        tasks = [{'trace_file_path': trace_file_path, 'trace_format': trace_format,
+                  'format_options': format_options or {}, 'start': start, 'end': end,
+                  'batch_lines': batch_lines, 'shard_dir': shard_dir, 'shard_idx': i}
+                 for i, (start, end) in enumerate(ranges)]
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            results = list(pool.map(_parse_range, tasks))
+
+        worker_stats = []
+        for r in results:
+            lines_per_s = r['lines'] / r['elapsed_s'] if r['elapsed_s'] > 0 else float('inf')
+            worker_stats.append({'shard': r['shard_idx'], 'pid': r['pid'], 'bytes': r['bytes'],
+                                 'lines': r['lines'], 'records': r['records'],
+                                 'elapsed_s': round(r['elapsed_s'], 3), 'lines_per_s': round(lines_per_s, 1)})
+        header = write_trace_cache(cache_path, (_load_shard(r) for r in results), key)
+        header['worker_stats'] = worker_stats
+        return header
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
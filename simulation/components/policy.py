@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 from config import CHUNK_SIZE_BYTES, LOGS_DIR , TOTAL_CHUNKS# 确保导入 LOGS_DIR
 import os # 新增导入
 import time # 用于时间戳文件名或日志条目
+import numpy as np
 
 class BasePolicy(ABC):
     def __init__(self, env, orchestrator, tiers, config):
@@ -14,8 +15,20 @@ class BasePolicy(ABC):
 
     @abstractmethod
     def get_migration_decisions(self, current_time, chunk_access_log_since_last_decision):
+        """
+        chunk_access_log_since_last_decision 是 AccessLogWindow：times / chunk_ids / is_write / sizes 四个 NumPy 列。
+        返回决策列表，每项为 {'action', 'chunk_id', 'src_tier_idx', 'dest_tier_idx'}；为提升腾位置的驱逐和这次提升
+        互相用 'paired_with' 标注对方的 chunk_id，MigrationPlanner 会把这样的一对作为整体保留或撤销。
+        """
         pass
 
+    @staticmethod
+    def window_chunk_counts(access_window):
+        """窗口内每个chunk的访问次数，按chunk在窗口中首次出现的顺序返回 (chunk_ids, counts)"""
+        chunk_ids, first_idx, counts = np.unique(access_window.chunk_ids, return_index=True, return_counts=True)
+        order = np.argsort(first_idx, kind='stable')
+        return chunk_ids[order], counts[order]
+
 class SimpleLFUPolicy(BasePolicy):
     def __init__(self, env, orchestrator, tiers, config):
         super().__init__(env, orchestrator, tiers, config)
@@ -39,11 +52,12 @@ class SimpleLFUPolicy(BasePolicy):
         # 使用 self.env.now 获取当前模拟时间用于日志条目
         self._log(f"--- Evaluating Migration Decisions ---")
         self._log(f"Received {len(chunk_access_log_since_last_decision)} access records for this window.")
-        if chunk_access_log_since_last_decision:
-            self._log(f"Sample access log (first 5): {chunk_access_log_since_last_decision[:5]}")
+        if len(chunk_access_log_since_last_decision):
+            self._log(f"Sample access log (first 5): {chunk_access_log_since_last_decision.head(5)}")
 
-        for _, chunk_id, _, _ in chunk_access_log_since_last_decision:
-            self.chunk_frequencies[chunk_id] = self.chunk_frequencies.get(chunk_id, 0) + 1
+        chunk_ids, counts = self.window_chunk_counts(chunk_access_log_since_last_decision)
+        for chunk_id, count in zip(chunk_ids.tolist(), counts.tolist()):
+            self.chunk_frequencies[chunk_id] = self.chunk_frequencies.get(chunk_id, 0) + count
 
         if self.chunk_frequencies:
             self._log(f"Total unique chunks with frequency info: {len(self.chunk_frequencies)}")
@@ -58,7 +72,7 @@ class SimpleLFUPolicy(BasePolicy):
         tier0_capacity_chunks = tier1.capacity_bytes // CHUNK_SIZE_BYTES
 
         tier1_chunks_with_freq = []
-        for t1_cid in tier1.chunks.keys():
+        for t1_cid in tier1.chunk_ids():
             tier1_chunks_with_freq.append((t1_cid, self.chunk_frequencies.get(t1_cid, 0)))
         tier1_chunks_with_freq.sort(key=lambda x: x[1])
 
@@ -82,9 +96,9 @@ class SimpleLFUPolicy(BasePolicy):
                         evict_candidate_chunk_id, evict_candidate_freq = tier1_chunks_with_freq[0]
                         if evict_candidate_freq < freq :
                             self._log(f"Decision: Tier 1 full. Evict chunk {evict_candidate_chunk_id} (freq {evict_candidate_freq}) from Tier 0 to Tier 1 (dest_tier_idx=1).")
-                            migrations.append({'action': 'evict', 'chunk_id': evict_candidate_chunk_id, 'src_tier_idx': 0, 'dest_tier_idx': 1})
+                            migrations.append({'action': 'evict', 'chunk_id': evict_candidate_chunk_id, 'src_tier_idx': 0, 'dest_tier_idx': 1, 'paired_with': chunk_id})
                             self._log(f"Decision: Promote chunk {chunk_id} (freq {freq}) from Tier {current_loc_idx} to Tier 0 after eviction.")
-                            migrations.append({'action': 'promote', 'chunk_id': chunk_id, 'src_tier_idx': current_loc_idx, 'dest_tier_idx': 0})
+                            migrations.append({'action': 'promote', 'chunk_id': chunk_id, 'src_tier_idx': current_loc_idx, 'dest_tier_idx': 0, 'paired_with': evict_candidate_chunk_id})
                             tier1_chunks_with_freq.pop(0)
                         else:
                             self._log(f"Tier 1 full, but candidate chunk {chunk_id} (freq {freq}) is not hotter than LFU in Tier 1 (chunk {evict_candidate_chunk_id} has freq {evict_candidate_freq}). No promotion.")
@@ -101,7 +115,8 @@ class SimpleLFUPolicy(BasePolicy):
 
 class Migration_more_LFUPolicy(BasePolicy):
     # 迁移策略过于激进， 迁移本身有对设备的读写延迟，同时这段时间占据设备，进而增加IO请求的延迟
-    # 当前模拟环境 IO请求 和 数据迁移 平等竞争设备
+    # 原先 IO请求 和 数据迁移 平等竞争设备；现在设备队列默认前台优先 (DEVICE_PRIORITY_SCHEDULING)，
+    # 迁移带宽可以在 TIER_CONFIGS 中按层级限速 (migration_bandwidth_MBps)
     # 平均延迟能高达 10ms+
     # 即使所有IO请求访问tier3也不过4 - 5 ms而已
     def __init__(self, env, orchestrator, tiers, config):
@@ -162,11 +177,13 @@ class Migration_more_LFUPolicy(BasePolicy):
         self._log(f"Received {len(chunk_access_log_since_last_decision)} access records for this window.")
 
         # 1. Update global chunk frequencies
-        for _, chunk_id, _, _ in chunk_access_log_since_last_decision:
-            if 0 <= chunk_id < TOTAL_CHUNKS:
-                self.chunk_frequencies[chunk_id] = self.chunk_frequencies.get(chunk_id, 0) + 1
-            else:
-                self._log(f"WARNING: Invalid chunk_id {chunk_id} in access log. Max expected: {TOTAL_CHUNKS-1}. Skipping.")
+        chunk_ids, counts = self.window_chunk_counts(chunk_access_log_since_last_decision)
+        valid = (chunk_ids >= 0) & (chunk_ids < TOTAL_CHUNKS)
+        if not valid.all():
+            self._log(f"WARNING: {int(counts[~valid].sum())} accesses to invalid chunk_ids {chunk_ids[~valid][:5].tolist()}... "
+                      f"in access log. Max expected: {TOTAL_CHUNKS-1}. Skipping.")
+        for chunk_id, count in zip(chunk_ids[valid].tolist(), counts[valid].tolist()):
+            self.chunk_frequencies[chunk_id] = self.chunk_frequencies.get(chunk_id, 0) + count
 
         if not self.chunk_frequencies:
             self._log(f"No frequency data available. No migration decisions.")
@@ -193,8 +210,8 @@ class Migration_more_LFUPolicy(BasePolicy):
 
         # Get current occupants of Tier 0 and their frequencies (coldest first)
         tier0_occupants_cids = [
-            cid for cid, loc_idx in self.orchestrator.chunk_locations.items()
-            if loc_idx == self.TIER_0_IDX and 0 <= cid < TOTAL_CHUNKS
+            cid for cid in self.orchestrator.chunk_locations.chunks_in_tier(self.TIER_0_IDX).tolist()
+            if 0 <= cid < TOTAL_CHUNKS
         ]
         tier0_lfu_candidates = sorted(
             [(cid, self.chunk_frequencies.get(cid, 0)) for cid in tier0_occupants_cids],
@@ -245,12 +262,12 @@ class Migration_more_LFUPolicy(BasePolicy):
                         self._log(f"    Tier {self.TIER_0_IDX} full. Candidate Chunk {chunk_id} (freq {freq}) is hotter than LFU Chunk {lfu_evict_candidate_id} (freq {lfu_evict_candidate_freq}) in Tier {self.TIER_0_IDX}.")
                         if self.TIER_1_IDX != -1: # Check if Tier 1 is valid
                             self._log(f"      DECISION (Evict from Tier {self.TIER_0_IDX}): LFU Chunk {lfu_evict_candidate_id} to Tier {self.TIER_1_IDX}.")
-                            migrations.append({'action': 'evict', 'chunk_id': lfu_evict_candidate_id, 'src_tier_idx': self.TIER_0_IDX, 'dest_tier_idx': self.TIER_1_IDX})
+                            migrations.append({'action': 'evict', 'chunk_id': lfu_evict_candidate_id, 'src_tier_idx': self.TIER_0_IDX, 'dest_tier_idx': self.TIER_1_IDX, 'paired_with': chunk_id})
                             pending_chunk_destinations[lfu_evict_candidate_id] = self.TIER_1_IDX
                             tier0_lfu_candidates.pop(0) # Removed from LFU list for this cycle
 
                             self._log(f"      DECISION (Promote to Tier {self.TIER_0_IDX}): Chunk {chunk_id} from Tier {current_loc_idx} after eviction.")
-                            migrations.append({'action': 'promote', 'chunk_id': chunk_id, 'src_tier_idx': current_loc_idx, 'dest_tier_idx': self.TIER_0_IDX})
+                            migrations.append({'action': 'promote', 'chunk_id': chunk_id, 'src_tier_idx': current_loc_idx, 'dest_tier_idx': self.TIER_0_IDX, 'paired_with': lfu_evict_candidate_id})
                             pending_chunk_destinations[chunk_id] = self.TIER_0_IDX
                         else:
                             self._log(f"    BLOCK Tier0 Promote: Tier {self.TIER_0_IDX} full, LFU Chunk {lfu_evict_candidate_id} needs eviction, but no valid Tier {self.TIER_1_IDX} to evict to.")
@@ -271,8 +288,11 @@ class Migration_more_LFUPolicy(BasePolicy):
 
             # Get current occupants of Tier 1, EXCLUDING those just decided for promotion to Tier 0,
             # BUT INCLUDING those just decided for eviction from Tier 0 (now notionally in Tier 1).
+            # 只需检查当前在 Tier 1 的chunk和有待定迁移的chunk，结果按 chunk_id 升序 (与逐个扫描地址空间的顺序一致)
+            candidate_cids = set(self.orchestrator.chunk_locations.chunks_in_tier(self.TIER_1_IDX).tolist())
+            candidate_cids.update(cid for cid in pending_chunk_destinations if 0 <= cid < TOTAL_CHUNKS)
             tier1_effective_occupants_cids = []
-            for cid_loop in range(TOTAL_CHUNKS):
+            for cid_loop in sorted(candidate_cids):
                 current_loc = self.orchestrator.chunk_locations.get(cid_loop)
                 pending_dest = pending_chunk_destinations.get(cid_loop)
 
@@ -342,12 +362,12 @@ class Migration_more_LFUPolicy(BasePolicy):
                             self._log(f"    Tier {self.TIER_1_IDX} full. Candidate Chunk {chunk_id} (freq {freq}) is hotter than LFU Chunk {lfu1_evict_candidate_id} (freq {lfu1_evict_candidate_freq}) in Tier {self.TIER_1_IDX}.")
                             if self.TIER_2_IDX != -1: # Check if Tier 2 is valid
                                 self._log(f"      DECISION (Evict from Tier {self.TIER_1_IDX}): LFU Chunk {lfu1_evict_candidate_id} to Tier {self.TIER_2_IDX}.")
-                                migrations.append({'action': 'evict', 'chunk_id': lfu1_evict_candidate_id, 'src_tier_idx': self.TIER_1_IDX, 'dest_tier_idx': self.TIER_2_IDX})
+                                migrations.append({'action': 'evict', 'chunk_id': lfu1_evict_candidate_id, 'src_tier_idx': self.TIER_1_IDX, 'dest_tier_idx': self.TIER_2_IDX, 'paired_with': chunk_id})
                                 pending_chunk_destinations[lfu1_evict_candidate_id] = self.TIER_2_IDX
                                 tier1_lfu_candidates.pop(0)
 
                                 self._log(f"      DECISION (Promote to Tier {self.TIER_1_IDX}): Chunk {chunk_id} from Tier {current_loc_idx} after eviction.")
-                                migrations.append({'action': 'promote', 'chunk_id': chunk_id, 'src_tier_idx': current_loc_idx, 'dest_tier_idx': self.TIER_1_IDX})
+                                migrations.append({'action': 'promote', 'chunk_id': chunk_id, 'src_tier_idx': current_loc_idx, 'dest_tier_idx': self.TIER_1_IDX, 'paired_with': lfu1_evict_candidate_id})
                                 pending_chunk_destinations[chunk_id] = self.TIER_1_IDX
                             else:
                                 self._log(f"    BLOCK Tier1 Promote: Tier {self.TIER_1_IDX} full, LFU Chunk {lfu1_evict_candidate_id} needs eviction, but no valid Tier {self.TIER_2_IDX} to evict to.")
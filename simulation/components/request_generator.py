@@ -1,15 +1,30 @@
 # components/request_generator.py
 import simpy
+import itertools
+from collections import deque, defaultdict
+import numpy as np
 # import csv # 不再直接使用csv，除非解析器内部需要
 from config import LBA_SIZE_BYTES, LBAS_PER_CHUNK, CHUNK_SIZE_BYTES, SIMULATION_TIME
-from config import TRACE_FORMAT, TRACE_FORMAT_OPTIONS # 新增导入
-from components.trace_parser import get_parser, RawTraceEntry # 新增导入
+from config import TRACE_FORMAT, TRACE_FORMAT_OPTIONS, TRACE_BATCH_LINES, VOLUME_LBA_SPAN # 新增导入
+from config import REPLAY_WINDOW_MS, REPLAY_FAST_FORWARD_SPAN_MS
+from config import ARRIVAL_SCHEDULING, ARRIVAL_COALESCE_EPSILON_MS, COMPLETION_STORE_INITIAL_CAPACITY
+from config import COMPLETION_STORE_ENABLED, WINDOW_SIZE
+from config import REPLAY_MODE, REPLAY_SPEEDUP, CLOSED_LOOP_QUEUE_DEPTH, CLOSED_LOOP_MAX_PENDING
+from config import ACCESS_LOG_INITIAL_CAPACITY
+from components.trace_parser import get_parser
+from components.trace_merge import MergedTraceSource
+from components.completion_store import CompletionStore
+from components.latency_histogram import LatencyRecorder
+from components.access_log import ChunkAccessLog
 
-class Request: # (这个类可以保持和之前MSR版本类似)
-    def __init__(self, req_id, timestamp_orig_raw, # 可以存储最原始的时间戳字符串/数字
+class Request:
+    """在途请求。只保留服务和统计需要的字段 (__slots__，无实例字典)，完成后的信息写入 CompletionStore"""
+    __slots__ = ('id', 'timestamp_orig_raw', 'lba', 'size_bytes', 'req_type', 'arrival_time_in_sim',
+                 'hostname', 'disk_num', 'completion_time_in_sim', 'latency')
+
+    def __init__(self, req_id, timestamp_orig_raw, # 批量路径中已标准化为毫秒
                  lba, size_bytes, req_type, arrival_time_in_sim,
-                 hostname=None, disk_num=None, orig_response_time_raw=None,
-                 extra_fields=None):
+                 hostname=None, disk_num=None):
         self.id = req_id
         self.timestamp_orig_raw = timestamp_orig_raw
         self.lba = lba
@@ -19,8 +34,6 @@ class Request: # (这个类可以保持和之前MSR版本类似)
 
         self.hostname = hostname
         self.disk_num = disk_num
-        self.orig_response_time_raw = orig_response_time_raw
-        self.extra_fields = extra_fields if extra_fields else {}
 
         self.completion_time_in_sim = -1
         self.latency = -1
@@ -31,126 +44,311 @@ class Request: # (这个类可以保持和之前MSR版本类似)
         return chunk_id, offset_in_chunk_lbas
 
 class RequestGenerator:
-    def __init__(self, env, orchestrator, trace_file_path, total_chunks):
+    def __init__(self, env, orchestrator, trace_file_path, total_chunks,
+                 arrival_scheduling=None, coalesce_epsilon_ms=None,
+                 replay_mode=None, replay_speedup=None, queue_depth=None):
         self.env = env
         self.orchestrator = orchestrator
-        self.trace_file_path = trace_file_path
+        # trace_file_path 可以是单个路径，也可以是多个按卷划分的trace文件列表 (按时间归并回放)
+        if isinstance(trace_file_path, str):
+            self.trace_file_paths = [trace_file_path]
+        else:
+            self.trace_file_paths = list(trace_file_path)
+        self.trace_file_path = self.trace_file_paths[0]
         self.total_chunks = total_chunks
 
         # 初始化选择的解析器
         parser_options = TRACE_FORMAT_OPTIONS.get(TRACE_FORMAT, {})
-        self.parser = get_parser(TRACE_FORMAT, parser_options)
+        if len(self.trace_file_paths) > 1:
+            self.parser = MergedTraceSource(self.trace_file_paths, TRACE_FORMAT, parser_options,
+                                            volume_lba_span=VOLUME_LBA_SPAN)
+        else:
+            self.parser = get_parser(TRACE_FORMAT, parser_options, trace_file_path=self.trace_file_path)
+
+        self.arrival_scheduling = arrival_scheduling or ARRIVAL_SCHEDULING
+        if self.arrival_scheduling not in ("per_request", "coalesced"):
+            raise ValueError(f"Unknown arrival scheduling mode: {self.arrival_scheduling}")
+        self.coalesce_epsilon_ms = ARRIVAL_COALESCE_EPSILON_MS if coalesce_epsilon_ms is None else coalesce_epsilon_ms
+        self.arrival_wakeups = 0 # 生成器被唤醒 (timeout) 的次数
+
+        # 回放模式: open_loop 按trace到达时间 (可用 replay_speedup 压缩间隔)；closed_loop 每个卷保持固定数量的在途I/O
+        self.replay_mode = replay_mode or REPLAY_MODE
+        if self.replay_mode not in ("open_loop", "closed_loop"):
+            raise ValueError(f"Unknown replay mode: {self.replay_mode}")
+        self.replay_speedup = REPLAY_SPEEDUP if replay_speedup is None else replay_speedup
+        if self.replay_speedup <= 0:
+            raise ValueError(f"REPLAY_SPEEDUP must be positive, got {self.replay_speedup}")
+        self.queue_depth = CLOSED_LOOP_QUEUE_DEPTH if queue_depth is None else queue_depth
+        # 吞吐量统计
+        self.first_arrival_ms = None
+        self.last_completion_ms = None
+        self.completed_bytes = 0
 
         self.action = env.process(self.run())
         self.requests_generated = 0
-        self.latencies = []
+        self.completions = CompletionStore(COMPLETION_STORE_INITIAL_CAPACITY) if COMPLETION_STORE_ENABLED else None
+        self.latency_recorder = LatencyRecorder(WINDOW_SIZE, tier_names=[t.name for t in orchestrator.tiers])
         self.completed_requests = 0
-        self.chunk_access_log = []
-
-
-    def _convert_raw_entry_to_sim_values(self, raw_entry: RawTraceEntry):
-        """将RawTraceEntry转换为模拟器内部使用的标准化值"""
-        # 1. 时间戳转换为毫秒 (ms)
-        current_trace_time_ms = 0
-        if raw_entry.timestamp_unit == '100ns_windows':
-            current_trace_time_ms = self.parser.windows_filetime_to_ms(raw_entry.raw_timestamp)
-        elif raw_entry.timestamp_unit == 's': # 秒
-            current_trace_time_ms = float(raw_entry.raw_timestamp) * 1000.0
-        elif raw_entry.timestamp_unit == 'ms': # 毫秒
-            current_trace_time_ms = float(raw_entry.raw_timestamp)
-        else:
-            raise ValueError(f"Unsupported timestamp unit: {raw_entry.timestamp_unit}")
-        if current_trace_time_ms is None: return None # 转换失败
-
-        # 2. 偏移量转换为 LBA
-        lba = 0
-        raw_offset_val = int(raw_entry.raw_offset) # 假设原始偏移量总是数字
-        if raw_entry.offset_unit == 'bytes':
-            lba = raw_offset_val // LBA_SIZE_BYTES
-        elif raw_entry.offset_unit == 'lba':
-            lba = raw_offset_val
-        else:
-            raise ValueError(f"Unsupported offset unit: {raw_entry.offset_unit}")
-
-        # 3. 大小转换为 bytes
-        size_bytes = 0
-        raw_size_val = int(raw_entry.raw_size) # 假设原始大小总是数字
-        if raw_entry.size_unit == 'bytes':
-            size_bytes = raw_size_val
-        elif raw_entry.size_unit == 'blocks': # 'blocks' 指的是LBA数量
-            size_bytes = raw_size_val * LBA_SIZE_BYTES
+        self.chunk_access_log = ChunkAccessLog(ACCESS_LOG_INITIAL_CAPACITY) # 由 MigrationController 每个窗口 drain
+
+    def replay_window_abs(self):
+        """把 REPLAY_WINDOW_MS (相对trace起点) 换算为trace绝对时间 (t_start, t_end)，未配置时返回 None"""
+        if REPLAY_WINDOW_MS is None:
+            return None
+        trace_start_ms = self.parser.first_timestamp_ms(self.trace_file_path)
+        if trace_start_ms is None:
+            return None
+        return trace_start_ms + REPLAY_WINDOW_MS[0], trace_start_ms + REPLAY_WINDOW_MS[1]
+
+    def _iter_trace_batches(self, window):
+        if window is None:
+            return self.parser.iter_batches(self.trace_file_path, TRACE_BATCH_LINES)
+        return self.parser.iter_window_batches(self.trace_file_path, TRACE_BATCH_LINES, *window)
+
+    def iter_skipped_batches(self):
+        """
+        回放窗口之前被跳过的那部分trace (用于快进策略状态)。
+        REPLAY_FAST_FORWARD_SPAN_MS 为 None 时从trace开头开始，否则只取窗口前的这段时长。
+        """
+        window = self.replay_window_abs()
+        if window is None:
+            return iter(())
+        ff_start = -float('inf') if REPLAY_FAST_FORWARD_SPAN_MS is None else window[0] - REPLAY_FAST_FORWARD_SPAN_MS
+        return self.parser.iter_window_batches(self.trace_file_path, TRACE_BATCH_LINES, ff_start, window[0])
+
+    def _iter_batches_with_waits(self):
+        """按批读取trace，产出 (等待时间数组, TraceBatch)；等待时间为与上一个请求的到达间隔，已按 replay_speedup 压缩"""
+        window = self.replay_window_abs()
+        # 上一个请求的trace时间（用于计算inter-arrival）；回放窗口时模拟时间0对应窗口起点
+        last_sim_time_ms = window[0] if window is not None else None
+        for batch in self._iter_trace_batches(window):
+            ts = batch.timestamp_ms
+            if last_sim_time_ms is None:
+                # 第一个请求，以其在trace中的时间作为模拟的起点，等待时间为0
+                last_sim_time_ms = ts[0]
+            waits = np.diff(ts, prepend=last_sim_time_ms)
+            np.maximum(waits, 0, out=waits) # 避免时间倒流
+            if self.replay_speedup != 1:
+                waits /= self.replay_speedup
+            last_sim_time_ms = ts[-1]
+            yield waits, batch
+
+    def iter_arrival_batches(self):
+        """
+        open_loop 回放的批量形式 (FastReplayEngine 用)：产出 (模拟到达时间数组, TraceBatch)。
+        到达时间按与逐条回放时 env.now 相同的顺序累加 (结果逐位相同)；
+        与 _run_per_request 一样，发出第一个超过 SIMULATION_TIME 的请求后停止。
+        """
+        now = 0.0
+        for waits, batch in self._iter_batches_with_waits():
+            arrivals = np.cumsum(np.concatenate([[now], waits]))[1:]
+            now = float(arrivals[-1])
+            if SIMULATION_TIME is not None and now > SIMULATION_TIME:
+                stop = int(np.searchsorted(arrivals, SIMULATION_TIME, side='right')) + 1
+                yield arrivals[:stop], batch.take(slice(0, stop))
+                return
+            yield arrivals, batch
+
+    def _iter_trace_records(self):
+        """
+        按批读取trace，产出每条记录的 (等待时间, trace时间戳, lba, size_bytes, req_type, disk, hostname, chunk_id, volume)。
+        等待时间和 chunk_id 在整批上向量化计算，逐条只做一次 tolist() 后的解包。
+        等待时间已按 replay_speedup 压缩；volume 为多trace归并时的卷号，单个trace时用 disk 号区分卷。
+        """
+        for waits, batch in self._iter_batches_with_waits():
+            chunk_ids = batch.lba // LBAS_PER_CHUNK
+            req_types = np.where(batch.is_write, 'write', 'read')
+            hostnames = batch.hostname if batch.hostname is not None else itertools.repeat(None)
+            disk_list = batch.disk.tolist()
+            disks = [d if d >= 0 else None for d in disk_list]
+            volumes = batch.volume.tolist() if batch.volume is not None else disk_list
+            yield from zip(waits.tolist(), batch.timestamp_ms.tolist(), batch.lba.tolist(), batch.size_bytes.tolist(),
+                           req_types.tolist(), disks, hostnames, chunk_ids.tolist(), volumes)
+
+    def _issue_request(self, record, dispatch):
+        """按当前模拟时间创建请求、记录chunk访问并交给协调器"""
+        _, trace_time_ms, lba, size_bytes, req_type, disk_num, hostname, chunk_id, _ = record
+        request = Request(
+            req_id=self.requests_generated + 1,
+            timestamp_orig_raw=trace_time_ms, # 批量路径中已标准化为毫秒
+            lba=lba,
+            size_bytes=size_bytes,
+            req_type=req_type,
+            arrival_time_in_sim=self.env.now,
+            hostname=hostname,
+            disk_num=disk_num
+        )
+
+        self.chunk_access_log.append(self.env.now, chunk_id, req_type == 'write', size_bytes)
+
+        if self.first_arrival_ms is None:
+            self.first_arrival_ms = self.env.now
+        self.requests_generated += 1
+        dispatch(request)
+        return request
+
+    def _run_per_request(self):
+        dispatch = self._dispatcher()
+        for record in self._iter_trace_records():
+            if record[0] > 0:
+                self.arrival_wakeups += 1
+                yield self.env.timeout(record[0])
+
+            self._issue_request(record, dispatch)
+
+            if SIMULATION_TIME is not None and self.env.now > SIMULATION_TIME:
+                print(f"Simulation time limit ({SIMULATION_TIME} ms) reached in RequestGenerator.")
+                break
+
+    def _run_coalesced(self):
+        """
+        组内相邻到达时间差累计不超过 epsilon 的请求组成一组，整组在组内第一个请求的到达时间一次性发出，
+        每组最多一个 timeout 事件。组间延迟是两个组首之间等待时间之和，epsilon 为 0 时与 per_request 的时间完全一致。
+        """
+        epsilon = self.coalesce_epsilon_ms
+        group = []
+        group_delay = 0.0
+        offset = 0.0 # 距当前组首 (或上一个组首) 的累计等待时间
+        for record in self._iter_trace_records():
+            offset += record[0]
+            if group and offset > epsilon:
+                yield from self._issue_group(group, group_delay)
+                group = []
+                if SIMULATION_TIME is not None and self.env.now > SIMULATION_TIME:
+                    print(f"Simulation time limit ({SIMULATION_TIME} ms) reached in RequestGenerator.")
+                    return
+            if not group:
+                group_delay, offset = offset, 0.0
+            group.append(record)
+        if group:
+            yield from self._issue_group(group, group_delay)
+
+    def _issue_group(self, group, delay):
+        if delay > 0:
+            self.arrival_wakeups += 1
+            yield self.env.timeout(delay)
+        dispatch = self._dispatcher()
+        for record in group:
+            self._issue_request(record, dispatch)
+
+    def _dispatcher(self):
+        if self.arrival_scheduling == "coalesced":
+            return self.orchestrator.dispatch_io_request
+        return lambda request: self.env.process(self.orchestrator.handle_io_request(request))
+
+    def _run_closed_loop(self):
+        """
+        闭环回放：忽略trace中的到达时间，每个卷保持 queue_depth 个在途I/O，一个完成后立即发出该卷的下一条。
+        各卷的记录按trace顺序从同一个流中读取；某个卷已满时读到的记录先放进该卷的队列，
+        因此一个慢卷不会阻塞其他卷 (首次出现的卷在被读到时立即开始)。发请求完全由完成回调驱动。
+        各卷队列中的记录总数不超过 CLOSED_LOOP_MAX_PENDING：达到上限后停止读取，等待补发的卷先挂起，
+        等队列里的记录被消费后再继续读，这样内存与trace长度无关 (快卷最多领先慢卷这么多条记录)。
+        """
+        self._closed_loop_records = self._iter_trace_records()
+        self._closed_loop_pending = defaultdict(deque) # 卷 -> 已读出但尚未发出的记录
+        self._closed_loop_pending_count = 0
+        self._closed_loop_blocked = deque() # 因达到读取上限而暂停补发的卷 (每个空位一项)
+        self._closed_loop_outstanding = defaultdict(int) # 卷 -> 在途I/O数
+        self._closed_loop_volume_of = {} # 在途请求 id -> 卷
+        self._closed_loop_exhausted = False
+        self._closed_loop_done = self.env.event()
+        self._closed_loop_dispatch = self._dispatcher()
+
+        self._closed_loop_refill = deque() # 有I/O完成、需要补发的卷
+        self._closed_loop_refilling = False
+        self._closed_loop_run_refill(initial=True)
+        yield self._closed_loop_done
+
+    def _closed_loop_issue(self, record):
+        volume = record[8]
+        self._closed_loop_outstanding[volume] += 1
+        request = self._issue_request(record, self._closed_loop_dispatch)
+        if request.completion_time_in_sim < 0: # 未同步完成 (chunk不在任何层级时会立即完成)
+            self._closed_loop_volume_of[request.id] = volume
         else:
-            raise ValueError(f"Unsupported size unit: {raw_entry.size_unit}")
+            self._closed_loop_outstanding[volume] -= 1
+            self._closed_loop_refill.append(volume)
+
+    def _closed_loop_pull(self, wanted_volume):
+        """
+        从记录流中继续读取：未满的卷直接发出，已满的卷入队。
+        wanted_volume 为 None 时读到第一条需要入队的记录为止 (启动阶段)，否则读到为 wanted_volume 发出一条为止；
+        入队的记录总数达到 CLOSED_LOOP_MAX_PENDING 时停止，wanted_volume 挂起等待。
+        """
+        if self._closed_loop_exhausted:
+            return
+        if wanted_volume is not None and self._closed_loop_pending_count >= CLOSED_LOOP_MAX_PENDING:
+            self._closed_loop_blocked.append(wanted_volume)
+            return
+        for record in self._closed_loop_records:
+            volume = record[8]
+            if self._closed_loop_outstanding[volume] < self.queue_depth and not self._closed_loop_pending[volume]:
+                self._closed_loop_issue(record)
+                if volume == wanted_volume:
+                    return
+            else:
+                self._closed_loop_pending[volume].append(record)
+                self._closed_loop_pending_count += 1
+                if wanted_volume is None:
+                    return
+                if self._closed_loop_pending_count >= CLOSED_LOOP_MAX_PENDING:
+                    self._closed_loop_blocked.append(wanted_volume)
+                    return
+        self._closed_loop_exhausted = True
+        self._closed_loop_blocked.clear()
 
-        # 4. 操作类型 (确保是小写 'read'/'write')
-        operation_type = raw_entry.operation_type.lower()
-        if operation_type not in ['read', 'write']:
-            print(f"Warning: Unknown operation type '{raw_entry.operation_type}', defaulting to 'read'.")
-            operation_type = 'read' # 或者抛出错误
+    def _closed_loop_on_completion(self, request):
+        volume = self._closed_loop_volume_of.pop(request.id, None)
+        if volume is None:
+            return # 发出时同步完成的请求，已在 _closed_loop_issue 中处理
+        self._closed_loop_outstanding[volume] -= 1
+        self._closed_loop_refill.append(volume)
+        self._closed_loop_run_refill()
 
-        return current_trace_time_ms, lba, size_bytes, operation_type
+    def _closed_loop_run_refill(self, initial=False):
+        """为有空位的卷补发请求；用队列迭代处理，避免同步完成的请求造成递归"""
+        if self._closed_loop_refilling:
+            return
+        self._closed_loop_refilling = True
+        if initial:
+            self._closed_loop_pull(None)
+        while self._closed_loop_refill:
+            volume = self._closed_loop_refill.popleft()
+            if SIMULATION_TIME is not None and self.env.now > SIMULATION_TIME:
+                if not self._closed_loop_exhausted:
+                    print(f"Simulation time limit ({SIMULATION_TIME} ms) reached in RequestGenerator.")
+                self._closed_loop_exhausted = True
+                self._closed_loop_pending.clear()
+                self._closed_loop_pending_count = 0
+                self._closed_loop_blocked.clear()
+            elif self._closed_loop_outstanding[volume] >= self.queue_depth:
+                continue # 空位已被其他卷读取时顺带发出的记录占用
+            elif self._closed_loop_pending[volume]:
+                self._closed_loop_issue(self._closed_loop_pending[volume].popleft())
+                self._closed_loop_pending_count -= 1
+                if self._closed_loop_blocked and self._closed_loop_pending_count < CLOSED_LOOP_MAX_PENDING:
+                    self._closed_loop_refill.extend(self._closed_loop_blocked)
+                    self._closed_loop_blocked.clear()
+            else:
+                self._closed_loop_pull(volume)
+        self._closed_loop_refilling = False
+        self._closed_loop_check_done()
 
+    def _closed_loop_check_done(self):
+        if self._closed_loop_exhausted and not self._closed_loop_volume_of and not self._closed_loop_done.triggered:
+            self._closed_loop_done.succeed()
 
     def run(self):
-        print(f"RequestGenerator started at {self.env.now} using parser for format: {TRACE_FORMAT}")
-        last_sim_time_ms = 0.0 # 用于计算inter-arrival的模拟时间戳（非trace原始时间戳）
-        sim_req_id_counter = 0
-        first_request_processed = False
+        print(f"RequestGenerator started at {self.env.now} using parser for format: {TRACE_FORMAT} ({type(self.parser).__name__}), "
+              f"arrival scheduling: {self.arrival_scheduling}, replay mode: {self.replay_mode}")
 
         try:
-            with open(self.trace_file_path, 'r') as f:
-                for line_num, line_content in enumerate(f, 1):
-                    raw_entry = self.parser.parse_line(line_content)
-                    if raw_entry is None: # 跳过无效行/头部/注释
-                        continue
-
-                    conversion_result = self._convert_raw_entry_to_sim_values(raw_entry)
-                    if conversion_result is None:
-                        print(f"Skipping line {line_num} due to conversion error: {line_content.strip()}")
-                        continue
-
-                    current_trace_time_ms, lba, size_bytes, req_type = conversion_result
-
-                    # 计算模拟中的等待时间
-                    sim_wait_time_ms = 0
-                    if not first_request_processed:
-                        # 第一个请求，以其在trace中的时间作为模拟的起点（或相对起点）
-                        # 我们将第一个请求的last_sim_time_ms设为其自身的trace时间，所以等待时间为0
-                        last_sim_time_ms = current_trace_time_ms
-                        first_request_processed = True
-                        # sim_wait_time_ms 保持为 0
-                    else:
-                        sim_wait_time_ms = current_trace_time_ms - last_sim_time_ms
-                        if sim_wait_time_ms < 0:
-                            sim_wait_time_ms = 0 # 避免时间倒流
-                        last_sim_time_ms = current_trace_time_ms # 更新为当前请求的trace时间
-
-                    if sim_wait_time_ms > 0:
-                        yield self.env.timeout(sim_wait_time_ms)
-
-                    sim_req_id_counter += 1
-                    request = Request(
-                        req_id=sim_req_id_counter,
-                        timestamp_orig_raw=raw_entry.raw_timestamp, # 存储最原始的时间戳
-                        lba=lba,
-                        size_bytes=size_bytes,
-                        req_type=req_type,
-                        arrival_time_in_sim=self.env.now,
-                        hostname=raw_entry.hostname,
-                        disk_num=raw_entry.disk_number,
-                        orig_response_time_raw=raw_entry.original_response_time,
-                        extra_fields=raw_entry.extra_fields
-                    )
-
-                    chunk_id, _ = request.get_chunk_id_and_offset()
-                    self.chunk_access_log.append((self.env.now, chunk_id, req_type, size_bytes))
-
-                    self.env.process(self.orchestrator.handle_io_request(request))
-                    self.requests_generated += 1
-
-                    if SIMULATION_TIME is not None and self.env.now > SIMULATION_TIME:
-                        print(f"Simulation time limit ({SIMULATION_TIME} ms) reached in RequestGenerator.")
-                        break
+            if self.replay_mode == "closed_loop":
+                yield from self._run_closed_loop()
+            elif self.arrival_scheduling == "coalesced":
+                yield from self._run_coalesced()
+            else:
+                yield from self._run_per_request()
         except FileNotFoundError:
             print(f"Error: Trace file not found at {self.trace_file_path}")
         except Exception as e:
@@ -160,8 +358,51 @@ class RequestGenerator:
 
         print(f"RequestGenerator finished at {self.env.now}. Total requests generated: {self.requests_generated}")
 
-    def log_completion(self, request: Request):
+    @property
+    def latencies(self):
+        """所有已完成请求的延迟 (ms)，numpy 数组；未保留完成记录时为 None"""
+        return self.completions.latencies() if self.completions is not None else None
+
+    def log_completion(self, request: Request, tier_idx=-1):
         request.completion_time_in_sim = self.env.now
         request.latency = request.completion_time_in_sim - request.arrival_time_in_sim
-        self.latencies.append(request.latency)
-        self.completed_requests += 1
\ No newline at end of file
+        is_write = request.req_type == 'write'
+        self.latency_recorder.record(request.latency, tier_idx, is_write, request.completion_time_in_sim)
+        if self.completions is not None:
+            self.completions.record(request.id, request.arrival_time_in_sim, request.completion_time_in_sim,
+                                    tier_idx, is_write, request.size_bytes)
+        self.completed_requests += 1
+        self.completed_bytes += request.size_bytes
+        self.last_completion_ms = request.completion_time_in_sim
+        if self.replay_mode == "closed_loop":
+            self._closed_loop_on_completion(request)
+
+    def log_completions_many(self, arrivals, completions, tier_idx, is_write, size_bytes):
+        """
+        批量版的 发出 + log_completion (FastReplayEngine 用，各参数为同长度的 NumPy 数组，按到达顺序)。
+        请求 id 与逐条回放时一样按到达顺序从 1 开始编号。
+        """
+        n = len(arrivals)
+        if n == 0:
+            return
+        if self.first_arrival_ms is None:
+            self.first_arrival_ms = float(arrivals[0])
+        req_ids = np.arange(self.requests_generated + 1, self.requests_generated + n + 1, dtype=np.int64)
+        self.requests_generated += n
+        self.latency_recorder.record_many(completions - arrivals, tier_idx, is_write, completions)
+        if self.completions is not None:
+            self.completions.record_many(req_ids, arrivals, completions, tier_idx, is_write, size_bytes)
+        self.completed_requests += n
+        self.completed_bytes += int(np.sum(size_bytes))
+        last = float(np.max(completions))
+        self.last_completion_ms = last if self.last_completion_ms is None else max(self.last_completion_ms, last)
+
+    def throughput_stats(self):
+        """从第一个请求到达到最后一个请求完成之间实际达到的 IOPS 和吞吐量 (MB/s)"""
+        if self.first_arrival_ms is None or self.last_completion_ms is None:
+            return None
+        span_s = (self.last_completion_ms - self.first_arrival_ms) / 1000
+        if span_s <= 0:
+            return None
+        return {'span_s': span_s, 'iops': self.completed_requests / span_s,
+                'throughput_MBps': self.completed_bytes / span_s / (1024 * 1024)}
@@ -0,0 +1,38 @@
+# components/sim_env.py
+# 模拟环境的创建与事件计数。
+import simpy
+
+from config import EVENT_CORE
+from components import event_core
+
+EVENT_CORES = ("simpy", "heap")
+
+
+class CountingEnvironment(simpy.Environment):
+    """记录调度过的事件总数的 simpy.Environment，用于比较不同调度模式下每个请求消耗的事件数"""
+    def __init__(self, initial_time=0):
+        super().__init__(initial_time)
+        self.events_scheduled = 0
+
+    def schedule(self, event, priority=simpy.core.NORMAL, delay=0):
+        self.events_scheduled += 1
+        super().schedule(event, priority, delay)
+
+
+def make_environment(core=None):
+    """core 为 None 时使用 EVENT_CORE；"heap" 使用 components/event_core.py 的轻量内核 (同样带 events_scheduled 计数)"""
+    core = core or EVENT_CORE
+    if core == "simpy":
+        return CountingEnvironment()
+    if core == "heap":
+        return event_core.Environment()
+    raise ValueError(f"Unknown event core: {core} (expected one of {EVENT_CORES})")
+
+
+def sim_module(env):
+    """env 对应的资源类所在的模块 (simpy 或 components.event_core)，两者都提供 PriorityResource / Resource / Store"""
+    return event_core if isinstance(env, event_core.Environment) else simpy
+
+
+def event_core_name(env):
+    return "heap" if isinstance(env, event_core.Environment) else "simpy"
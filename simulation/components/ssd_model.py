@@ -0,0 +1,34 @@
+# components/ssd_model.py
+# SSD 的垃圾回收 / 写放大模型，由层级的填充率驱动 (多通道设备本身见 storage.SSDDevice)。
+#
+# 闪存只能整块擦除，GC 回收一个块之前要把其中仍然有效的页搬走；层级越满，被回收的块里有效页越多，
+# 每写一页用户数据实际要写的页数 (写放大 WA) 越大。这里用贪心 GC 在均匀随机写下的经典近似:
+#     rho = 填充率 / (1 + over_provisioning)       (闪存的物理利用率，预留空间不对用户可见)
+#     WA  = (1 + rho) / (2 * (1 - rho))，下限 1，上限 max_write_amplification
+# 填充率取 used_bytes / capacity_bytes，迁移进出时随之变化；写请求的编程时间乘以当时的 WA。
+
+
+class WriteAmplificationModel:
+    def __init__(self, tier, over_provisioning=0.07, max_write_amplification=10.0):
+        self.tier = tier
+        self.over_provisioning = over_provisioning
+        self.max_write_amplification = max_write_amplification
+        # 统计：每次写 (子请求) 时的 WA 之和，用于报告平均写放大
+        self.samples = 0
+        self.total = 0.0
+
+    def current(self):
+        fill = self.tier.used_bytes / self.tier.capacity_bytes if self.tier.capacity_bytes > 0 else 1.0
+        rho = min(fill / (1.0 + self.over_provisioning), 0.999)
+        return min(max((1.0 + rho) / (2.0 * (1.0 - rho)), 1.0), self.max_write_amplification)
+
+    def factor(self):
+        """一次写的服务时间倍数 (并计入统计)"""
+        wa = self.current()
+        self.samples += 1
+        self.total += wa
+        return wa
+
+    @property
+    def mean(self):
+        return self.total / self.samples if self.samples else None
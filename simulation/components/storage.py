@@ -1,29 +1,69 @@
 # components/storage.py
-import simpy
 import math
-from config import LBA_SIZE_BYTES, LBAS_PER_CHUNK, CHUNK_SIZE_BYTES
+import numpy as np
+from config import LBA_SIZE_BYTES, LBAS_PER_CHUNK, CHUNK_SIZE_BYTES, DEVICE_PRIORITY_SCHEDULING, DEVICE_SELECTION_POLICY
+from config import TOTAL_LBAS, HDD_QUEUE_SCHEDULING, SSD_MODEL_DEFAULTS
+from components.chunk_bitmap import ChunkBitmap
+from components.token_bucket import TokenBucket
+from components.sim_env import sim_module
+from components.hdd_model import HDDSeekModel, ElevatorResource, HDD_QUEUE_SCHEDULERS
+from components.ssd_model import WriteAmplificationModel
+
+DEVICE_SELECTION_POLICIES = ("round_robin", "jsq", "chunk_affinity", "striped")
+
+# 设备队列的优先级 (数值越小越优先)；同一优先级内按到达顺序
+IO_CLASS_FOREGROUND = 0 # 用户读写
+IO_CLASS_MIGRATION = 1  # 数据迁移
 
 class StorageDevice:
     """
     模拟单个存储设备。
     论文提到每个层级可以有多个设备（特别是HDD层）。
     这里的'a'和'b'参数应与config.py中的单位一致。
+    设备队列是非抢占的优先级队列：priority_scheduling 为 True 时前台I/O排在迁移I/O之前
+    (正在服务的迁移I/O不会被打断)，为 False 时所有I/O按到达顺序排队。
+    给出 seek_model (HDDSeekModel) 时，定位开销按磁头位置到目标LBA的寻道 + 旋转等待计算 (代替常数 a)，
+    queue_scheduling 为 "clook" 时同一优先级内的请求按 C-LOOK 顺序服务 (ElevatorResource)。
+    写请求的服务时间乘以 write_cost_factor (TIER_CONFIGS 中的 'write_cost_factor')，
+    给出 write_amplification (WriteAmplificationModel) 时再乘以当时的写放大。
     """
-    def __init__(self, env, name, a_param, b_param_per_lba, is_hdd=False, num_parallel_hdd=1):
+    def __init__(self, env, name, a_param, b_param_per_lba, is_hdd=False, num_parallel_hdd=1, priority_scheduling=None,
+                 seek_model=None, queue_scheduling="fifo", write_cost_factor=1.0, write_amplification=None):
         self.env = env
         self.name = name
         self.a_param = a_param  # 固定延迟部分
         self.b_param_per_lba = b_param_per_lba  # 每LBA的可变延迟部分
-        self.resource = simpy.Resource(env, capacity=1) # 每个设备是一个资源
+        self.seek_model = seek_model
+        self.head_lba = 0 # 上一次传输结束时磁头所在的LBA (只在 seek_model 下使用)
+        if seek_model is not None and queue_scheduling == "clook":
+            self.resource = ElevatorResource(env, self)
+        else:
+            self.resource = sim_module(env).PriorityResource(env, capacity=1) # 每个设备是一个资源
+        self.priority_scheduling = DEVICE_PRIORITY_SCHEDULING if priority_scheduling is None else priority_scheduling
         self.is_hdd = is_hdd
         self.num_parallel_hdd = num_parallel_hdd # 用于HDD条带化
+        self.write_cost_factor = write_cost_factor
+        self.write_amplification = write_amplification
 
         # 更多统计信息可以添加，如利用率、队列长度等
         self.busy_time = 0
         self.requests_served = 0
+        # 迁移对前台I/O的干扰：前台请求排队期间设备在服务迁移I/O的时间之和
+        self.migration_busy_time = 0.0
+        self.migration_requests_served = 0
+        self._migration_started_at = None # 当前正在服务的是迁移I/O时，其开始时间
+        self.foreground_requests_served = 0
+        self.foreground_wait_time = 0.0
+        self.foreground_migration_delay = 0.0
+        # 寻道模型下的定位开销统计
+        self.seek_time = 0.0
+        self.rotation_time = 0.0
+        self.positionings = 0
 
-    def _calculate_service_time(self, size_bytes, operation_type='read'):
+    def _calculate_service_time(self, size_bytes, operation_type='read', lba=None):
         num_lbas = math.ceil(size_bytes / LBA_SIZE_BYTES)
+        if self.seek_model is not None and lba is not None:
+            return self._positioned_service_time(size_bytes, num_lbas, lba)
         service_time = self.a_param + self.b_param_per_lba * num_lbas
 
         if self.is_hdd:
@@ -33,12 +73,48 @@ class StorageDevice:
                  service_time /= self.num_parallel_hdd # 简化处理，实际更复杂
             # TODO: 论文还提到HDD可以有更复杂的包含寻道和旋转的模型
 
-        # 论文提到SSD写操作有效慢2倍 (6.2节校准部分)
-        if "SSD" in self.name and operation_type == 'write': # 简陋的判断方式
-            service_time *= 2
+        # 论文提到SSD写操作有效慢2倍 (6.2节校准部分)，由 TIER_CONFIGS 的 write_cost_factor 给出
+        if operation_type == 'write':
+            service_time *= self.write_cost_factor
+            if self.write_amplification is not None:
+                service_time *= self.write_amplification.factor()
 
         return service_time
 
+    def _positioned_service_time(self, size_bytes, num_lbas, lba):
+        """寻道模型：从当前磁头位置定位到 lba，再传输 num_lbas 个LBA；磁头停在传输结束的位置"""
+        seek, rotation = self.seek_model.positioning_time(self.head_lba, lba, self.env.now)
+        transfer = self.b_param_per_lba * num_lbas
+        if size_bytes == LBAS_PER_CHUNK * LBA_SIZE_BYTES:
+            transfer /= self.num_parallel_hdd # 与常数模型相同的并行近似，只作用于传输部分
+        self.head_lba = lba + num_lbas
+        self.seek_time += seek
+        self.rotation_time += rotation
+        self.positionings += 1
+        return self.seek_model.overhead_ms + seek + rotation + transfer
+
+    def service_times(self, size_bytes, is_write):
+        """_calculate_service_time 的向量化版本 (NumPy 数组输入)，FastReplayEngine 用"""
+        size_bytes = np.asarray(size_bytes, dtype=np.int64)
+        num_lbas = -(-size_bytes // LBA_SIZE_BYTES)
+        service_time = self.a_param + self.b_param_per_lba * num_lbas
+        if self.is_hdd:
+            service_time = np.where(size_bytes == LBAS_PER_CHUNK * LBA_SIZE_BYTES,
+                                    service_time / self.num_parallel_hdd, service_time)
+        if self.write_cost_factor != 1.0:
+            service_time = np.where(is_write, service_time * self.write_cost_factor, service_time)
+        return service_time
+
+    def queue_length(self):
+        """在服务 + 排队的请求数"""
+        return self.resource.count + len(self.resource.queue)
+
+    def in_service(self):
+        return self.resource.count
+
+    def is_idle(self):
+        return self.resource.count == 0 and not self.resource.queue
+
     def access(self, size_bytes, operation_type='read'):
         """模拟一次设备访问，返回服务时间"""
         service_time = self._calculate_service_time(size_bytes, operation_type)
@@ -48,30 +124,252 @@ class StorageDevice:
         self.requests_served += 1
         # print(f"{self.env.now:.2f}: Device {self.name} finished access of {size_bytes}B, op: {operation_type}, time: {service_time:.2f}")
 
+    def _migration_busy_until_now(self):
+        if self._migration_started_at is None:
+            return self.migration_busy_time
+        return self.migration_busy_time + (self.env.now - self._migration_started_at)
+
+    def _request(self, io_class, lba=None):
+        """申请设备；返回 (请求事件, 申请时的干扰计数快照)"""
+        priority = io_class if self.priority_scheduling else IO_CLASS_FOREGROUND
+        if isinstance(self.resource, ElevatorResource):
+            return self.resource.request(priority=priority, lba=lba), self._migration_busy_until_now()
+        return self.resource.request(priority=priority), self._migration_busy_until_now()
+
+    def _on_granted(self, io_class, requested_at, migration_busy_at_request):
+        if io_class == IO_CLASS_MIGRATION:
+            self._migration_started_at = self.env.now
+        else:
+            self.foreground_requests_served += 1
+            self.foreground_wait_time += self.env.now - requested_at
+            self.foreground_migration_delay += self._migration_busy_until_now() - migration_busy_at_request
+
+    def _on_finished(self, io_class, service_time, req):
+        self.busy_time += service_time
+        self.requests_served += 1
+        if io_class == IO_CLASS_MIGRATION:
+            self.migration_busy_time += self.env.now - self._migration_started_at
+            self._migration_started_at = None
+            self.migration_requests_served += 1
+        self.resource.release(req)
+
+    def serve(self, size_bytes, operation_type='read', io_class=IO_CLASS_FOREGROUND, lba=None):
+        """生成器：申请设备 -> 服务 -> 释放 (在调用方进程中 yield from)；lba 为设备内的起始LBA (寻道模型需要)"""
+        requested_at = self.env.now
+        req, migration_busy_at_request = self._request(io_class, lba)
+        yield req
+        self._on_granted(io_class, requested_at, migration_busy_at_request)
+        service_time = self._calculate_service_time(size_bytes, operation_type, lba)
+        yield self.env.timeout(service_time)
+        self._on_finished(io_class, service_time, req)
+
+    def serve_async(self, size_bytes, operation_type, on_done, io_class=IO_CLASS_FOREGROUND, lba=None):
+        """
+        不创建生成器进程的服务路径：申请设备 -> 服务 -> 释放，全部通过事件回调串联，完成后调用 on_done()。
+        与 serve() 的结果一致，但每个I/O只需要 请求 + 超时 两个事件。
+        """
+        requested_at = self.env.now
+        req, migration_busy_at_request = self._request(io_class, lba)
+
+        def _granted(_):
+            self._on_granted(io_class, requested_at, migration_busy_at_request)
+            service_time = self._calculate_service_time(size_bytes, operation_type, lba)
+
+            def _finished(_):
+                self._on_finished(io_class, service_time, req)
+                on_done()
+            self.env.timeout(service_time).callbacks.append(_finished)
+        req.callbacks.append(_granted)
+
+class SSDDevice:
+    """
+    多通道 SSD：channels 个互相独立的通道/die，每个通道是一个单服务台的 StorageDevice (带优先级队列和干扰统计)。
+    一次I/O按 stripe_bytes 切成若干片，从 LBA 所在条带对应的通道开始依次分给各通道并发执行，最后一片完成时I/O完成。
+    因此一个 8 MB 的迁移只在每个通道上占用若干片的时间，前台小I/O最多等它当前那一片。
+    单个通道的传输速率是整个设备的 1/channels (channel_b_ms_per_lba 默认 b * channels)，大I/O条带化后恢复整机带宽。
+    接口与 StorageDevice 相同 (serve / serve_async / queue_length / is_idle 和统计字段)；
+    busy_time、migration_busy_time 按通道平均 (等效的整机占用时间)，排队等待和迁移干扰按通道上的子请求累计。
+    """
+    seek_model = None # 与 StorageDevice 相同的统计字段 (SSD 没有寻道)
+    seek_time = 0.0
+    rotation_time = 0.0
+    positionings = 0
+
+    def __init__(self, env, name, a_param, b_param_per_lba, channels=8, stripe_bytes=64 * 1024,
+                 channel_b_ms_per_lba=None, priority_scheduling=None, write_cost_factor=1.0, write_amplification=None):
+        self.env = env
+        self.name = name
+        self.a_param = a_param
+        self.b_param_per_lba = b_param_per_lba
+        self.stripe_lbas = max(stripe_bytes // LBA_SIZE_BYTES, 1)
+        channel_b = b_param_per_lba * channels if channel_b_ms_per_lba is None else channel_b_ms_per_lba
+        self.channels = [StorageDevice(env, f"{name}_ch{i}", a_param, channel_b,
+                                       priority_scheduling=priority_scheduling,
+                                       write_cost_factor=write_cost_factor,
+                                       write_amplification=write_amplification)
+                         for i in range(channels)]
+        self.write_amplification = write_amplification
+        self._next_channel = 0 # 没有给出 lba 时的起始通道 (轮询)
+        self.requests_served = 0
+        self.migration_requests_served = 0
+
+    @property
+    def busy_time(self):
+        return sum(ch.busy_time for ch in self.channels) / len(self.channels)
+
+    @property
+    def migration_busy_time(self):
+        return sum(ch.migration_busy_time for ch in self.channels) / len(self.channels)
+
+    @property
+    def foreground_requests_served(self):
+        return sum(ch.foreground_requests_served for ch in self.channels)
+
+    @property
+    def foreground_wait_time(self):
+        return sum(ch.foreground_wait_time for ch in self.channels)
+
+    @property
+    def foreground_migration_delay(self):
+        return sum(ch.foreground_migration_delay for ch in self.channels)
+
+    def queue_length(self):
+        return sum(ch.queue_length() for ch in self.channels)
+
+    def in_service(self):
+        return sum(ch.in_service() for ch in self.channels)
+
+    def is_idle(self):
+        return all(ch.is_idle() for ch in self.channels)
+
+    def serve_async(self, size_bytes, operation_type, on_done, io_class=IO_CLASS_FOREGROUND, lba=None):
+        num_lbas = max(math.ceil(size_bytes / LBA_SIZE_BYTES), 1)
+        n = len(self.channels)
+        if lba is None:
+            first = self._next_channel
+            self._next_channel = (self._next_channel + 1) % n
+        else:
+            first = (lba // self.stripe_lbas) % n
+        pieces = -(-num_lbas // self.stripe_lbas)
+        remaining = [pieces]
+
+        def _piece_done():
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self.requests_served += 1
+                if io_class == IO_CLASS_MIGRATION:
+                    self.migration_requests_served += 1
+                on_done()
+        for k in range(pieces):
+            piece_lbas = min(self.stripe_lbas, num_lbas - k * self.stripe_lbas)
+            self.channels[(first + k) % n].serve_async(piece_lbas * LBA_SIZE_BYTES, operation_type, _piece_done,
+                                                       io_class=io_class)
+
+    def serve(self, size_bytes, operation_type='read', io_class=IO_CLASS_FOREGROUND, lba=None):
+        """生成器版本 (在调用方进程中 yield from)"""
+        done = self.env.event()
+        self.serve_async(size_bytes, operation_type, done.succeed, io_class=io_class, lba=lba)
+        yield done
+
 class StorageTier:
     """
     模拟一个存储层级，包含一个或多个StorageDevice。
     管理该层级的数据块。
+    数据块成员关系有两种表示：
+      - 默认用 dict (chunk_id -> 元数据)，适合容量较小、chunk 数与实际迁移量成正比的上层；
+      - use_bitmap_membership() 后用成员位图 + 脏位图 (每个chunk 各 1 bit)，
+        底层 backing store 用它"隐式"持有所有未放到其他层级的chunk，不再为每个chunk创建元数据。
     """
-    def __init__(self, env, name, capacity_bytes, a_ms, b_ms_per_lba, num_devices=1, is_hdd_tier=False):
+    def __init__(self, env, name, capacity_bytes, a_ms, b_ms_per_lba, num_devices=1, is_hdd_tier=False,
+                 priority_scheduling=None, migration_bandwidth_MBps=None, migration_burst_bytes=None,
+                 device_selection=None, hdd_seek_model=None, hdd_scheduling=None, write_cost_factor=1.0, ssd_model=None):
         self.env = env
         self.name = name
         self.capacity_bytes = capacity_bytes
         self.used_bytes = 0
-        self.devices = [StorageDevice(env, f"{name}_dev{i}", a_ms, b_ms_per_lba,
-                                      is_hdd=is_hdd_tier, num_parallel_hdd=(num_devices if is_hdd_tier else 1))
-                        for i in range(num_devices)]
-        # 如果层级有多个设备，需要一个机制来分配请求到具体设备，这里简化为轮询或随机
+        self.device_selection = device_selection or DEVICE_SELECTION_POLICY
+        if self.device_selection not in DEVICE_SELECTION_POLICIES:
+            raise ValueError(f"Unknown device selection policy: {self.device_selection}")
+        # 条带化时 chunk 操作真正占用所有设备，不再用 num_devices 缩短单个设备的服务时间来近似
+        striped = self.device_selection == "striped"
+        # HDD 寻道模型 (hdd_seek_model 为 HDDSeekModel 的参数字典，None 表示常数模型)；条带化时每个设备只有 1/num_devices 的地址空间
+        self.hdd_scheduling = hdd_scheduling or HDD_QUEUE_SCHEDULING
+        if self.hdd_scheduling not in HDD_QUEUE_SCHEDULERS:
+            raise ValueError(f"Unknown HDD queue scheduling: {self.hdd_scheduling}")
+        seek_model = None
+        if is_hdd_tier and hdd_seek_model is not None:
+            seek_model = HDDSeekModel(b_ms_per_lba, TOTAL_LBAS // num_devices if striped else TOTAL_LBAS,
+                                      **hdd_seek_model)
+        # 多通道 SSD 模型 (ssd_model 为参数字典，未给出的参数取 SSD_MODEL_DEFAULTS)：写放大由该层级的填充率决定
+        self.write_amplification = None
+        if ssd_model is not None and not is_hdd_tier:
+            params = dict(SSD_MODEL_DEFAULTS, **ssd_model)
+            self.write_amplification = WriteAmplificationModel(self, params.pop('over_provisioning'),
+                                                               params.pop('max_write_amplification'))
+            self.devices = [SSDDevice(env, f"{name}_dev{i}", a_ms, b_ms_per_lba,
+                                      priority_scheduling=priority_scheduling, write_cost_factor=write_cost_factor,
+                                      write_amplification=self.write_amplification, **params)
+                            for i in range(num_devices)]
+        else:
+            self.devices = [StorageDevice(env, f"{name}_dev{i}", a_ms, b_ms_per_lba,
+                                          is_hdd=is_hdd_tier,
+                                          num_parallel_hdd=(num_devices if is_hdd_tier and not striped else 1),
+                                          priority_scheduling=priority_scheduling,
+                                          seek_model=seek_model, queue_scheduling=self.hdd_scheduling,
+                                          write_cost_factor=write_cost_factor)
+                            for i in range(num_devices)]
+        # 设备选择策略见 get_device；条带单元为 chunk 的 1/num_devices
         self.next_device_idx = 0
+        self.stripe_unit_lbas = max(LBAS_PER_CHUNK // num_devices, 1)
+        # 读写该层级的迁移流量限速 (None 表示不限速)，突发量默认一个chunk
+        self.migration_throttle = None
+        if migration_bandwidth_MBps:
+            self.migration_throttle = TokenBucket(env, migration_bandwidth_MBps,
+                                                  migration_burst_bytes or CHUNK_SIZE_BYTES)
 
         self.chunks = {} # 存储在该层级的数据块ID及其元数据 (e.g., dirty_flag)
                         # key: chunk_id, value: {'dirty': False, 'size_bytes': CHUNK_SIZE_BYTES}
+        self._present = None # 位图模式下的成员位图 (ChunkBitmap)
+        self._dirty = None   # 位图模式下的脏位图
+
+    def use_bitmap_membership(self, total_chunks, fill=False):
+        """
+        切换到位图模式。fill=True 表示该层级初始即隐式持有 [0, total_chunks) 的全部chunk (干净)，
+        不逐个创建元数据，O(1) 完成。已有的 dict 条目会并入位图。
+        """
+        present = ChunkBitmap(total_chunks, fill=fill)
+        dirty = ChunkBitmap(total_chunks)
+        for chunk_id, meta in self.chunks.items():
+            if 0 <= chunk_id < total_chunks:
+                present.add(chunk_id)
+                if meta['dirty']:
+                    dirty.add(chunk_id)
+        self.chunks = {}
+        self._present, self._dirty = present, dirty
+        self.used_bytes = present.count * CHUNK_SIZE_BYTES
+        if self.used_bytes > self.capacity_bytes:
+            print(f"CRITICAL WARNING: Tier {self.name} holds {present.count} chunks ({self.used_bytes} B), "
+                  f"more than its capacity {self.capacity_bytes} B.")
+
+    @property
+    def uses_bitmap(self):
+        return self._present is not None
 
     def _add_initial_chunk_metadata(self, chunk_id, is_dirty=False):
         """
         【新增】同步方法：用于初始时直接添加数据块元数据，不模拟IO延迟或资源竞争。
         这代表数据块“初始就存在于此”。
         """
+        if self.uses_bitmap:
+            if not 0 <= chunk_id < self._present.size:
+                print(f"Error: Chunk {chunk_id} outside the address space of tier {self.name}.")
+                return False
+            if self._present.add(chunk_id):
+                if self.used_bytes + CHUNK_SIZE_BYTES > self.capacity_bytes:
+                    print(f"CRITICAL WARNING: Tier {self.name} insufficient capacity during initial population for chunk {chunk_id}.")
+                self.used_bytes += CHUNK_SIZE_BYTES
+            self.set_dirty(chunk_id, is_dirty)
+            return True
         if chunk_id not in self.chunks:
             # 检查容量，但对于初始填充，我们通常假设容量足够
             # 或者至少要能容纳所有预设的初始数据块
@@ -90,38 +388,121 @@ class StorageTier:
             # print(f"DEBUG: Tier {self.name} chunk {chunk_id} already present, updated dirty status.")
         return True
 
-    def get_device(self):
-        # 简单的轮询策略选择设备
+    def get_device(self, lba=None):
+        """
+        按设备选择策略为一次I/O挑选设备 (lba 为I/O的起始LBA，chunk_affinity / striped 需要):
+          round_robin     轮询
+          jsq             当前在服务 + 排队的请求最少的设备 (并列时从轮询位置开始取第一个)
+          chunk_affinity  按 chunk_id 哈希固定到一个设备
+          striped         RAID-0 布局，LBA 所在条带对应的设备
+        """
+        n = len(self.devices)
+        policy = self.device_selection
+        if n == 1:
+            return self.devices[0]
+        if lba is not None and policy == "chunk_affinity":
+            return self.devices[((lba // LBAS_PER_CHUNK) * 2654435761 & 0xFFFFFFFF) % n]
+        if lba is not None and policy == "striped":
+            return self.devices[(lba // self.stripe_unit_lbas) % n]
+        if policy == "jsq":
+            best, best_load = None, None
+            for k in range(n):
+                device = self.devices[(self.next_device_idx + k) % n]
+                load = device.queue_length()
+                if best is None or load < best_load:
+                    best, best_load = device, load
+                    if load == 0:
+                        break
+            self.next_device_idx = (self.next_device_idx + 1) % n
+            return best
+        # 简单的轮询策略选择设备 (也是没有给出 lba 时的后备)
         device = self.devices[self.next_device_idx]
-        self.next_device_idx = (self.next_device_idx + 1) % len(self.devices)
+        self.next_device_idx = (self.next_device_idx + 1) % n
         return device
 
+    def device_lba(self, lba):
+        """LBA 在其所在设备内的地址：条带化时去掉其他设备的条带，其他策略下每个设备都覆盖整个地址空间"""
+        n = len(self.devices)
+        if self.device_selection != "striped" or n == 1:
+            return lba
+        unit = self.stripe_unit_lbas
+        return (lba // (unit * n)) * unit + lba % unit
+
+    def device_indices(self, lbas):
+        """
+        get_device 的向量化版本：按到达顺序为一批I/O选设备，返回设备下标数组 (轮询位置同样向前推进)。
+        jsq 依赖每个时刻的队列长度，无法离线计算。
+        """
+        n = len(self.devices)
+        lbas = np.asarray(lbas, dtype=np.int64)
+        if n == 1:
+            return np.zeros(len(lbas), dtype=np.int64)
+        if self.device_selection == "chunk_affinity":
+            return ((lbas // LBAS_PER_CHUNK) * 2654435761 & 0xFFFFFFFF) % n
+        if self.device_selection == "striped":
+            return (lbas // self.stripe_unit_lbas) % n
+        if self.device_selection == "jsq":
+            raise ValueError("jsq device selection depends on live queue lengths and cannot be computed in batch")
+        indices = (self.next_device_idx + np.arange(len(lbas), dtype=np.int64)) % n
+        self.next_device_idx = (self.next_device_idx + len(lbas)) % n
+        return indices
+
+    def serve_chunk(self, chunk_id, operation_type, io_class=IO_CLASS_FOREGROUND):
+        """
+        生成器：读写整个 chunk。条带化时拆成每个设备一份 (条带单元大小) 并发执行，最慢的一份完成时结束；
+        其他策略下由选出的单个设备服务。
+        """
+        first_lba = chunk_id * LBAS_PER_CHUNK
+        if self.device_selection != "striped" or len(self.devices) == 1:
+            yield from self.get_device(first_lba).serve(CHUNK_SIZE_BYTES, operation_type, io_class=io_class, lba=first_lba)
+            return
+        done = self.env.event()
+        remaining = [len(self.devices)]
+
+        def _stripe_done():
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.succeed()
+        stripe_bytes = self.stripe_unit_lbas * LBA_SIZE_BYTES
+        device_lba = self.device_lba(first_lba)
+        for device in self.devices:
+            device.serve_async(stripe_bytes, operation_type, _stripe_done, io_class=io_class, lba=device_lba)
+        yield done
+
+    def _migration_io(self, chunk_id, operation_type):
+        """chunk 粒度的迁移I/O：先过该层级的限速令牌桶，再以迁移优先级排队"""
+        if self.migration_throttle is not None:
+            yield from self.migration_throttle.throttle(CHUNK_SIZE_BYTES)
+        yield from self.serve_chunk(chunk_id, operation_type, io_class=IO_CLASS_MIGRATION)
+
     def read_chunk(self, chunk_id):
         """从该层级读取一个数据块"""
-        if chunk_id not in self.chunks:
+        if not self.has_chunk(chunk_id):
             print(f"Error: Chunk {chunk_id} not in tier {self.name} for read.")
             return None # 或者抛出异常
 
-        device = self.get_device()
-        # print(f"{self.env.now:.2f}: Tier {self.name} reading chunk {chunk_id} from {device.name}")
-        with device.resource.request() as req:
-            yield req
-            yield self.env.process(device.access(LBAS_PER_CHUNK * LBA_SIZE_BYTES, operation_type='read'))
+        # print(f"{self.env.now:.2f}: Tier {self.name} reading chunk {chunk_id}")
+        yield from self._migration_io(chunk_id, 'read')
         # print(f"{self.env.now:.2f}: Tier {self.name} finished reading chunk {chunk_id}")
-        return self.chunks[chunk_id] # 返回数据块元数据
+        return self.get_chunk_meta(chunk_id) # 返回数据块元数据
 
     def write_chunk(self, chunk_id, is_dirty=True):
         """向该层级写入一个数据块"""
-        if self.used_bytes + (LBAS_PER_CHUNK * LBA_SIZE_BYTES) > self.capacity_bytes and chunk_id not in self.chunks:
+        if self.used_bytes + (LBAS_PER_CHUNK * LBA_SIZE_BYTES) > self.capacity_bytes and not self.has_chunk(chunk_id):
             print(f"Error: Tier {self.name} full, cannot write new chunk {chunk_id}.")
             return False # 或者需要有替换逻辑
 
-        device = self.get_device()
-        # print(f"{self.env.now:.2f}: Tier {self.name} writing chunk {chunk_id} to {device.name}")
-        with device.resource.request() as req:
-            yield req
-            yield self.env.process(device.access(LBAS_PER_CHUNK * LBA_SIZE_BYTES, operation_type='write'))
+        # print(f"{self.env.now:.2f}: Tier {self.name} writing chunk {chunk_id}")
+        yield from self._migration_io(chunk_id, 'write')
 
+        if self.uses_bitmap:
+            if not 0 <= chunk_id < self._present.size:
+                print(f"Error: Chunk {chunk_id} outside the address space of tier {self.name}.")
+                return False
+            if self._present.add(chunk_id):
+                self.used_bytes += (LBAS_PER_CHUNK * LBA_SIZE_BYTES)
+            self.set_dirty(chunk_id, is_dirty)
+            return True
         if chunk_id not in self.chunks:
             self.used_bytes += (LBAS_PER_CHUNK * LBA_SIZE_BYTES)
         self.chunks[chunk_id] = {'dirty': is_dirty, 'size_bytes': LBAS_PER_CHUNK * LBA_SIZE_BYTES}
@@ -130,6 +511,11 @@ class StorageTier:
 
     def remove_chunk(self, chunk_id):
         """从该层级移除一个数据块"""
+        if self.uses_bitmap:
+            if self._present.discard(chunk_id):
+                self.used_bytes -= CHUNK_SIZE_BYTES
+                return {'dirty': self._dirty.discard(chunk_id), 'size_bytes': CHUNK_SIZE_BYTES}
+            return None
         if chunk_id in self.chunks:
             chunk_meta = self.chunks.pop(chunk_id)
             self.used_bytes -= chunk_meta['size_bytes']
@@ -138,10 +524,49 @@ class StorageTier:
         return None
 
     def has_chunk(self, chunk_id):
+        if self.uses_bitmap:
+            return chunk_id in self._present
         return chunk_id in self.chunks
 
+    def is_dirty(self, chunk_id):
+        if self.uses_bitmap:
+            return chunk_id in self._dirty
+        meta = self.chunks.get(chunk_id)
+        return bool(meta and meta['dirty'])
+
+    def set_dirty(self, chunk_id, dirty=True):
+        """设置脏标记，chunk 不在该层级时返回 False"""
+        if self.uses_bitmap:
+            if chunk_id not in self._present:
+                return False
+            if dirty:
+                self._dirty.add(chunk_id)
+            else:
+                self._dirty.discard(chunk_id)
+            return True
+        meta = self.chunks.get(chunk_id)
+        if meta is None:
+            return False
+        meta['dirty'] = dirty
+        return True
+
+    @property
+    def num_chunks(self):
+        return self._present.count if self.uses_bitmap else len(self.chunks)
+
+    def chunk_ids(self):
+        """该层级的全部 chunk_id：dict 模式按加入顺序，位图模式按 chunk_id 升序"""
+        if self.uses_bitmap:
+            return self._present.indices().tolist()
+        return list(self.chunks.keys())
+
     def get_free_space(self):
         return self.capacity_bytes - self.used_bytes
 
     def get_chunk_meta(self, chunk_id):
-        return self.chunks.get(chunk_id)
\ No newline at end of file
+        """元数据字典；位图模式下返回的是快照，修改脏标记请用 set_dirty"""
+        if self.uses_bitmap:
+            if chunk_id not in self._present:
+                return None
+            return {'dirty': chunk_id in self._dirty, 'size_bytes': CHUNK_SIZE_BYTES}
+        return self.chunks.get(chunk_id)
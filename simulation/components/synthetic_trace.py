@@ -0,0 +1,199 @@
+# components/synthetic_trace.py
+# 合成负载的"解析器"：不读任何文件，按配置的分布直接用 NumPy 批量生成 TraceBatch，
+# 通过 get_parser("SYNTHETIC", TRACE_FORMAT_OPTIONS["SYNTHETIC"]) 接入，和真实trace走同一条回放路径。
+#
+# 支持的特征 (参数见 config.TRACE_FORMAT_OPTIONS["SYNTHETIC"]):
+#   - chunk 热度服从 Zipf(alpha)，用连续近似的逆CDF采样，内存与chunk数无关 (可以到千万级chunk)
+#   - 热点漂移：热度排名 -> chunk 的映射随时间平移 (hotspot_drift_chunks_per_hour)
+#   - 读写比例、请求大小分布 (离散取值 + 概率)
+#   - 到达过程：泊松 或 突发 (两状态马尔可夫调制)，可叠加昼夜周期 (正弦调制)，用 thinning 方法批量生成
+#   - 顺序访问：每个请求以 sequential_prob 的概率紧接上一个请求的末尾 (形成几何分布长度的顺序段)
+# 相同的 seed 每次迭代都生成完全相同的序列。
+import math
+from typing import Optional, Dict, Any, Iterator
+
+import numpy as np
+
+from config import LBAS_PER_CHUNK, LBA_SIZE_BYTES
+from components.trace_parser import TraceParser, TraceBatch
+
+SYNTHETIC_DEFAULTS = {
+    'seed': 42,
+    'num_chunks': 1 << 16,
+    'num_requests': 1_000_000,     # 达到请求数或时长任一上限即结束
+    'duration_ms': None,
+    'zipf_alpha': 1.1,
+    'hotspot_drift_chunks_per_hour': 0, # 热点每小时平移的chunk数 (0 表示热点固定)
+    'write_ratio': 0.3,
+    'size_choices_bytes': [4096, 8192, 16384, 65536],
+    'size_probs': [0.6, 0.2, 0.1, 0.1],
+    'rate_iops': 200.0,           # 平均到达率 (请求/秒)
+    'arrival_process': 'poisson', # "poisson" 或 "bursty"
+    'burst_factor': 5.0,          # 突发状态下的到达率倍数
+    'burst_mean_ms': 2000.0,      # 突发状态的平均持续时间
+    'idle_mean_ms': 20000.0,      # 非突发状态的平均持续时间
+    'diurnal_amplitude': 0.0,     # 0..1，到达率按 1 + amplitude * sin(2*pi*t/period) 调制
+    'diurnal_period_ms': 24 * 3600 * 1000,
+    'sequential_prob': 0.0,       # 请求紧接上一个请求末尾的概率
+}
+
+# 内部每次生成的请求数；与调用方的 batch_lines 无关，保证不同批大小下生成的序列完全相同
+_GEN_BLOCK = 65536
+
+
+class SyntheticTraceSource(TraceParser):
+    FORMAT_NAME = "SYNTHETIC"
+
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        super().__init__(has_header=False)
+        self.options = dict(SYNTHETIC_DEFAULTS)
+        self.options.update(options or {})
+        o = self.options
+        if o['arrival_process'] not in ('poisson', 'bursty'):
+            raise ValueError(f"Unknown synthetic arrival process: {o['arrival_process']}")
+        if not 0 <= o['diurnal_amplitude'] <= 1:
+            raise ValueError("diurnal_amplitude must be in [0, 1]")
+        self.num_chunks = int(o['num_chunks'])
+        self.size_choices = np.asarray(o['size_choices_bytes'], dtype=np.int64)
+        self.size_probs = np.asarray(o['size_probs'], dtype=np.float64)
+        self.size_probs = self.size_probs / self.size_probs.sum()
+        # 热度排名 -> chunk 的打散映射: chunk = (rank * stride + shift) mod N，stride 与 N 互质
+        stride = 2654435761 % self.num_chunks or 1
+        while math.gcd(stride, self.num_chunks) != 1:
+            stride += 1
+        self._stride = stride
+        self.total_lbas = self.num_chunks * LBAS_PER_CHUNK
+
+    def _parse_data_line(self, line: str):
+        return None # 合成负载没有文本行
+
+    # --- 各个分布的批量采样 ---
+
+    def _zipf_ranks(self, rng, n):
+        """连续近似的 Zipf 逆CDF：排名 r (0-based) 的概率约正比于 (r+1)^-alpha"""
+        alpha, N = self.options['zipf_alpha'], self.num_chunks
+        u = rng.random(n)
+        if abs(alpha - 1.0) < 1e-9:
+            x = np.power(N + 1.0, u)
+        else:
+            e = 1.0 - alpha
+            x = np.power((np.power(N + 1.0, e) - 1.0) * u + 1.0, 1.0 / e)
+        return np.minimum(x.astype(np.int64) - 1, N - 1)
+
+    def _ranks_to_chunks(self, ranks, times_ms):
+        drift = self.options['hotspot_drift_chunks_per_hour']
+        shift = (times_ms * (drift / 3.6e6)).astype(np.int64) if drift else 0
+        return (ranks * self._stride + shift) % self.num_chunks
+
+    def _rate_per_ms(self, times_ms, burst_state):
+        o = self.options
+        rate = np.full(len(times_ms), o['rate_iops'] / 1000.0)
+        if o['diurnal_amplitude']:
+            rate *= 1.0 + o['diurnal_amplitude'] * np.sin(2 * np.pi * times_ms / o['diurnal_period_ms'])
+        if burst_state is not None:
+            rate *= np.where(burst_state, o['burst_factor'], 1.0)
+        return rate
+
+    def _iter_arrival_times(self, rng, batch_size) -> Iterator[np.ndarray]:
+        """非齐次泊松过程的 thinning：以最大到达率生成候选点，按 rate(t)/rate_max 的概率接受"""
+        o = self.options
+        rate_max = o['rate_iops'] / 1000.0 * (1.0 + o['diurnal_amplitude'])
+        bursty = o['arrival_process'] == 'bursty'
+        if bursty:
+            rate_max *= o['burst_factor']
+        t = 0.0
+        # 突发状态切换点 (递增)，偶数段为非突发，奇数段为突发
+        switch_times = np.empty(0)
+        num_switches_before = 0 # 已丢弃的切换点个数 (决定奇偶)
+        next_switch_start = 0.0
+        pending = np.empty(0)
+        while True:
+            candidates = t + np.cumsum(rng.exponential(1.0 / rate_max, batch_size))
+            t = float(candidates[-1])
+            burst_state = None
+            if bursty:
+                while next_switch_start <= t:
+                    durations = np.empty(64)
+                    durations[0::2] = rng.exponential(o['idle_mean_ms'], 32)
+                    durations[1::2] = rng.exponential(o['burst_mean_ms'], 32)
+                    new_switches = next_switch_start + np.cumsum(durations)
+                    next_switch_start = float(new_switches[-1])
+                    switch_times = np.concatenate([switch_times, new_switches])
+                k = np.searchsorted(switch_times, candidates, side='right') + num_switches_before
+                burst_state = (k % 2) == 1
+                # 丢掉已经过去的切换点
+                drop = int(np.searchsorted(switch_times, candidates[0], side='right'))
+                if drop:
+                    switch_times = switch_times[drop:]
+                    num_switches_before += drop
+            accepted = candidates[rng.random(batch_size) * rate_max < self._rate_per_ms(candidates, burst_state)]
+            pending = np.concatenate([pending, accepted])
+            while len(pending) >= batch_size:
+                yield pending[:batch_size]
+                pending = pending[batch_size:]
+
+    def _generate(self) -> Iterator[TraceBatch]:
+        o = self.options
+        rng = np.random.default_rng(o['seed'])
+        remaining = o['num_requests'] if o['num_requests'] is not None else np.inf
+        duration = o['duration_ms'] if o['duration_ms'] is not None else np.inf
+        next_lba = None # 上一个请求的末尾，用于跨批次延续顺序段
+        for times in self._iter_arrival_times(rng, _GEN_BLOCK):
+            if remaining <= 0 or times[0] >= duration:
+                return
+            times = times[:int(min(remaining, len(times)))]
+            times = times[times < duration]
+            n = len(times)
+            remaining -= n
+
+            sizes = self.size_choices[rng.choice(len(self.size_choices), n, p=self.size_probs)]
+            size_lbas = -(-sizes // LBA_SIZE_BYTES)
+            is_write = rng.random(n) < o['write_ratio']
+            chunks = self._ranks_to_chunks(self._zipf_ranks(rng, n), times)
+            max_offset = np.maximum(LBAS_PER_CHUNK - size_lbas, 1)
+            lba = chunks * LBAS_PER_CHUNK + (rng.random(n) * max_offset).astype(np.int64)
+
+            if o['sequential_prob'] > 0:
+                # 顺序段：is_cont[i] 表示请求 i 紧接请求 i-1 的末尾。段内 lba = 段首 lba + 段内之前请求的大小之和
+                is_cont = rng.random(n) < o['sequential_prob']
+                if next_lba is None:
+                    is_cont[0] = False
+                run_start = np.maximum.accumulate(np.where(is_cont, 0, np.arange(n)))
+                excl = np.cumsum(size_lbas) - size_lbas
+                base = lba[run_start]
+                if is_cont[0]:
+                    base = np.where(run_start == 0, next_lba, base)
+                lba = (base + excl - excl[run_start]) % self.total_lbas
+            next_lba = int((lba[-1] + size_lbas[-1]) % self.total_lbas)
+
+            yield TraceBatch(timestamp_ms=times, lba=lba, size_bytes=sizes, is_write=is_write,
+                             disk=np.full(n, -1, dtype=np.int32))
+            if n < _GEN_BLOCK:
+                return
+
+    def _iter_sized(self, batch_lines: int) -> Iterator[TraceBatch]:
+        for block in self._generate():
+            for start in range(0, len(block), batch_lines):
+                yield block.take(slice(start, start + batch_lines))
+
+    # --- TraceParser 接口 (trace_file_path 被忽略) ---
+
+    def iter_batches(self, trace_file_path: str, batch_lines: int, byte_range=None) -> Iterator[TraceBatch]:
+        for batch in self._iter_sized(batch_lines):
+            self.lines_read += len(batch)
+            yield batch
+
+    def iter_window_batches(self, trace_file_path: str, batch_lines: int,
+                            t_start_ms: float, t_end_ms: float) -> Iterator[TraceBatch]:
+        """生成的时间戳单调递增，越过 t_end_ms 即停止"""
+        for batch in self._iter_sized(batch_lines):
+            if batch.timestamp_ms[0] >= t_end_ms:
+                return
+            batch = batch.in_time_window(t_start_ms, t_end_ms)
+            if len(batch):
+                yield batch
+
+    def first_timestamp_ms(self, trace_file_path: str) -> Optional[float]:
+        for batch in self._generate():
+            return float(batch.timestamp_ms[0])
+        return None
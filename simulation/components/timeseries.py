@@ -0,0 +1,84 @@
+# components/timeseries.py
+# 按固定的模拟时间间隔采样设备队列和层级状态，结束时导出为一个 .npz 文件，用来看队列在什么时候堆起来、哪一层在扛负载。
+#
+# 每个采样点 (时刻 t，覆盖区间 (t - interval, t]) 记录:
+#   - 每个设备: 排队数 (未被授予设备的请求)、在服务数、忙碌比例 (区间内 busy_time 的增量 / interval)
+#   - 每个层级: 占用率 (used_bytes / capacity_bytes)、区间内在该层完成的请求数及其占全部完成数的份额 (命中份额)
+# busy_time 在每次服务结束时才累加，所以忙碌比例按完成时刻计入区间，单次服务时间接近 interval 时个别点会超过 1。
+# SSDDevice 的排队数/在服务数按通道上的子请求累计。
+# 所有数组在构造时按 max_samples 预分配，采样只做标量写入；超出 max_samples 后停止采样。
+import numpy as np
+
+
+class TimeSeriesSampler:
+    def __init__(self, env, tiers, request_generator, interval_ms, max_samples):
+        self.env = env
+        self.tiers = tiers
+        self.request_generator = request_generator
+        self.interval_ms = float(interval_ms)
+        self.max_samples = max(int(max_samples), 0)
+        self.devices = [device for tier in tiers for device in tier.devices]
+        self.device_tier = np.array([i for i, tier in enumerate(tiers) for _ in tier.devices], dtype=np.int16)
+        self.device_names = [f"{tier.name}/{j}" for tier in tiers for j in range(len(tier.devices))]
+
+        n, d, t = self.max_samples, len(self.devices), len(tiers)
+        self.time_ms = np.zeros(n, dtype=np.float64)
+        self.queue_length = np.zeros((n, d), dtype=np.int32)
+        self.in_service = np.zeros((n, d), dtype=np.int32)
+        self.busy_fraction = np.zeros((n, d), dtype=np.float32)
+        self.tier_occupancy = np.zeros((n, t), dtype=np.float32)
+        self.tier_completions = np.zeros((n, t), dtype=np.int32)
+        self.samples = 0
+
+        self._last_busy = [0.0] * d
+        self._last_completed = [0] * t
+        env.process(self._run())
+
+    def _run(self):
+        while self.samples < self.max_samples:
+            yield self.env.timeout(self.interval_ms)
+            self.sample()
+
+    def sample(self):
+        k = self.samples
+        self.time_ms[k] = self.env.now
+        queue_row, service_row, busy_row = self.queue_length[k], self.in_service[k], self.busy_fraction[k]
+        for j, device in enumerate(self.devices):
+            in_service = device.in_service()
+            service_row[j] = in_service
+            queue_row[j] = device.queue_length() - in_service
+            busy = device.busy_time
+            busy_row[j] = (busy - self._last_busy[j]) / self.interval_ms
+            self._last_busy[j] = busy
+
+        by_tier = self.request_generator.latency_recorder.by_tier
+        occupancy_row, completions_row = self.tier_occupancy[k], self.tier_completions[k]
+        for i, tier in enumerate(self.tiers):
+            occupancy_row[i] = tier.used_bytes / tier.capacity_bytes if tier.capacity_bytes > 0 else 0.0
+            hist = by_tier.get(i)
+            completed = hist.total if hist is not None else 0
+            completions_row[i] = completed - self._last_completed[i]
+            self._last_completed[i] = completed
+        self.samples = k + 1
+
+    def hit_share(self):
+        """每个采样区间内各层完成数占全部完成数的份额 (区间内没有完成的请求时为 0)"""
+        completions = self.tier_completions[:self.samples].astype(np.float64)
+        totals = completions.sum(axis=1, keepdims=True)
+        return np.divide(completions, totals, out=np.zeros_like(completions), where=totals > 0).astype(np.float32)
+
+    def save(self, path):
+        k = self.samples
+        np.savez_compressed(path,
+                            interval_ms=np.float64(self.interval_ms),
+                            time_ms=self.time_ms[:k],
+                            device_names=np.array(self.device_names),
+                            device_tier=self.device_tier,
+                            tier_names=np.array([tier.name for tier in self.tiers]),
+                            queue_length=self.queue_length[:k],
+                            in_service=self.in_service[:k],
+                            busy_fraction=self.busy_fraction[:k],
+                            tier_occupancy=self.tier_occupancy[:k],
+                            tier_completions=self.tier_completions[:k],
+                            hit_share=self.hit_share())
+        return path
@@ -0,0 +1,34 @@
+# components/token_bucket.py
+# 迁移流量的令牌桶限速 (每个层级一个，速率和突发量在 TIER_CONFIGS 中配置)。
+# 令牌按 rate 连续补充，上限为 burst；申请时直接扣除 (允许欠账)，欠多少就等多久，
+# 因此多个并发的迁移按申请顺序排队，且不需要额外的事件或进程来补充令牌。
+
+
+class TokenBucket:
+    def __init__(self, env, rate_MBps, burst_bytes):
+        self.env = env
+        self.rate_bytes_per_ms = rate_MBps * 1024 * 1024 / 1000.0
+        self.burst_bytes = burst_bytes
+        self.tokens = burst_bytes
+        self.last_refill = env.now
+        self.throttled_time = 0.0 # 累计的限速等待时间 (ms)
+        self.bytes_granted = 0
+
+    def reserve(self, num_bytes):
+        """扣除 num_bytes 个令牌，返回需要等待的时间 (ms)"""
+        now = self.env.now
+        self.tokens = min(self.burst_bytes, self.tokens + (now - self.last_refill) * self.rate_bytes_per_ms)
+        self.last_refill = now
+        self.tokens -= num_bytes
+        self.bytes_granted += num_bytes
+        if self.tokens >= 0:
+            return 0.0
+        delay = -self.tokens / self.rate_bytes_per_ms
+        self.throttled_time += delay
+        return delay
+
+    def throttle(self, num_bytes):
+        """生成器：等到 num_bytes 的令牌可用"""
+        delay = self.reserve(num_bytes)
+        if delay > 0:
+            yield self.env.timeout(delay)
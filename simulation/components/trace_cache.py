@@ -0,0 +1,234 @@
+# components/trace_cache.py
+# 预处理后的trace缓存：把标准化后的trace列 (ms时间戳, LBA, bytes, 读写, disk) 写成紧凑的二进制列式文件，
+# 之后的运行直接 mmap 该文件，不再做任何文本解析。
+#
+# 文件布局:
+#   MAGIC (8 bytes) | header长度 (uint64, little endian) | JSON header | 对齐填充 | 各列数据 (连续存放)
+# JSON header 中记录缓存键 (源文件大小/mtime、TRACE_FORMAT、解析器选项、LBA_SIZE_BYTES)、行数、每列的 dtype/偏移，以及主机名编码表。
+import json
+import os
+import shutil
+import struct
+import tempfile
+from typing import Iterable, Optional, Dict, Any, Iterator
+
+import numpy as np
+
+from config import LBA_SIZE_BYTES, TRACE_CACHE_DIR, TRACE_INDEX_STRIDE_LINES
+from components.trace_parser import TraceParser, TraceBatch
+
+CACHE_MAGIC = b"MLDSTRC1"
+CACHE_VERSION = 2 # 2: 缓存键加入 format_options
+_ALIGN = 64
+
+# 列名 -> dtype (顺序即文件中的存放顺序)
+CACHE_COLUMNS = [
+    ('timestamp_ms', '<f8'),
+    ('lba', '<i8'),
+    ('size_bytes', '<i8'),
+    ('is_write', '|b1'),
+    ('disk', '<i4'),
+    ('host', '<i2'), # 主机名编码，-1 表示无
+]
+
+
+def trace_cache_path(trace_file_path: str, trace_format: str) -> str:
+    """缓存文件路径：默认放在trace文件旁边，也可以通过 TRACE_CACHE_DIR 指定目录"""
+    cache_name = f"{os.path.basename(trace_file_path)}.{trace_format.lower()}.trc"
+    cache_dir = TRACE_CACHE_DIR or os.path.dirname(os.path.abspath(trace_file_path))
+    return os.path.join(cache_dir, cache_name)
+
+
+def trace_cache_key(trace_file_path: str, trace_format: str,
+                    format_options: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    缓存键：源文件大小/mtime + 解析格式 + 解析器选项 (TRACE_FORMAT_OPTIONS 中该格式的一项，如 has_header)
+    + LBA大小，任何一项变化都会使缓存失效。选项经过一次 JSON 往返，与从 header 读回的键可以直接比较。
+    """
+    st = os.stat(trace_file_path)
+    return {
+        'version': CACHE_VERSION,
+        'source_size': st.st_size,
+        'source_mtime_ns': st.st_mtime_ns,
+        'trace_format': trace_format.upper(),
+        'format_options': json.loads(json.dumps(format_options or {}, sort_keys=True)),
+        'lba_size_bytes': LBA_SIZE_BYTES,
+    }
+
+
+def read_cache_header(cache_path: str) -> Optional[Dict[str, Any]]:
+    """读取缓存文件的 header，文件不存在或格式不对时返回 None"""
+    try:
+        with open(cache_path, 'rb') as f:
+            if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            (header_len,) = struct.unpack('<Q', f.read(8))
+            return json.loads(f.read(header_len).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def load_valid_cache_header(trace_file_path: str, trace_format: str,
+                            format_options: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+    """缓存存在且缓存键与当前源文件/配置一致时返回其 header，否则返回 None"""
+    if not os.path.exists(trace_file_path):
+        return None
+    header = read_cache_header(trace_cache_path(trace_file_path, trace_format))
+    if header is None or header.get('key') != trace_cache_key(trace_file_path, trace_format, format_options):
+        return None
+    return header
+
+
+class _HostEncoder:
+    """把主机名字符串编码为 int16，编码表写入 header"""
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+
+    def encode(self, hostname: Optional[np.ndarray], n: int) -> np.ndarray:
+        if hostname is None:
+            return np.full(n, -1, dtype=np.int16)
+        uniques, inverse = np.unique(hostname.astype(str), return_inverse=True)
+        table = np.array([self._code_of(name) for name in uniques.tolist()], dtype=np.int16)
+        return table[inverse]
+
+    def _code_of(self, name: str) -> int:
+        if name not in self._codes:
+            self._codes[name] = len(self.names)
+            self.names.append(name)
+        return self._codes[name]
+
+
+def write_trace_cache(cache_path: str, batches: Iterable[TraceBatch], key: Dict[str, Any],
+                      extra_header: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    把一串 TraceBatch 流式写成缓存文件。
+    各列先追加写入临时文件 (内存占用与批大小成正比)，最后拼接为单个文件并原子替换。
+    """
+    cache_dir = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".trc_", dir=cache_dir)
+    try:
+        col_files = {name: open(os.path.join(tmp_dir, name), 'wb') for name, _ in CACHE_COLUMNS}
+        host_encoder = _HostEncoder()
+        num_rows = 0
+        first_ts, max_ts = None, None
+        try:
+            for batch in batches:
+                n = len(batch)
+                if n == 0:
+                    continue
+                columns = {
+                    'timestamp_ms': batch.timestamp_ms, 'lba': batch.lba, 'size_bytes': batch.size_bytes,
+                    'is_write': batch.is_write, 'disk': batch.disk,
+                    'host': host_encoder.encode(batch.hostname, n),
+                }
+                for name, dtype in CACHE_COLUMNS:
+                    col_files[name].write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+                if first_ts is None:
+                    first_ts = float(batch.timestamp_ms[0])
+                batch_max = float(batch.timestamp_ms.max())
+                max_ts = batch_max if max_ts is None else max(max_ts, batch_max)
+                num_rows += n
+        finally:
+            for f in col_files.values():
+                f.close()
+
+        header = {
+            'key': key,
+            'num_rows': num_rows,
+            'first_timestamp_ms': first_ts,
+            'max_timestamp_ms': max_ts,
+            'host_names': host_encoder.names,
+            'columns': [],
+        }
+        if extra_header:
+            header.update(extra_header)
+        # 先估算 header 大小以确定数据区起始偏移 (偏移值本身会影响 header 长度，预留足够空间)
+        data_start = _align(len(CACHE_MAGIC) + 8 + len(json.dumps(header)) + 64 * (len(CACHE_COLUMNS) + 1))
+        offset = data_start
+        for name, dtype in CACHE_COLUMNS:
+            header['columns'].append({'name': name, 'dtype': dtype, 'offset': offset})
+            offset = _align(offset + num_rows * np.dtype(dtype).itemsize)
+        header_bytes = json.dumps(header).encode('utf-8')
+        assert len(CACHE_MAGIC) + 8 + len(header_bytes) <= data_start
+
+        tmp_cache = os.path.join(tmp_dir, "cache.trc")
+        with open(tmp_cache, 'wb') as out:
+            out.write(CACHE_MAGIC)
+            out.write(struct.pack('<Q', len(header_bytes)))
+            out.write(header_bytes)
+            for col in header['columns']:
+                out.write(b'\0' * (col['offset'] - out.tell()))
+                with open(os.path.join(tmp_dir, col['name']), 'rb') as src:
+                    shutil.copyfileobj(src, out, 16 * 1024 * 1024)
+        os.replace(tmp_cache, cache_path)
+        return header
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def build_trace_cache(trace_file_path: str, parser: TraceParser, trace_format: str,
+                      batch_lines: int, format_options: Optional[Dict] = None) -> Dict[str, Any]:
+    """一次性转换：用文本解析器 (按 format_options 构造) 解析整个trace并写入缓存，返回缓存 header"""
+    key = trace_cache_key(trace_file_path, trace_format, format_options)
+    cache_path = trace_cache_path(trace_file_path, trace_format)
+    return write_trace_cache(cache_path, parser.iter_batches(trace_file_path, batch_lines), key)
+
+
+class CachedTraceParser(TraceParser):
+    """
+    直接 mmap 预处理缓存的"解析器"。iter_batches 返回的列是 memmap 上的切片视图，没有任何文本解析。
+    """
+    def __init__(self, cache_path: str, header: Optional[Dict[str, Any]] = None):
+        super().__init__(has_header=False)
+        self.cache_path = cache_path
+        self.header = header if header is not None else read_cache_header(cache_path)
+        if self.header is None:
+            raise ValueError(f"Invalid trace cache file: {cache_path}")
+        self.FORMAT_NAME = self.header['key']['trace_format']
+        self._time_index = None
+        self.num_rows = self.header['num_rows']
+        # 编码 -1 (无主机名) 正好索引到末尾追加的 None
+        self.host_names = np.array(self.header['host_names'] + [None], dtype=object)
+        self.columns = {}
+        for col in self.header['columns']:
+            if self.num_rows == 0:
+                self.columns[col['name']] = np.empty(0, dtype=col['dtype'])
+            else:
+                self.columns[col['name']] = np.memmap(cache_path, dtype=col['dtype'], mode='r',
+                                                      offset=col['offset'], shape=(self.num_rows,))
+
+    def _parse_data_line(self, line: str):
+        return None # 缓存不包含文本行
+
+    def batch_at(self, start: int, stop: int) -> TraceBatch:
+        """返回第 [start, stop) 行的 TraceBatch (零拷贝视图，主机名按需解码)"""
+        cols = self.columns
+        hostname = self.host_names[cols['host'][start:stop]] if self.header['host_names'] else None
+        return TraceBatch(timestamp_ms=cols['timestamp_ms'][start:stop], lba=cols['lba'][start:stop],
+                          size_bytes=cols['size_bytes'][start:stop], is_write=cols['is_write'][start:stop],
+                          disk=cols['disk'][start:stop], hostname=hostname)
+
+    def iter_batches(self, trace_file_path: str, batch_lines: int) -> Iterator[TraceBatch]:
+        for start in range(0, self.num_rows, batch_lines):
+            yield self.batch_at(start, min(start + batch_lines, self.num_rows))
+
+    def iter_window_batches(self, trace_file_path: str, batch_lines: int,
+                            t_start_ms: float, t_end_ms: float) -> Iterator[TraceBatch]:
+        """缓存的时间戳列可以直接 mmap，按行号建立的块索引在内存中计算一次即可"""
+        from components.trace_index import TraceTimeIndex
+        if self._time_index is None:
+            self._time_index = TraceTimeIndex.from_timestamps(self.columns['timestamp_ms'], TRACE_INDEX_STRIDE_LINES)
+        start_row, end_row = self._time_index.position_range(t_start_ms, t_end_ms)
+        for start in range(start_row, end_row, batch_lines):
+            batch = self.batch_at(start, min(start + batch_lines, end_row)).in_time_window(t_start_ms, t_end_ms)
+            if len(batch):
+                yield batch
+
+    def first_timestamp_ms(self, trace_file_path: str) -> Optional[float]:
+        return self.header['first_timestamp_ms']
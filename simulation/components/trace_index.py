@@ -0,0 +1,121 @@
+# components/trace_index.py
+# trace时间 -> 字节偏移 的稀疏索引。每 TRACE_INDEX_STRIDE_LINES 行记录一个块的起始偏移以及块内时间戳的最小/最大值，
+# 第一次使用时构建，保存在trace文件旁边 (<trace>.<format>.tsidx.npz)，之后直接加载。
+# 有了它 RequestGenerator 可以只回放 [t_start, t_end) 的时间窗口，而不必从文件开头扫描。
+import copy
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from config import TRACE_INDEX_STRIDE_LINES, TRACE_CACHE_DIR
+from components.trace_cache import trace_cache_key
+
+
+def trace_index_path(trace_file_path: str, trace_format: str) -> str:
+    index_name = f"{os.path.basename(trace_file_path)}.{trace_format.lower()}.tsidx.npz"
+    index_dir = TRACE_CACHE_DIR or os.path.dirname(os.path.abspath(trace_file_path))
+    return os.path.join(index_dir, index_name)
+
+
+class TraceTimeIndex:
+    """
+    块级稀疏索引。trace不保证严格按时间排序，因此用"之前所有块的最大时间戳"决定可以跳过多少块，
+    用"之后所有块的最小时间戳"决定在哪里停止读取，保证结果与从头扫描再过滤完全一致。
+    """
+    def __init__(self, positions: np.ndarray, block_min: np.ndarray, block_max: np.ndarray,
+                 end_position: int, first_timestamp_ms: Optional[float]):
+        self.positions = positions
+        self.block_min = block_min
+        self.block_max = block_max
+        self.end_position = end_position
+        self.first_timestamp_ms = first_timestamp_ms
+        # max_before[b]: 块 b 之前所有记录的最大时间戳；min_from[b]: 块 b 及之后所有记录的最小时间戳
+        self.max_before = np.concatenate([[-np.inf], np.maximum.accumulate(block_max)[:-1]]) if len(block_max) else np.empty(0)
+        self.min_from = np.minimum.accumulate(block_min[::-1])[::-1] if len(block_min) else np.empty(0)
+
+    def position_range(self, t_start_ms: float, t_end_ms: float) -> Tuple[int, int]:
+        """返回需要读取的 [start, end) 位置区间 (CSV 为字节偏移，缓存为行号)"""
+        num_blocks = len(self.positions)
+        if num_blocks == 0:
+            return 0, 0
+        first_block = max(int(np.searchsorted(self.max_before, t_start_ms, side='left')) - 1, 0)
+        stop_block = int(np.searchsorted(self.min_from, t_end_ms, side='left'))
+        if stop_block <= first_block:
+            return 0, 0
+        end = self.positions[stop_block] if stop_block < num_blocks else self.end_position
+        return int(self.positions[first_block]), int(end)
+
+    @classmethod
+    def from_blocks(cls, positions, block_min, block_max, end_position, first_timestamp_ms):
+        return cls(np.asarray(positions, dtype=np.int64), np.asarray(block_min, dtype=np.float64),
+                   np.asarray(block_max, dtype=np.float64), int(end_position), first_timestamp_ms)
+
+    @classmethod
+    def from_timestamps(cls, timestamps: np.ndarray, stride: int) -> "TraceTimeIndex":
+        """对已经在内存/mmap中的时间戳列按行号建立索引 (用于预处理缓存)"""
+        n = len(timestamps)
+        positions = np.arange(0, n, stride, dtype=np.int64)
+        if n == 0:
+            return cls.from_blocks(positions, [], [], 0, None)
+        block_min = np.minimum.reduceat(timestamps, positions)
+        block_max = np.maximum.reduceat(timestamps, positions)
+        return cls.from_blocks(positions, block_min, block_max, n, float(timestamps[0]))
+
+
+def build_trace_index(parser, trace_file_path: str, stride_lines: int) -> TraceTimeIndex:
+    """完整解析一遍文本trace，按块记录起始字节偏移和时间戳范围"""
+    parser = copy.copy(parser)
+    parser.header_processed = not parser.has_header
+    positions, block_min, block_max = [], [], []
+    first_ts = None
+    for block_start, lines in parser.iter_line_blocks(trace_file_path, stride_lines):
+        batch = parser.parse_batch(lines)
+        positions.append(block_start)
+        if len(batch):
+            ts = batch.timestamp_ms
+            block_min.append(ts.min())
+            block_max.append(ts.max())
+            if first_ts is None:
+                first_ts = float(ts[0])
+        else:
+            block_min.append(np.inf)
+            block_max.append(-np.inf)
+    return TraceTimeIndex.from_blocks(positions, block_min, block_max,
+                                      os.path.getsize(trace_file_path), first_ts)
+
+
+def save_trace_index(index: TraceTimeIndex, index_path: str, key) -> None:
+    tmp_path = index_path + ".tmp.npz"
+    np.savez(tmp_path, positions=index.positions, block_min=index.block_min, block_max=index.block_max,
+             end_position=np.int64(index.end_position),
+             first_timestamp_ms=np.float64(np.nan if index.first_timestamp_ms is None else index.first_timestamp_ms),
+             key=np.array(json.dumps(key, sort_keys=True)))
+    os.replace(tmp_path, index_path)
+
+
+def load_trace_index(index_path: str, key) -> Optional[TraceTimeIndex]:
+    """索引存在且与当前trace文件/配置匹配时返回索引，否则返回 None"""
+    try:
+        with np.load(index_path) as data:
+            if str(data['key']) != json.dumps(key, sort_keys=True):
+                return None
+            first_ts = float(data['first_timestamp_ms'])
+            return TraceTimeIndex.from_blocks(data['positions'], data['block_min'], data['block_max'],
+                                              int(data['end_position']), None if np.isnan(first_ts) else first_ts)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_or_build_trace_index(parser, trace_file_path: str) -> TraceTimeIndex:
+    """加载trace旁边的索引；不存在或已过期时构建并保存"""
+    trace_format = parser.FORMAT_NAME
+    key = dict(trace_cache_key(trace_file_path, trace_format, parser.format_options), stride_lines=TRACE_INDEX_STRIDE_LINES)
+    index_path = trace_index_path(trace_file_path, trace_format)
+    index = load_trace_index(index_path, key)
+    if index is None:
+        print(f"Building timestamp index for '{trace_file_path}' (every {TRACE_INDEX_STRIDE_LINES} lines)...")
+        index = build_trace_index(parser, trace_file_path, TRACE_INDEX_STRIDE_LINES)
+        save_trace_index(index, index_path, key)
+    return index
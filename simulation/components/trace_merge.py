@@ -0,0 +1,133 @@
+# components/trace_merge.py
+# 多个按卷划分的trace文件 (例如 MSR 的 proj_0..proj_4, src1_*) 的流式 k 路归并。
+# 每个卷只在内存中保留当前一批记录，因此内存占用为 O(卷数 x 批大小)，与trace总长度无关。
+import heapq
+from typing import List, Iterator, Optional, Dict
+
+import numpy as np
+
+from components.trace_parser import TraceParser, TraceBatch, get_parser
+
+
+class _VolumeCursor:
+    """单个卷的读取游标：当前批次 + 已消费位置"""
+    def __init__(self, volume_idx: int, batches: Iterator[TraceBatch], lba_base: int,
+                 lba_span: int = 0, name: Optional[str] = None):
+        self.volume_idx = volume_idx
+        self.batches = batches
+        self.lba_base = lba_base
+        self.lba_span = lba_span # >0 时检查卷内LBA不超出自己的命名空间
+        self.name = name if name is not None else f"volume {volume_idx}"
+        self.batch = None
+        self.order_key = None # 时间戳的前缀最大值 (跨批延续)，保证卷内原有顺序不被打乱
+        self.pos = 0
+
+    def refill(self) -> bool:
+        """读入下一批，返回是否还有数据"""
+        for batch in self.batches:
+            if len(batch) == 0:
+                continue
+            if self.lba_span > 0:
+                bad = (batch.lba < 0) | (batch.lba >= self.lba_span)
+                if bad.any():
+                    raise ValueError(f"Trace {self.name}: LBA {int(batch.lba[bad][0])} is outside the per-volume span "
+                                     f"[0, {self.lba_span}) ({int(bad.sum())} such records in this batch); "
+                                     f"increase VOLUME_LBA_SPAN (TOTAL_LBAS) so volumes do not overlap")
+            batch = batch.take(slice(None)) # 新建批对象 (列仍为视图)，不改动解析器产出的原对象
+            batch.lba = batch.lba + self.lba_base # 每个卷拥有独立的LBA/chunk-id命名空间
+            batch.volume = np.full(len(batch), self.volume_idx, dtype=np.int16)
+            order_key = np.maximum.accumulate(batch.timestamp_ms)
+            if self.order_key is not None: # 上一批的最大值作为起点，跨批的时间倒退不会排到已输出的边界之前
+                np.maximum(order_key, self.order_key[-1], out=order_key)
+            self.batch = batch
+            self.order_key = order_key
+            self.pos = 0
+            return True
+        self.batch = None
+        return False
+
+    @property
+    def last_key(self) -> float:
+        return float(self.order_key[-1])
+
+    def take_until(self, frontier: float):
+        """取出当前批中时间戳不超过 frontier 的剩余记录，返回 (TraceBatch, 排序键) 或 None"""
+        end = int(np.searchsorted(self.order_key, frontier, side='right'))
+        if end <= self.pos:
+            return None
+        part = self.batch.take(slice(self.pos, end)), self.order_key[self.pos:end]
+        self.pos = end
+        return part
+
+
+class MergedTraceSource(TraceParser):
+    """
+    把 N 个trace文件按时间合并成一个有序流，接口与 TraceParser.iter_batches 一致。
+    - 每个卷使用各自的解析器 (若有有效的预处理缓存则直接 mmap)。
+    - 第 i 个卷的 LBA 整体偏移 i * volume_lba_span，使各卷拥有互不重叠的 chunk-id 命名空间。
+    - hostname / disk 原样保留，另附 volume 列记录来源卷序号。
+    归并方式：以各卷当前批次的最大时间戳为键放入小根堆，堆顶即为"安全边界"，
+    所有卷中不晚于该边界的记录都可以立即输出；堆顶卷随后补充下一批。
+    """
+    def __init__(self, trace_file_paths: List[str], trace_format: str,
+                 format_options: Optional[Dict] = None, volume_lba_span: int = 0):
+        super().__init__(has_header=False)
+        self.trace_file_paths = list(trace_file_paths)
+        self.trace_format = trace_format
+        self.format_options = format_options
+        self.volume_lba_span = volume_lba_span
+
+    def _parse_data_line(self, line: str):
+        return None # 归并源不直接处理文本行
+
+    def _volume_parsers(self):
+        return [get_parser(self.trace_format, self.format_options, trace_file_path=path)
+                for path in self.trace_file_paths]
+
+    def iter_batches(self, trace_file_path: str, batch_lines: int) -> Iterator[TraceBatch]:
+        """trace_file_path 参数被忽略：要归并的文件在构造时给定"""
+        return self._merge([parser.iter_batches(path, batch_lines)
+                            for parser, path in zip(self._volume_parsers(), self.trace_file_paths)])
+
+    def iter_window_batches(self, trace_file_path: str, batch_lines: int,
+                            t_start_ms: float, t_end_ms: float) -> Iterator[TraceBatch]:
+        """每个卷各自通过时间索引定位到窗口，再归并"""
+        return self._merge([parser.iter_window_batches(path, batch_lines, t_start_ms, t_end_ms)
+                            for parser, path in zip(self._volume_parsers(), self.trace_file_paths)])
+
+    def first_timestamp_ms(self, trace_file_path: str) -> Optional[float]:
+        """所有卷中最早的时间戳"""
+        first = [parser.first_timestamp_ms(path) for parser, path in zip(self._volume_parsers(), self.trace_file_paths)]
+        first = [ts for ts in first if ts is not None]
+        return min(first) if first else None
+
+    def _merge(self, volume_batch_iters: List[Iterator[TraceBatch]]) -> Iterator[TraceBatch]:
+        heap = []
+        cursors = []
+        for vol_idx, batches in enumerate(volume_batch_iters):
+            cursor = _VolumeCursor(vol_idx, batches, lba_base=vol_idx * self.volume_lba_span,
+                                   lba_span=self.volume_lba_span, name=self.trace_file_paths[vol_idx])
+            cursors.append(cursor)
+            if cursor.refill():
+                heapq.heappush(heap, (cursor.last_key, vol_idx))
+
+        while heap:
+            frontier, vol_idx = heap[0]
+            parts, keys = [], []
+            for cursor in cursors:
+                if cursor.batch is None:
+                    continue
+                taken = cursor.take_until(frontier)
+                if taken is not None:
+                    parts.append(taken[0])
+                    keys.append(taken[1])
+            if parts:
+                merged = TraceBatch.concat(parts)
+                order = np.argsort(np.concatenate(keys), kind='stable') # 同一时间戳按卷序号排列
+                yield merged.take(order)
+
+            # 堆顶卷的当前批已全部输出，补充下一批
+            heapq.heappop(heap)
+            cursor = cursors[vol_idx]
+            if cursor.refill():
+                heapq.heappush(heap, (cursor.last_key, vol_idx))
@@ -1,8 +1,11 @@
 # components/trace_parser.py
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+import itertools
 import math
+import numpy as np
+from config import LBA_SIZE_BYTES, TRACE_CACHE_ENABLED
 
 @dataclass
 class RawTraceEntry:
@@ -36,10 +39,88 @@ class RawTraceEntry:
     extra_fields: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass
+class TraceBatch:
+    """
+    一批trace记录的列式表示，由 TraceParser.parse_batch 一次性向量化生成。
+    列已经是模拟器使用的标准化值: 时间戳为毫秒，偏移量为LBA，大小为字节。
+    只有在调用 entry(i) 时才会构造单条 RawTraceEntry 对象。
+    """
+    timestamp_ms: np.ndarray # float64
+    lba: np.ndarray          # int64
+    size_bytes: np.ndarray   # int64
+    is_write: np.ndarray     # bool
+    disk: np.ndarray         # int32, 没有该字段的trace为 -1
+    hostname: Optional[np.ndarray] = None # object 数组，没有该字段的trace为 None
+    volume: Optional[np.ndarray] = None   # int16, 多trace合并回放时记录来源卷的序号
+
+    def __len__(self):
+        return len(self.timestamp_ms)
+
+    @classmethod
+    def concat(cls, batches: List["TraceBatch"]) -> "TraceBatch":
+        """按顺序拼接多个 TraceBatch；部分批次缺少的可选列以 None / -1 补齐"""
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        hostname = None
+        if any(b.hostname is not None for b in batches):
+            hostname = np.concatenate([b.hostname if b.hostname is not None else np.full(len(b), None, dtype=object)
+                                       for b in batches])
+        volume = None
+        if any(b.volume is not None for b in batches):
+            volume = np.concatenate([b.volume if b.volume is not None else np.full(len(b), -1, dtype=np.int16)
+                                     for b in batches])
+        return cls(timestamp_ms=np.concatenate([b.timestamp_ms for b in batches]),
+                   lba=np.concatenate([b.lba for b in batches]),
+                   size_bytes=np.concatenate([b.size_bytes for b in batches]),
+                   is_write=np.concatenate([b.is_write for b in batches]),
+                   disk=np.concatenate([b.disk for b in batches]),
+                   hostname=hostname, volume=volume)
+
+    @classmethod
+    def empty(cls) -> "TraceBatch":
+        return cls(timestamp_ms=np.empty(0, dtype=np.float64),
+                   lba=np.empty(0, dtype=np.int64),
+                   size_bytes=np.empty(0, dtype=np.int64),
+                   is_write=np.empty(0, dtype=bool),
+                   disk=np.empty(0, dtype=np.int32))
+
+    def take(self, index) -> "TraceBatch":
+        """按布尔掩码或下标数组选取子集，返回新的 TraceBatch"""
+        return TraceBatch(timestamp_ms=self.timestamp_ms[index], lba=self.lba[index],
+                          size_bytes=self.size_bytes[index], is_write=self.is_write[index],
+                          disk=self.disk[index],
+                          hostname=self.hostname[index] if self.hostname is not None else None,
+                          volume=self.volume[index] if self.volume is not None else None)
+
+    def in_time_window(self, t_start_ms: float, t_end_ms: float) -> "TraceBatch":
+        """只保留时间戳落在 [t_start_ms, t_end_ms) 内的记录"""
+        in_window = (self.timestamp_ms >= t_start_ms) & (self.timestamp_ms < t_end_ms)
+        return self if in_window.all() else self.take(in_window)
+
+    def entry(self, i: int) -> RawTraceEntry:
+        """按需构造第 i 条记录的 RawTraceEntry (单位已标准化)"""
+        disk = int(self.disk[i])
+        return RawTraceEntry(
+            raw_timestamp=float(self.timestamp_ms[i]), timestamp_unit='ms',
+            raw_offset=int(self.lba[i]), offset_unit='lba',
+            raw_size=int(self.size_bytes[i]), size_unit='bytes',
+            operation_type='write' if self.is_write[i] else 'read',
+            hostname=self.hostname[i] if self.hostname is not None else None,
+            disk_number=disk if disk >= 0 else None
+        )
+
+
 class TraceParser(ABC):
+    FORMAT_NAME = None # 与 config.TRACE_FORMAT 对应的格式名，用于缓存/索引文件的命名和校验
+    format_options = None # 构造该解析器时的选项 (由 get_parser 设置)，计入时间索引的校验键
+
     def __init__(self, has_header=False): # 添加 has_header 参数到基类
         self.has_header = has_header
         self.header_processed = not self.has_header # 如果没有header，则认为已处理
+        self.lines_read = 0
 
     def parse_line(self, line: str) -> Optional[RawTraceEntry]:
         """
@@ -60,6 +141,153 @@ class TraceParser(ABC):
         """
         pass
 
+    def parse_batch(self, lines: List[str]) -> TraceBatch:
+        """
+        批量解析一组trace行，返回列式的 TraceBatch。
+        头部、无效行的处理与 parse_line 一致。
+        """
+        if self.has_header and not self.header_processed and lines:
+            self.header_processed = True
+            lines = lines[1:]
+        if not lines:
+            return TraceBatch.empty()
+        return self._parse_data_batch(lines)
+
+    def _parse_data_batch(self, lines: List[str]) -> TraceBatch:
+        """
+        默认实现：逐行调用 _parse_data_line 后再组装成列。
+        子类应覆盖为向量化实现；向量化转换失败时也可以回退到这里。
+        """
+        columns = ([], [], [], [], [], [])
+        for line in lines:
+            raw_entry = self._parse_data_line(line)
+            if raw_entry is None:
+                continue
+            try:
+                sim_values = self.to_sim_values(raw_entry)
+            except ValueError:
+                continue
+            if sim_values is None:
+                continue
+            ts_ms, lba, size_bytes, op_type = sim_values
+            for col, val in zip(columns, (ts_ms, lba, size_bytes, op_type == 'write',
+                                          raw_entry.disk_number if raw_entry.disk_number is not None else -1,
+                                          raw_entry.hostname)):
+                col.append(val)
+        ts_col, lba_col, size_col, write_col, disk_col, host_col = columns
+        return TraceBatch(
+            timestamp_ms=np.array(ts_col, dtype=np.float64),
+            lba=np.array(lba_col, dtype=np.int64),
+            size_bytes=np.array(size_col, dtype=np.int64),
+            is_write=np.array(write_col, dtype=bool),
+            disk=np.array(disk_col, dtype=np.int32),
+            hostname=np.array(host_col, dtype=object) if any(h is not None for h in host_col) else None
+        )
+
+    @staticmethod
+    def _loadtxt_records(lines: List[str], dtype: np.dtype) -> Optional[np.ndarray]:
+        """
+        用 NumPy 的C实现一次性把整块文本行解析为结构化数组。
+        块中只要有一行字段数或数值格式不对就返回 None，由调用方回退到逐行过滤的路径。
+        """
+        try:
+            return np.loadtxt(lines, delimiter=',', dtype=dtype, comments=None, ndmin=1)
+        except ValueError:
+            return None
+
+    def iter_line_blocks(self, trace_file_path: str, batch_lines: int,
+                         byte_range: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, List[str]]]:
+        """
+        按块读取trace文本，产出 (块起始字节偏移, 行列表)。
+        byte_range=(start, end) 时只读取该区间，start 必须位于行首；start > 0 时认为头部已经被跳过。
+        """
+        start, end = byte_range if byte_range is not None else (0, None)
+        if start > 0:
+            self.header_processed = True
+        with open(trace_file_path, 'rb') as f:
+            f.seek(start)
+            pos = start
+            while end is None or pos < end:
+                raw_lines = list(itertools.islice(f, batch_lines))
+                if not raw_lines:
+                    break
+                chunk = b''.join(raw_lines)
+                if end is not None and pos + len(chunk) > end:
+                    chunk = chunk[:end - pos] # 区间末尾总在行首，截断后仍是完整的行
+                block_start = pos
+                pos += len(chunk)
+                lines = chunk.decode('utf-8', errors='replace').splitlines()
+                self.lines_read += len(lines)
+                yield block_start, lines
+
+    def iter_batches(self, trace_file_path: str, batch_lines: int,
+                     byte_range: Optional[Tuple[int, int]] = None) -> Iterator[TraceBatch]:
+        """按块读取trace文件，每次最多 batch_lines 行，逐块产出非空的 TraceBatch"""
+        for _, lines in self.iter_line_blocks(trace_file_path, batch_lines, byte_range):
+            batch = self.parse_batch(lines)
+            if len(batch):
+                yield batch
+
+    def iter_window_batches(self, trace_file_path: str, batch_lines: int,
+                            t_start_ms: float, t_end_ms: float) -> Iterator[TraceBatch]:
+        """
+        只回放trace时间落在 [t_start_ms, t_end_ms) 内的记录。
+        借助稀疏时间索引 (components/trace_index.py) 直接定位到对应的字节区间，不再从文件开头扫描。
+        """
+        from components.trace_index import load_or_build_trace_index
+        index = load_or_build_trace_index(self, trace_file_path)
+        byte_range = index.position_range(t_start_ms, t_end_ms)
+        if byte_range[0] >= byte_range[1]:
+            return
+        for batch in self.iter_batches(trace_file_path, batch_lines, byte_range):
+            batch = batch.in_time_window(t_start_ms, t_end_ms)
+            if len(batch):
+                yield batch
+
+    def first_timestamp_ms(self, trace_file_path: str) -> Optional[float]:
+        """trace中第一条有效记录的时间戳 (ms)，用于把相对时间窗口换算成trace时间"""
+        from components.trace_index import load_or_build_trace_index
+        return load_or_build_trace_index(self, trace_file_path).first_timestamp_ms
+
+    def to_sim_values(self, raw_entry: RawTraceEntry):
+        """将RawTraceEntry转换为模拟器内部使用的标准化值 (ms, LBA, bytes, 'read'/'write')"""
+        # 1. 时间戳转换为毫秒 (ms)
+        if raw_entry.timestamp_unit == '100ns_windows':
+            current_trace_time_ms = self.windows_filetime_to_ms(raw_entry.raw_timestamp)
+        elif raw_entry.timestamp_unit == 's': # 秒
+            current_trace_time_ms = float(raw_entry.raw_timestamp) * 1000.0
+        elif raw_entry.timestamp_unit == 'ms': # 毫秒
+            current_trace_time_ms = float(raw_entry.raw_timestamp)
+        else:
+            raise ValueError(f"Unsupported timestamp unit: {raw_entry.timestamp_unit}")
+        if current_trace_time_ms is None: return None # 转换失败
+
+        # 2. 偏移量转换为 LBA
+        raw_offset_val = int(raw_entry.raw_offset) # 假设原始偏移量总是数字
+        if raw_entry.offset_unit == 'bytes':
+            lba = raw_offset_val // LBA_SIZE_BYTES
+        elif raw_entry.offset_unit == 'lba':
+            lba = raw_offset_val
+        else:
+            raise ValueError(f"Unsupported offset unit: {raw_entry.offset_unit}")
+
+        # 3. 大小转换为 bytes
+        raw_size_val = int(raw_entry.raw_size) # 假设原始大小总是数字
+        if raw_entry.size_unit == 'bytes':
+            size_bytes = raw_size_val
+        elif raw_entry.size_unit == 'blocks': # 'blocks' 指的是LBA数量
+            size_bytes = raw_size_val * LBA_SIZE_BYTES
+        else:
+            raise ValueError(f"Unsupported size unit: {raw_entry.size_unit}")
+
+        # 4. 操作类型 (确保是小写 'read'/'write')
+        operation_type = raw_entry.operation_type.lower()
+        if operation_type not in ['read', 'write']:
+            print(f"Warning: Unknown operation type '{raw_entry.operation_type}', defaulting to 'read'.")
+            operation_type = 'read' # 或者抛出错误
+
+        return current_trace_time_ms, lba, size_bytes, operation_type
+
     def windows_filetime_to_ms(self, filetime_val: Any) -> Optional[float]:
         """辅助函数：将Windows filetime (100ns单位) 转换为毫秒"""
         try:
@@ -93,6 +321,8 @@ class TraceParser(ABC):
 
 # --- MSR Cambridge Trace Parser ---
 class MSRTraceParser(TraceParser):
+    FORMAT_NAME = "MSR"
+
     def __init__(self):
         super().__init__(has_header=False) # MSR trace 通常没有头部
 
@@ -128,8 +358,51 @@ class MSRTraceParser(TraceParser):
             # print(f"MSRParser: Error converting MSR trace fields: {e} for line: {line.strip()}")
             return None
 
+    # Timestamp,Hostname,DiskNumber,Type,Offset,Size,ResponseTime
+    # 主机名长度不定，用 object 列原样保留 (定长 Unicode 列会截断长主机名，与逐行解析的结果不一致)
+    _BATCH_DTYPE = np.dtype([('ts', 'i8'), ('host', object), ('disk', 'i4'), ('type', 'U8'),
+                             ('offset', 'i8'), ('size', 'i8'), ('resp', 'i8')])
+
+    def _parse_data_batch(self, lines: List[str]) -> TraceBatch:
+        records = self._loadtxt_records(lines, self._BATCH_DTYPE)
+        if records is None:
+            return self._parse_data_batch_rows(lines)
+        op_types = np.char.lower(records['type'])
+        batch = TraceBatch(
+            timestamp_ms=records['ts'] / 10000.0, # 100ns to 1ms
+            lba=records['offset'] // LBA_SIZE_BYTES,
+            size_bytes=records['size'],
+            is_write=op_types == 'write',
+            disk=records['disk'],
+            hostname=records['host']
+        )
+        valid = batch.is_write | (op_types == 'read')
+        return batch if valid.all() else batch.take(valid)
+
+    def _parse_data_batch_rows(self, lines: List[str]) -> TraceBatch:
+        """块中有格式异常的行时使用：先在Python中按行过滤，再整列转换"""
+        rows = [parts for parts in (line.strip().split(',') for line in lines)
+                if len(parts) == 7 and parts[3].lower() in ('read', 'write')]
+        if not rows:
+            return TraceBatch.empty()
+        ts_col, host_col, disk_col, type_col, offset_col, size_col, _ = zip(*rows)
+        try:
+            return TraceBatch(
+                timestamp_ms=np.array(ts_col).astype(np.int64) / 10000.0,
+                lba=np.array(offset_col).astype(np.int64) // LBA_SIZE_BYTES,
+                size_bytes=np.array(size_col).astype(np.int64),
+                is_write=np.array([t.lower() == 'write' for t in type_col], dtype=bool),
+                disk=np.array(disk_col).astype(np.int32),
+                hostname=np.array(host_col, dtype=object)
+            )
+        except ValueError:
+            # 仍有无法整列转换的字段 (如科学计数法时间戳)，回退到逐行解析
+            return super()._parse_data_batch(lines)
+
 # --- Systor '17 Trace Parser ---
 class Systor17Parser(TraceParser):
+    FORMAT_NAME = "SYSTOR17"
+
     def __init__(self, has_header=True):
         super().__init__(has_header=has_header)
 
@@ -171,6 +444,54 @@ class Systor17Parser(TraceParser):
         except ValueError:
             return None
 
+    @staticmethod
+    def _op_code(iotype_str: str) -> int:
+        """1: write, 0: read, -1: 无效"""
+        op_type_lower = iotype_str.lower()
+        if 'read' in op_type_lower or 'r' == op_type_lower: return 0
+        if 'write' in op_type_lower or 'w' == op_type_lower: return 1
+        return -1
+
+    # Timestamp,Response,IOType,LUN,Offset,Size
+    _BATCH_DTYPE = np.dtype([('ts', 'f8'), ('resp', 'f8'), ('type', 'U16'), ('lun', 'i4'),
+                             ('offset', 'i8'), ('size', 'i8')])
+
+    def _parse_data_batch(self, lines: List[str]) -> TraceBatch:
+        records = self._loadtxt_records(lines, self._BATCH_DTYPE)
+        if records is None:
+            return self._parse_data_batch_rows(lines)
+        op_codes = np.array([self._op_code(t) for t in records['type'].tolist()], dtype=np.int8)
+        batch = TraceBatch(
+            timestamp_ms=records['ts'] * 1000.0, # 保留小数精度
+            lba=records['offset'] // LBA_SIZE_BYTES,
+            size_bytes=records['size'],
+            is_write=op_codes == 1,
+            disk=records['lun']
+        )
+        valid = op_codes >= 0
+        return batch if valid.all() else batch.take(valid)
+
+    def _parse_data_batch_rows(self, lines: List[str]) -> TraceBatch:
+        """块中有格式异常的行时使用：先在Python中按行过滤，再整列转换"""
+        rows = [parts for parts in (line.strip().split(',') for line in lines) if len(parts) == 6]
+        if not rows:
+            return TraceBatch.empty()
+        ts_col, resp_col, iotype_col, lun_col, offset_col, size_col = zip(*rows)
+        op_codes = np.array([self._op_code(t) for t in iotype_col], dtype=np.int8)
+        valid = op_codes >= 0
+        try:
+            batch = TraceBatch(
+                timestamp_ms=np.array(ts_col).astype(np.float64) * 1000.0,
+                lba=np.array(offset_col).astype(np.int64) // LBA_SIZE_BYTES,
+                size_bytes=np.array(size_col).astype(np.int64),
+                is_write=op_codes == 1,
+                disk=np.array(lun_col).astype(np.int32)
+            )
+            np.array(resp_col).astype(np.float64) # 与逐行解析一致：响应时间无效的行视为无效行
+        except ValueError:
+            return super()._parse_data_batch(lines)
+        return batch if valid.all() else batch.take(valid)
+
 # # --- Generic CSV Parser (示例：timestamp_ms,lba,size_bytes,type) ---
 # class GenericCSVParser(TraceParser):
 #     def __init__(self, has_header=True):
@@ -238,12 +559,30 @@ class Systor17Parser(TraceParser):
 #             # print(f"CBSTraceParser: Error converting fields: {e} for line: {line.strip()}")
 #             return None
 
-def get_parser(trace_format: str, format_options: Optional[Dict] = None) -> TraceParser:
+def get_parser(trace_format: str, format_options: Optional[Dict] = None,
+               trace_file_path: Optional[str] = None) -> TraceParser:
+    """
+    返回对应格式的解析器。
+    如果给出了 trace_file_path 且其旁边存在有效的预处理缓存 (见 components/trace_cache.py)，
+    则直接返回读取缓存的 CachedTraceParser。
+    """
     if format_options is None: format_options = {}
     fmt_upper = trace_format.upper()
 
-    if fmt_upper == "MSR": return MSRTraceParser()
-    elif fmt_upper == "SYSTOR17": return Systor17Parser(has_header=format_options.get('has_header', True))
-    # elif fmt_upper == "GENERIC_CSV": return GenericCSVParser(has_header=format_options.get('has_header', True))
-    # elif fmt_upper == "CBS": return CBSTraceParser(has_header=format_options.get('has_header', True))
-    else: raise ValueError(f"Unsupported trace format: {trace_format}")
\ No newline at end of file
+    if fmt_upper == "SYNTHETIC": # 合成负载，不读文件 (trace_file_path 被忽略)
+        from components.synthetic_trace import SyntheticTraceSource
+        return SyntheticTraceSource(format_options)
+
+    if trace_file_path is not None and TRACE_CACHE_ENABLED:
+        from components.trace_cache import CachedTraceParser, load_valid_cache_header, trace_cache_path
+        header = load_valid_cache_header(trace_file_path, fmt_upper, format_options)
+        if header is not None:
+            return CachedTraceParser(trace_cache_path(trace_file_path, fmt_upper), header)
+
+    if fmt_upper == "MSR": parser = MSRTraceParser()
+    elif fmt_upper == "SYSTOR17": parser = Systor17Parser(has_header=format_options.get('has_header', True))
+    # elif fmt_upper == "GENERIC_CSV": parser = GenericCSVParser(has_header=format_options.get('has_header', True))
+    # elif fmt_upper == "CBS": parser = CBSTraceParser(has_header=format_options.get('has_header', True))
+    else: raise ValueError(f"Unsupported trace format: {trace_format}")
+    parser.format_options = format_options
+    return parser
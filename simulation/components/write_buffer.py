@@ -0,0 +1,190 @@
+# components/write_buffer.py
+# 写回缓冲：在较快的层级 (默认 Tier2_SSD) 中划出 WRITE_BUFFER_CAPACITY_MB 的空间，
+# 吸收落在 backing store (HDD) chunk 上的小写 (不超过 WRITE_BUFFER_MAX_WRITE_BYTES)，
+# 由后台 destager 进程在 HDD 空闲时 (或缓冲超过高水位时) 按 LBA 排序、合并相邻区间后批量刷回。
+#   - 每个chunk的缓冲区间按 LBA 排序、互不重叠，写入时与重叠/相邻的区间合并 (重复写的部分只占一份空间、只刷一次)
+#   - 读请求的区间被某个缓冲区间完整包含时由缓冲所在层级服务
+#   - chunk 被迁出 backing store 时，它的缓冲区间随chunk一起迁走 (不再刷回 HDD)，目标层级中该chunk标记为脏
+#   - 刷回的 I/O 以迁移优先级 (后台) 排队，不会挡在前台I/O前面
+from bisect import bisect_left, bisect_right
+
+from config import LBA_SIZE_BYTES, LBAS_PER_CHUNK
+from components.storage import IO_CLASS_MIGRATION
+
+
+class WriteBackBuffer:
+    def __init__(self, env, buffer_tier, backing_tier, capacity_bytes, max_write_bytes,
+                 destage_batch_bytes, high_watermark, idle_check_ms):
+        self.env = env
+        self.buffer_tier = buffer_tier
+        self.backing_tier = backing_tier
+        # 缓冲空间从所在层级的容量中划出，迁移策略看到的是剩下的容量
+        self.capacity_bytes = min(capacity_bytes, buffer_tier.capacity_bytes)
+        if self.capacity_bytes <= 0:
+            raise ValueError(f"Write-back buffer in {buffer_tier.name} has no capacity "
+                             f"(requested {capacity_bytes} B, tier has {buffer_tier.capacity_bytes} B)")
+        buffer_tier.capacity_bytes -= self.capacity_bytes
+        self.max_write_bytes = max_write_bytes
+        self.destage_batch_bytes = destage_batch_bytes
+        self.high_watermark_bytes = high_watermark * self.capacity_bytes
+        self.idle_check_ms = idle_check_ms
+
+        # chunk_id -> [(起始lba, 结束lba, 版本号), ...]，按起始 lba 排序、互不重叠 ([起始, 结束) 以 LBA 为单位)；
+        # 区间被改写 (合并了新的写) 时换新版本号，刷回期间被改写的区间刷完后仍然保留
+        self.chunk_extents = {}
+        self.buffered_bytes = 0 # 按 LBA 对齐后的字节数
+        self._version = 0
+        self._destage_cursor = 0 # 上一批刷到的位置，下一批从这里继续向高地址扫描 (到顶后回绕)
+        self._wakeup = None
+
+        self.stats = {'absorbed_writes': 0, 'absorbed_bytes': 0, 'overwrites': 0,
+                      'bypassed_too_large': 0, 'bypassed_full': 0, 'read_hits': 0,
+                      'destage_batches': 0, 'destaged_bytes': 0, 'destage_ios': 0, 'destaged_extents': 0,
+                      'destage_time': 0.0, 'migrated_away_bytes': 0}
+        self.process = env.process(self._destager())
+
+    # --- 前台路径 ---
+
+    def try_absorb(self, lba, size_bytes, chunk_id):
+        """尝试把一次写放进缓冲，成功时返回 True (调用方改为写缓冲所在层级的设备)"""
+        if size_bytes > self.max_write_bytes:
+            self.stats['bypassed_too_large'] += 1
+            return False
+        end = lba + -(-size_bytes // LBA_SIZE_BYTES)
+        extents = self.chunk_extents.get(chunk_id, [])
+        # [i, j) 为与新区间重叠或相邻的已有区间
+        i = bisect_left(extents, (lba,))
+        if i > 0 and extents[i - 1][1] >= lba:
+            i -= 1
+        j = i
+        new_start, new_end, covered, overlap = lba, end, 0, 0
+        while j < len(extents) and extents[j][0] <= end:
+            start_j, end_j, _ = extents[j]
+            new_start, new_end = min(new_start, start_j), max(new_end, end_j)
+            covered += end_j - start_j
+            overlap += max(min(end, end_j) - max(lba, start_j), 0)
+            j += 1
+        grow = (new_end - new_start - covered) * LBA_SIZE_BYTES
+        if grow > 0 and self.buffered_bytes + grow > self.capacity_bytes:
+            self.stats['bypassed_full'] += 1
+            return False
+        self._version += 1
+        if overlap:
+            self.stats['overwrites'] += 1
+        extents[i:j] = [(new_start, new_end, self._version)]
+        self.chunk_extents[chunk_id] = extents
+        self.buffered_bytes += grow
+        self.stats['absorbed_writes'] += 1
+        self.stats['absorbed_bytes'] += size_bytes
+        if self._wakeup is not None and not self._wakeup.triggered and self._destage_wanted():
+            self._wakeup.succeed()
+        return True
+
+    def covers_read(self, lba, size_bytes):
+        """读区间是否完整落在某个缓冲区间内"""
+        extents = self.chunk_extents.get(lba // LBAS_PER_CHUNK)
+        if not extents:
+            return False
+        i = bisect_right(extents, (lba, float('inf'))) - 1
+        if i >= 0 and extents[i][1] >= lba + -(-size_bytes // LBA_SIZE_BYTES):
+            self.stats['read_hits'] += 1
+            return True
+        return False
+
+    def migrate_chunk_away(self, chunk_id):
+        """chunk 迁出 backing store：丢弃它的缓冲区间，返回是否有缓冲的 (更新的) 数据"""
+        extents = self.chunk_extents.pop(chunk_id, None)
+        if not extents:
+            return False
+        size_bytes = sum(end - start for start, end, _ in extents) * LBA_SIZE_BYTES
+        self.buffered_bytes -= size_bytes
+        self.stats['migrated_away_bytes'] += size_bytes
+        return True
+
+    # --- 后台刷回 ---
+
+    def _backing_idle(self):
+        return any(d.is_idle() for d in self.backing_tier.devices)
+
+    def _destage_wanted(self):
+        """有数据且达到批大小 (或高水位) 时刷回；空缓冲永远不刷 (高水位为 0 时也不会空转)"""
+        return self.buffered_bytes > 0 and self.buffered_bytes >= min(self.destage_batch_bytes, self.high_watermark_bytes)
+
+    def _select_batch(self):
+        """从游标位置开始按 LBA 升序取不超过 destage_batch_bytes 的区间，并把首尾相接的区间合并成一个写I/O"""
+        extents = sorted((start, end, version, chunk_id)
+                         for chunk_id, chunk_extents in self.chunk_extents.items()
+                         for start, end, version in chunk_extents)
+        start = bisect_left(extents, (self._destage_cursor,))
+        selected, total = [], 0
+        for extent in extents[start:] + extents[:start]:
+            size_bytes = (extent[1] - extent[0]) * LBA_SIZE_BYTES
+            if selected and total + size_bytes > self.destage_batch_bytes:
+                break
+            selected.append(extent)
+            total += size_bytes
+        merged = [] # [起始lba, 结束lba) 的写I/O
+        for lba, end, _, _ in sorted(selected):
+            if merged and lba <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([lba, end])
+        self._destage_cursor = selected[-1][0] + 1
+        return selected, merged
+
+    def _destager(self):
+        while True:
+            if not self._destage_wanted():
+                self._wakeup = self.env.event()
+                yield self._wakeup
+                self._wakeup = None
+            # 设备都在忙时等待空闲，除非缓冲已经超过高水位
+            if self.buffered_bytes < self.high_watermark_bytes and not self._backing_idle():
+                yield self.env.timeout(self.idle_check_ms)
+                continue
+            if not self.chunk_extents: # 等待期间缓冲的数据都随chunk迁走了，回到开头等待新的写
+                continue
+            selected, merged = self._select_batch()
+            batch_start = self.env.now
+            done = self.env.event()
+            remaining = [len(merged)]
+
+            def _io_done():
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    done.succeed()
+            for start_lba, end_lba in merged:
+                device = self.backing_tier.get_device(start_lba)
+                device.serve_async((end_lba - start_lba) * LBA_SIZE_BYTES, 'write', _io_done, io_class=IO_CLASS_MIGRATION,
+                                   lba=self.backing_tier.device_lba(start_lba))
+            yield done
+
+            for extent in selected:
+                chunk_id = extent[3]
+                extents = self.chunk_extents.get(chunk_id)
+                if not extents:
+                    continue # 刷回期间随chunk迁走
+                i = bisect_left(extents, extent[:1])
+                if i == len(extents) or extents[i] != extent[:3]: # 刷回期间被改写
+                    continue
+                del extents[i]
+                if not extents:
+                    del self.chunk_extents[chunk_id]
+                size_bytes = (extent[1] - extent[0]) * LBA_SIZE_BYTES
+                self.buffered_bytes -= size_bytes
+                self.stats['destaged_bytes'] += size_bytes
+                self.stats['destaged_extents'] += 1
+                self.backing_tier.set_dirty(chunk_id) # 与直接写 HDD 的效果一致
+            self.stats['destage_batches'] += 1
+            self.stats['destage_ios'] += len(merged)
+            self.stats['destage_time'] += self.env.now - batch_start
+
+    def summary(self):
+        s = self.stats
+        bandwidth = s['destaged_bytes'] / 2**20 / (s['destage_time'] / 1000.0) if s['destage_time'] else 0.0
+        return (f"absorbed {s['absorbed_writes']} writes ({s['absorbed_bytes'] / 2**20:.1f} MB, {s['overwrites']} overwrites), "
+                f"bypassed {s['bypassed_too_large']} large / {s['bypassed_full']} when full, {s['read_hits']} read hits; "
+                f"destaged {s['destaged_bytes'] / 2**20:.1f} MB in {s['destage_batches']} batches "
+                f"({s['destaged_extents']} extents -> {s['destage_ios']} I/Os, {bandwidth:.1f} MB/s while destaging), "
+                f"{s['migrated_away_bytes'] / 2**20:.1f} MB moved with promoted chunks, "
+                f"{self.buffered_bytes / 2**20:.1f} MB still buffered")
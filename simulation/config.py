@@ -1,4 +1,6 @@
 # config.py
+import json
+import os
 
 
 # 1 min = 60000 ms
@@ -14,34 +16,158 @@ LBAS_PER_CHUNK = CHUNK_SIZE_BYTES // LBA_SIZE_BYTES
 
 
 # --- Trace Configuration ---
-# 可选值: "MSR", "GENERIC_CSV", "CBS", "SYSTOR17"
+# 可选值: "MSR", "GENERIC_CSV", "CBS", "SYSTOR17", "SYNTHETIC" (合成负载，不读trace文件，参数见 TRACE_FORMAT_OPTIONS)
 TRACE_FORMAT = "MSR" # <<--- 修改这里来选择不同的解析器
 
 LOGS_DIR = "/home/cyrus/PycharmProjects/MLDS/simulation/logs"
 OUTPUT_DIR = "/home/cyrus/PycharmProjects/MLDS/simulation/simulation_output"
+# 每次批量解析的trace行数 (RequestGenerator 按块向量化读取)
+TRACE_BATCH_LINES = 65536
+# 预处理trace缓存 (先运行 preprocess_trace.py 生成)；有效时 get_parser 自动 mmap 缓存，跳过文本解析
+TRACE_CACHE_ENABLED = True
+TRACE_CACHE_DIR = None # None 表示放在trace文件旁边
+TRACE_PREPROCESS_WORKERS = 1 # >1 时按字节区间切分trace，多进程并行预处理
+# 时间索引：每隔多少行记录一次 (trace时间 -> 字节偏移)，索引文件保存在trace旁边
+TRACE_INDEX_STRIDE_LINES = 8192
+# 只回放trace的某个时间窗口 (相对trace第一条记录的毫秒数, [start, end))，None 表示回放整个trace
+# 例如回放第9到第10小时: (60000 * 60 * 9, 60000 * 60 * 10)
+REPLAY_WINDOW_MS = None
+# 回放窗口之前被跳过的部分是否用来"快进"策略状态 (只更新访问统计和数据放置，不模拟设备IO)
+REPLAY_FAST_FORWARD = False
+REPLAY_FAST_FORWARD_SPAN_MS = None # 只快进窗口开始前的这段时长，None 表示从trace开头快进
+# 到达调度模式:
+#   "per_request" 每个请求一个 timeout 事件 + 一个处理进程 (原始行为)
+#   "coalesced"   把到达时间相差不超过 ARRIVAL_COALESCE_EPSILON_MS 的请求合并为一次唤醒，
+#                 并且简单I/O通过事件回调完成，不再为每个请求创建生成器进程
+# epsilon 为 0 时只合并同一时刻到达的请求，结果与 "per_request" 完全一致；
+# epsilon > 0 时组内后到的请求会提前 (最多 epsilon) 到达，用精度换事件数
+ARRIVAL_SCHEDULING = "per_request"
+ARRIVAL_COALESCE_EPSILON_MS = 0.0
+# 完成记录 (CompletionStore) 的初始行数，不够时成倍扩容
+COMPLETION_STORE_INITIAL_CAPACITY = 1 << 16
+# chunk 访问日志每块缓冲区的初始行数 (按决策窗口内的最大访问数自动扩容)
+ACCESS_LOG_INITIAL_CAPACITY = 1 << 16
+# 延迟直方图 (对数分桶)：取值范围和相对精度，分位数相对误差不超过 precision/2
+LATENCY_HISTOGRAM_MIN_MS = 1e-4
+LATENCY_HISTOGRAM_MAX_MS = 1e6
+LATENCY_HISTOGRAM_PRECISION = 0.01
+# 是否保留逐请求的完成记录 (CompletionStore)；关闭后只保留延迟直方图，内存与请求数无关
+COMPLETION_STORE_ENABLED = True
+# chunk 位置表 (ChunkLocationMap) 使用稠密 int8 数组的最大chunk数，超过后改用只记录已迁移chunk的稀疏模式
+CHUNK_LOCATION_DENSE_MAX_CHUNKS = 1 << 28
+# 回放模式:
+#   "open_loop"   按trace中的到达时间回放；REPLAY_SPEEDUP > 1 时按该倍数压缩到达间隔 (加速回放)
+#   "closed_loop" 忽略到达时间，每个卷 (多trace归并时的卷，单trace时按disk号) 保持 CLOSED_LOOP_QUEUE_DEPTH 个在途I/O，
+#                 一个完成后立即发出下一个，用于寻找层级配置的饱和点
+REPLAY_MODE = "open_loop"
+REPLAY_SPEEDUP = 1.0
+CLOSED_LOOP_QUEUE_DEPTH = 8
+# 闭环回放时已从trace读出、等待所属卷空出位置的记录总数上限 (限制内存；快卷最多领先慢卷这么多条记录)
+CLOSED_LOOP_MAX_PENDING = 65536
+# 模拟引擎:
+#   "simpy"      离散事件模拟 (完整模型：迁移I/O、优先级、写回缓冲、闭环回放等)
+#   "analytical" 解析式快速回放 (components/fast_replay.py)：每个设备按 FIFO 递推批量计算完成时间，
+#                迁移决策在窗口之间立即生效、不模拟迁移I/O，用于只改变数据放置的策略扫描
+SIMULATION_ENGINE = "simpy"
+# SIMULATION_ENGINE = "simpy" 时使用的离散事件内核:
+#   "simpy" simpy.Environment
+#   "heap"  components/event_core.py 的轻量内核 (扁平 heapq + 精简事件对象)，调度语义与 SimPy 相同、结果一致，只是更快
+EVENT_CORE = "simpy"
+# 时间序列采样 (components/timeseries.py)：每隔 TIMESERIES_INTERVAL_MS 模拟时间记录各设备的排队数、在服务数、忙碌比例，
+# 以及各层级的占用率和命中份额，运行结束后导出到 OUTPUT_DIR 下的一个 .npz 文件 (只支持 SIMULATION_ENGINE = "simpy")
+TIMESERIES_ENABLED = False
+TIMESERIES_INTERVAL_MS = 1000.0
+# 设备队列的优先级调度：前台I/O (用户读写) 排在迁移I/O之前 (非抢占，正在服务的迁移I/O不会被打断)
+# False 时所有I/O按到达顺序平等竞争设备 (原始行为)，用于对比迁移给前台I/O带来的额外延迟
+DEVICE_PRIORITY_SCHEDULING = True
+# 层级内的设备选择策略 (可在 TIER_CONFIGS 中用 'device_selection' 按层级覆盖):
+#   "round_robin"    轮询 (原始行为)；HDD 的 chunk 操作仍按 num_devices 缩短单个设备的服务时间来近似并行
+#   "jsq"            选当前队列最短 (在服务 + 排队) 的设备
+#   "chunk_affinity" 按 chunk_id 哈希固定到一个设备
+#   "striped"        RAID-0 式条带化 (条带单元 = chunk / num_devices)：小I/O落到 LBA 所在条带的设备，
+#                    chunk 操作拆成每个设备一份并发执行，最慢的一份完成时结束
+DEVICE_SELECTION_POLICY = "round_robin"
+# HDD 寻道模型 (components/hdd_model.py)：按磁头位置和LBA距离查表计算寻道 + 旋转等待，代替每次访问固定的 a_ms；
+# False 时 HDD 仍用 a + b * LBA数 的常数模型 (原始行为)。只有 SIMULATION_ENGINE = "simpy" 支持
+HDD_SEEK_MODEL_ENABLED = False
+HDD_SEEK_MODEL_PARAMS = {
+    'rpm': 7200,
+    'track_to_track_seek_ms': 0.5,
+    'full_stroke_seek_ms': 12.0,
+    'lbas_per_track': None, # None: 由 b_ms_per_lba 推出 (转一圈正好传输一个磁道)
+    'overhead_ms': 0.0,     # 每次访问的控制器开销
+}
+# 启用寻道模型时 HDD 设备队列在同一优先级内的服务顺序: "fifo" 按到达顺序；"clook" 按 C-LOOK (单向电梯) 顺序
+HDD_QUEUE_SCHEDULING = "clook"
+# 多通道 SSD 模型 (storage.SSDDevice + components/ssd_model.py)，在 TIER_CONFIGS 中用 'ssd_model' 按层级开启:
+#   None 表示单队列的 a + b * LBA数 模型 (原始行为)；True 或参数字典 (未给出的参数取下面的默认值) 表示多通道模型
+SSD_MODEL_DEFAULTS = {
+    'channels': 8,                  # 独立的通道/die 数，每个通道一个队列
+    'stripe_bytes': 64 * 1024,      # 一次I/O在通道间条带化的粒度
+    'channel_b_ms_per_lba': None,   # 单个通道的每LBA传输时间，None 表示 b_ms_per_lba * channels
+    'over_provisioning': 0.07,      # 预留空间占用户容量的比例
+    'max_write_amplification': 10.0,
+}
+# 一个决策窗口内最多同时执行的迁移数 (不同源/目标设备上的迁移可以重叠)；1 表示逐个串行执行 (原始行为)
+MIGRATION_MAX_PARALLEL = 4
+# 同一源层级上需要读源的在途迁移数上限 = 该值 * 源层级设备数 (迁移时要先从源层级读出chunk)；0 表示只受 MIGRATION_MAX_PARALLEL 限制
+MIGRATION_MAX_PER_SOURCE_DEVICE = 1
+# 写回缓冲 (components/write_buffer.py)：在 WRITE_BUFFER_TIER_IDX 层级中划出一块空间吸收落在 backing store 上的小写，
+# 后台 destager 在 HDD 空闲 (或缓冲超过高水位) 时按 LBA 排序、合并后批量刷回
+WRITE_BUFFER_ENABLED = False
+WRITE_BUFFER_TIER_IDX = 1
+WRITE_BUFFER_CAPACITY_MB = 256
+WRITE_BUFFER_MAX_WRITE_BYTES = 64 * 1024 # 超过这个大小的写直接写 HDD
+WRITE_BUFFER_DESTAGE_BATCH_MB = 4        # 每批刷回的数据量，也是 HDD 空闲时开始刷回的阈值
+WRITE_BUFFER_HIGH_WATERMARK = 0.75       # 缓冲占用超过这个比例时不等 HDD 空闲，直接刷回
+WRITE_BUFFER_IDLE_CHECK_MS = 20          # HDD 忙时隔多久再检查一次
+# 迁移计划 (MigrationPlanner)：执行前对策略的决策去重、合并多跳迁移、取消来回迁移，并统计节省的迁移流量
+MIGRATION_PLANNER_ENABLED = True
+# 跨窗口抖动抑制 (可选)：刚迁出某层级的chunk在这么多个决策窗口内又要迁回时撤销这次迁回 (连同与之成对的迁移)。
+# 这会改变策略的放置结果，默认 0 不抑制，计划器只做不改变结果的去重、合并和取消
+MIGRATION_BOUNCE_HOLD_WINDOWS = 0
 TRACE_FORMAT_OPTIONS = {
     "GENERIC_CSV": {"has_header": True}, # 示例
-    "CBS": {"has_header": False} # 示例
+    "CBS": {"has_header": False}, # 示例
+    # 合成负载 (components/synthetic_trace.py)，未列出的参数使用 SYNTHETIC_DEFAULTS
+    "SYNTHETIC": {
+        "seed": 42,
+        "num_chunks": 1 << 16,
+        "num_requests": 1_000_000,
+        "zipf_alpha": 1.1,
+        "hotspot_drift_chunks_per_hour": 0,
+        "write_ratio": 0.3,
+        "rate_iops": 200.0,
+        "arrival_process": "poisson", # 或 "bursty"
+        "diurnal_amplitude": 0.0,
+        "sequential_prob": 0.0,
+    },
 }
 # 存储层级配置 (示例，需要根据论文和实际情况调整)
 # (name, capacity_bytes, device_type, 'a' (base_latency_ms), 'b' (per_lba_latency_ms), num_devices)
 # 论文中时间单位是ms还是us需要注意，这里统一用ms示例
 # 假设 'a' 和 'b' 是从论文6.2节校准的，但要注意单位统一！
+# 可选 'migration_bandwidth_MBps': 该层级迁移读写的令牌桶限速 (MB/s，None 或不写表示不限速；迁出时的源读和迁入时的写都计入)，
+#      'migration_burst_MB': 令牌桶的突发量 (默认一个chunk)
+#      'device_selection': 该层级的设备选择策略 (默认 DEVICE_SELECTION_POLICY)
 TIER_CONFIGS_SYS17 = [
-    {'name': 'Tier1_Optane', 'capacity_MB': 1024 * 32,  'a_ms': 0.0002, 'b_ms_per_lba': 0.00026, 'num_devices': 1}, # Optane: a=0.2us, b=0.26us/LBA
-    {'name': 'Tier2_SSD',    'capacity_MB': 1024 * 512, 'a_ms': 0.06,   'b_ms_per_lba': 0.0005,  'num_devices': 1}, # SSD: a=60us, b=0.5us/LBA
-    {'name': 'Tier3_HDD',    'capacity_MB': 524288 * 10, 'a_ms': 4.0,    'b_ms_per_lba': 0.002,   'num_devices': 8}  # HDD: a=4ms, b=2us/LBA. 论文中HDD是8个并行
+    {'name': 'Tier1_Optane', 'capacity_MB': 1024 * 32,  'a_ms': 0.0002, 'b_ms_per_lba': 0.00026, 'num_devices': 1, 'migration_bandwidth_MBps': None}, # Optane: a=0.2us, b=0.26us/LBA
+    {'name': 'Tier2_SSD',    'capacity_MB': 1024 * 512, 'a_ms': 0.06,   'b_ms_per_lba': 0.0005,  'num_devices': 1, 'migration_bandwidth_MBps': None,
+     'write_cost_factor': 2.0, 'ssd_model': None}, # SSD: a=60us, b=0.5us/LBA，写慢2倍 (论文6.2节校准)
+    {'name': 'Tier3_HDD',    'capacity_MB': 524288 * 10, 'a_ms': 4.0,    'b_ms_per_lba': 0.002,   'num_devices': 8, 'migration_bandwidth_MBps': None}  # HDD: a=4ms, b=2us/LBA. 论文中HDD是8个并行
 ]
 TIER_CONFIGS_MSR = [
-    {'name': 'Tier1_Optane', 'capacity_MB': 512,  'a_ms': 0.0002, 'b_ms_per_lba': 0.00026, 'num_devices': 1}, # Optane: a=0.2us, b=0.26us/LBA
-    {'name': 'Tier2_SSD',    'capacity_MB': 1024 * 4, 'a_ms': 0.06,   'b_ms_per_lba': 0.0005,  'num_devices': 1}, # SSD: a=60us, b=0.5us/LBA
-    {'name': 'Tier3_HDD',    'capacity_MB': 1024 * 24, 'a_ms': 4.0,    'b_ms_per_lba': 0.002,   'num_devices': 8}  # HDD: a=4ms, b=2us/LBA. 论文中HDD是8个并行
+    {'name': 'Tier1_Optane', 'capacity_MB': 512,  'a_ms': 0.0002, 'b_ms_per_lba': 0.00026, 'num_devices': 1, 'migration_bandwidth_MBps': None}, # Optane: a=0.2us, b=0.26us/LBA
+    {'name': 'Tier2_SSD',    'capacity_MB': 1024 * 4, 'a_ms': 0.06,   'b_ms_per_lba': 0.0005,  'num_devices': 1, 'migration_bandwidth_MBps': None,
+     'write_cost_factor': 2.0, 'ssd_model': None}, # SSD: a=60us, b=0.5us/LBA，写慢2倍 (论文6.2节校准)
+    {'name': 'Tier3_HDD',    'capacity_MB': 1024 * 24, 'a_ms': 4.0,    'b_ms_per_lba': 0.002,   'num_devices': 8, 'migration_bandwidth_MBps': None}  # HDD: a=4ms, b=2us/LBA. 论文中HDD是8个并行
     # 24 G
 ]
 TIER_CONFIGS = [
-    {'name': 'Tier1_Optane', 'capacity_MB': 1024 * 16,  'a_ms': 0.0002, 'b_ms_per_lba': 0.00026, 'num_devices': 1}, # Optane: a=0.2us, b=0.26us/LBA
-    {'name': 'Tier2_SSD',    'capacity_MB': 1024 * 64, 'a_ms': 0.06,   'b_ms_per_lba': 0.0005,  'num_devices': 1}, # SSD: a=60us, b=0.5us/LBA
-    {'name': 'Tier3_HDD',    'capacity_MB': 1024 * 256, 'a_ms': 4.0,    'b_ms_per_lba': 0.002,   'num_devices': 8}  # HDD: a=4ms, b=2us/LBA. 论文中HDD是8个并行
+    {'name': 'Tier1_Optane', 'capacity_MB': 1024 * 16,  'a_ms': 0.0002, 'b_ms_per_lba': 0.00026, 'num_devices': 1, 'migration_bandwidth_MBps': None}, # Optane: a=0.2us, b=0.26us/LBA
+    {'name': 'Tier2_SSD',    'capacity_MB': 1024 * 64, 'a_ms': 0.06,   'b_ms_per_lba': 0.0005,  'num_devices': 1, 'migration_bandwidth_MBps': None,
+     'write_cost_factor': 2.0, 'ssd_model': None}, # SSD: a=60us, b=0.5us/LBA，写慢2倍 (论文6.2节校准)
+    {'name': 'Tier3_HDD',    'capacity_MB': 1024 * 256, 'a_ms': 4.0,    'b_ms_per_lba': 0.002,   'num_devices': 8, 'migration_bandwidth_MBps': None}  # HDD: a=4ms, b=2us/LBA. 论文中HDD是8个并行
 ]
 # sys17 32G 512G * 10
 # LBA总数 (需要根据你的trace或系统设定)
@@ -50,10 +176,48 @@ TIER_CONFIGS = [
 TOTAL_LBAS_MSR= 1024 * 1024 * 512
 TOTAL_LBAS = 1024 * 1024 * 512
 TOTAL_LBAS_SYS17 = 1024 * 1024 * 1024 * 10 # 假设一个比较大的LBA空间，能容纳所有数据块  // MSR 中最大offset 17437548544 + 4096 Bytes
-TOTAL_CHUNKS = TOTAL_LBAS // LBAS_PER_CHUNK
 
 # 追踪文件路径
 TRACE_FILE_PATH = "/home/cyrus/PycharmProjects/MLDS/simulation/traces/msr/proj_4.csv" # 您需要准备一个追踪文件
+# 多卷回放：列出多个按卷划分的trace文件 (如 proj_0..proj_4)，RequestGenerator 会按时间流式归并
+TRACE_FILE_PATHS = [TRACE_FILE_PATH]
+
+
+def trace_profile_path(trace_file_path, trace_format=TRACE_FORMAT):
+    """traces_analysis/calculate_info.py 生成的trace画像文件路径 (默认在trace文件旁边)"""
+    profile_dir = TRACE_CACHE_DIR or os.path.dirname(os.path.abspath(trace_file_path))
+    return os.path.join(profile_dir, f"{os.path.basename(trace_file_path)}.{trace_format.lower()}.profile.json")
+
+
+def _load_profiled_total_lbas(trace_paths):
+    """所有卷的画像中推荐 TOTAL_LBAS 的最大值；任一卷缺少有效画像 (源文件或LBA/chunk大小已变化) 时返回 None"""
+    total_lbas = 0
+    for path in trace_paths:
+        try:
+            with open(trace_profile_path(path)) as f:
+                profile = json.load(f)
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if (profile.get('source_size'), profile.get('source_mtime_ns')) != (st.st_size, st.st_mtime_ns) or \
+           profile.get('lba_size_bytes') != LBA_SIZE_BYTES or profile.get('chunk_size_bytes') != CHUNK_SIZE_BYTES:
+            return None
+        total_lbas = max(total_lbas, profile['recommended_total_lbas'])
+    return total_lbas or None
+
+
+# 存在有效的trace画像时，用画像推荐的地址空间大小代替上面手工设置的 TOTAL_LBAS
+USE_TRACE_PROFILE = True
+_profiled_total_lbas = _load_profiled_total_lbas(TRACE_FILE_PATHS) if USE_TRACE_PROFILE else None
+if _profiled_total_lbas:
+    TOTAL_LBAS = _profiled_total_lbas
+# 合成负载的地址空间由其 num_chunks 决定
+if TRACE_FORMAT.upper() == "SYNTHETIC":
+    TOTAL_LBAS = TRACE_FORMAT_OPTIONS["SYNTHETIC"]["num_chunks"] * LBAS_PER_CHUNK
+
+# 每个卷独立的LBA命名空间大小，第 i 个卷的LBA偏移 i * VOLUME_LBA_SPAN，从而拥有各自的 chunk-id 范围
+VOLUME_LBA_SPAN = TOTAL_LBAS
+TOTAL_CHUNKS = len(TRACE_FILE_PATHS) * (VOLUME_LBA_SPAN // LBAS_PER_CHUNK)
 
 
 
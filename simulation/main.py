@@ -1,36 +1,93 @@
 # main.py
+import os
 import simpy
-import statistics
+import time
 import csv
-from config import SIMULATION_TIME, TIER_CONFIGS, TRACE_FILE_PATH, TOTAL_CHUNKS, CHUNK_SIZE_MB, LBAS_PER_CHUNK, CHUNK_SIZE_BYTES, LBA_SIZE_BYTES
+from config import SIMULATION_TIME, TIER_CONFIGS, TRACE_FILE_PATHS, TOTAL_CHUNKS, CHUNK_SIZE_MB, LBAS_PER_CHUNK, CHUNK_SIZE_BYTES, LBA_SIZE_BYTES
+from config import REPLAY_WINDOW_MS, REPLAY_FAST_FORWARD, WINDOW_SIZE, SIMULATION_ENGINE
+from config import WRITE_BUFFER_ENABLED, WRITE_BUFFER_TIER_IDX, WRITE_BUFFER_CAPACITY_MB, WRITE_BUFFER_MAX_WRITE_BYTES
+from config import WRITE_BUFFER_DESTAGE_BATCH_MB, WRITE_BUFFER_HIGH_WATERMARK, WRITE_BUFFER_IDLE_CHECK_MS
+from config import HDD_SEEK_MODEL_ENABLED, HDD_SEEK_MODEL_PARAMS
+from config import TIMESERIES_ENABLED, TIMESERIES_INTERVAL_MS, OUTPUT_DIR
+from components.sim_env import make_environment, event_core_name
+from components.latency_histogram import format_summary
 from components.storage import StorageTier
 from components.orchestrator import Orchestrator
+from components.write_buffer import WriteBackBuffer
 from components.request_generator import RequestGenerator
 from components.migration_controller import MigrationController
+from components.fast_replay import FastReplayEngine
+from components.timeseries import TimeSeriesSampler
 from components.policy import SimpleLFUPolicy # 或后续的AITPolicy
 
-def run_simulation():
+def _tier_ssd_model(tc, override):
+    """只有在 TIER_CONFIGS 中声明了 'ssd_model' 的层级才可能使用多通道 SSD 模型；返回参数字典或 None"""
+    if 'ssd_model' not in tc:
+        return None
+    value = tc['ssd_model'] if override is None else override
+    if value is True:
+        return {}
+    return value or None
+
+def run_simulation(arrival_scheduling=None, coalesce_epsilon_ms=None,
+                   replay_mode=None, replay_speedup=None, queue_depth=None,
+                   priority_scheduling=None, migration_bandwidth_MBps=None, max_parallel_migrations=None,
+                   write_buffer=None, device_selection=None, engine=None, event_core=None,
+                   hdd_seek_model=None, hdd_scheduling=None, ssd_model=None,
+                   timeseries=None):
+    """
+    priority_scheduling 为 None 时使用 DEVICE_PRIORITY_SCHEDULING；
+    migration_bandwidth_MBps 不为 None 时覆盖所有层级在 TIER_CONFIGS 中的迁移限速 (0 表示不限速)；
+    write_buffer 为 None 时使用 WRITE_BUFFER_ENABLED；device_selection 不为 None 时覆盖所有层级的设备选择策略；
+    engine 为 None 时使用 SIMULATION_ENGINE ("simpy" 或 "analytical")；event_core 为 None 时使用 EVENT_CORE ("simpy" 或 "heap")；
+    hdd_seek_model 为 None 时使用 HDD_SEEK_MODEL_ENABLED；hdd_scheduling 为 None 时使用 HDD_QUEUE_SCHEDULING ("fifo" 或 "clook")；
+    ssd_model 不为 None 时覆盖 TIER_CONFIGS 中声明了 'ssd_model' 的层级的取值 (False 关闭，True 或参数字典开启)；
+    timeseries 为 None 时使用 TIMESERIES_ENABLED
+    """
     print("Starting MLDS Simulation Environment...")
-    env = simpy.Environment()
+    env = make_environment(event_core)
 
     # 1. 初始化存储层级
     tiers = []
+    use_seek_model = HDD_SEEK_MODEL_ENABLED if hdd_seek_model is None else hdd_seek_model
     for i, tc in enumerate(TIER_CONFIGS):
         is_hdd = "HDD" in tc['name']
         tier = StorageTier(env, tc['name'],
                            tc['capacity_MB'] * 1024 * 1024,
                            tc['a_ms'], tc['b_ms_per_lba'],
                            num_devices=tc['num_devices'],
-                           is_hdd_tier=is_hdd)
+                           is_hdd_tier=is_hdd,
+                           priority_scheduling=priority_scheduling,
+                           migration_bandwidth_MBps=(tc.get('migration_bandwidth_MBps') if migration_bandwidth_MBps is None
+                                                     else migration_bandwidth_MBps),
+                           migration_burst_bytes=(tc['migration_burst_MB'] * 1024 * 1024
+                                                  if tc.get('migration_burst_MB') else None),
+                           device_selection=device_selection or tc.get('device_selection'),
+                           hdd_seek_model=HDD_SEEK_MODEL_PARAMS if use_seek_model else None,
+                           hdd_scheduling=hdd_scheduling,
+                           write_cost_factor=tc.get('write_cost_factor', 1.0),
+                           ssd_model=_tier_ssd_model(tc, ssd_model))
         tiers.append(tier)
         print(f"Initialized {tier.name} with capacity {tc['capacity_MB']} MB")
 
     # 2. 初始化协调器
     orchestrator = Orchestrator(env, tiers) # rg_ref 稍后设置
+    write_back_buffer = None
+    if (WRITE_BUFFER_ENABLED if write_buffer is None else write_buffer) and WRITE_BUFFER_TIER_IDX < len(tiers) - 1:
+        write_back_buffer = WriteBackBuffer(env, tiers[WRITE_BUFFER_TIER_IDX], tiers[-1],
+                                            WRITE_BUFFER_CAPACITY_MB * 1024 * 1024, WRITE_BUFFER_MAX_WRITE_BYTES,
+                                            WRITE_BUFFER_DESTAGE_BATCH_MB * 1024 * 1024, WRITE_BUFFER_HIGH_WATERMARK,
+                                            WRITE_BUFFER_IDLE_CHECK_MS)
+        orchestrator.set_write_buffer(write_back_buffer, WRITE_BUFFER_TIER_IDX)
+        print(f"Write-back buffer: {write_back_buffer.capacity_bytes // 2**20} MB in {tiers[WRITE_BUFFER_TIER_IDX].name}")
 
     # 3. 初始化请求生成器
     # 确保trace文件存在且格式正确
-    request_generator = RequestGenerator(env, orchestrator, TRACE_FILE_PATH, TOTAL_CHUNKS)
+    request_generator = RequestGenerator(env, orchestrator, TRACE_FILE_PATHS, TOTAL_CHUNKS,
+                                         arrival_scheduling=arrival_scheduling,
+                                         coalesce_epsilon_ms=coalesce_epsilon_ms,
+                                         replay_mode=replay_mode, replay_speedup=replay_speedup,
+                                         queue_depth=queue_depth)
     orchestrator.set_request_generator(request_generator) # 设置回调引用
 
     # 4. 初始化策略模块 (这里用简单的LFU示例)
@@ -45,36 +102,171 @@ def run_simulation():
 
 
     # 5. 初始化迁移控制器
-    migration_controller = MigrationController(env, orchestrator, active_policy, request_generator)
+    migration_controller = MigrationController(env, orchestrator, active_policy, request_generator,
+                                               max_parallel_migrations=max_parallel_migrations)
+
+    # 只回放某个时间窗口时，可以先用被跳过的trace快进策略状态 (不模拟设备IO)
+    if REPLAY_WINDOW_MS is not None:
+        print(f"Replaying trace window [{REPLAY_WINDOW_MS[0]}, {REPLAY_WINDOW_MS[1]}) ms relative to trace start.")
+        replay_window = request_generator.replay_window_abs()
+        if REPLAY_FAST_FORWARD and replay_window is not None:
+            migration_controller.fast_forward(request_generator.iter_skipped_batches(), replay_window[0])
 
     # 运行模拟
     print(f"\nRunning simulation for {SIMULATION_TIME} environment time units...")
-    env.run(until=SIMULATION_TIME * 1.2) # 运行给一点buffer确保所有事件处理完
+    engine = engine or SIMULATION_ENGINE
+    sampler = None
+    if TIMESERIES_ENABLED if timeseries is None else timeseries:
+        if engine == "simpy":
+            sampler = TimeSeriesSampler(env, tiers, request_generator, TIMESERIES_INTERVAL_MS,
+                                        int(SIMULATION_TIME * 1.2 // TIMESERIES_INTERVAL_MS))
+        else:
+            print(f"WARNING: time-series sampling needs the simpy engine; it is disabled for the {engine} engine.")
+    wall_start = time.time()
+    if engine == "analytical":
+        # 整个窗口的请求按设备上的 FIFO 递推批量计算，迁移决策在窗口之间立即生效 (见 components/fast_replay.py)
+        if write_back_buffer is not None:
+            print("WARNING: the analytical engine does not model the write-back buffer; it is ignored.")
+            orchestrator.set_write_buffer(None, None)
+        fast_engine = FastReplayEngine(orchestrator, request_generator, migration_controller)
+        sim_end_ms = fast_engine.run()
+        print(f"Analytical engine replayed {request_generator.requests_generated} requests in {fast_engine.windows_replayed} windows.")
+    elif engine == "simpy":
+        env.run(until=SIMULATION_TIME * 1.2) # 运行给一点buffer确保所有事件处理完
+        sim_end_ms = env.now
+    else:
+        raise ValueError(f"Unknown simulation engine: {engine}")
+    wall_time = time.time() - wall_start
 
     print("\nSimulation finished.")
     print("-------------------- STATISTICS --------------------")
-    if request_generator.latencies:
-        avg_latency = statistics.mean(request_generator.latencies)
-        p95_latency = statistics.quantiles(request_generator.latencies, n=100)[94] # p95
+    latency_recorder = request_generator.latency_recorder
+    overall = latency_recorder.overall.summary()
+    if overall['count']:
         print(f"Total Requests Generated: {request_generator.requests_generated}")
         print(f"Total Requests Completed: {request_generator.completed_requests}")
-        print(f"Average I/O Latency: {avg_latency:.2f} ms")
-        print(f"P95 I/O Latency: {p95_latency:.2f} ms")
+        print(f"Average I/O Latency: {overall['mean']:.2f} ms")
+        print(f"P95 I/O Latency: {overall['p95']:.2f} ms")
+        print(f"Latency percentiles: {format_summary(overall)}")
+        snapshot = latency_recorder.snapshot()
+        for tier_label, summary in snapshot['by_tier'].items():
+            print(f"  [{tier_label}] {format_summary(summary)}")
+        for op, summary in snapshot['by_op'].items():
+            print(f"  [{op}] {format_summary(summary)}")
+        print("  Per decision window (by completion time):")
+        for window_idx, summary in snapshot['by_window'].items():
+            print(f"    window {window_idx:>4} [{window_idx * WINDOW_SIZE / 60000:.0f} min]: {format_summary(summary)}")
     else:
         print("No requests completed to calculate latency.")
 
+    if request_generator.replay_mode == "closed_loop":
+        print(f"Replay mode: closed_loop ({request_generator.queue_depth} outstanding I/Os per volume)")
+    else:
+        print(f"Replay mode: open_loop (speedup x{request_generator.replay_speedup:g})")
+    throughput = request_generator.throughput_stats()
+    if throughput:
+        print(f"Achieved IOPS: {throughput['iops']:.1f}, throughput: {throughput['throughput_MBps']:.2f} MB/s "
+              f"(over {throughput['span_s']:.1f} s of simulated time)")
+
+    events_per_request = env.events_scheduled / max(request_generator.requests_generated, 1)
+    print(f"Arrival scheduling: {request_generator.arrival_scheduling} "
+          f"(epsilon {request_generator.coalesce_epsilon_ms} ms, {request_generator.arrival_wakeups} arrival wakeups)")
+    print(f"Event core: {event_core_name(env)}, events scheduled: {env.events_scheduled} ({events_per_request:.2f} per request), "
+          f"simulation wall time: {wall_time:.2f} s")
+    timeseries_path = None
+    if sampler is not None:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S") + f"_{int(time.time() * 1000) % 1000:03d}"
+        timeseries_path = sampler.save(os.path.join(OUTPUT_DIR, f"timeseries_{stamp}.npz"))
+        print(f"Time series: {sampler.samples} samples every {sampler.interval_ms:g} ms "
+              f"({len(sampler.devices)} devices, {len(tiers)} tiers) saved to {timeseries_path}")
+
+    # 迁移I/O对前台I/O的干扰：前台请求在设备队列中等待期间，设备正在服务迁移I/O的时间
+    devices = [device for tier in tiers for device in tier.devices]
+    fg_served = sum(d.foreground_requests_served for d in devices)
+    fg_wait = sum(d.foreground_wait_time for d in devices)
+    migration_delay = sum(d.foreground_migration_delay for d in devices)
+    priority_mode = "foreground first" if devices and devices[0].priority_scheduling else "FIFO"
+    print(f"Device scheduling: {priority_mode}; migration I/Os served: {sum(d.migration_requests_served for d in devices)} "
+          f"({sum(d.migration_busy_time for d in devices):.2f} ms busy)")
+    migration_delay_per_request = migration_delay / fg_served if fg_served else 0.0
+    if fg_served:
+        print(f"Foreground queueing delay: avg {fg_wait / fg_served:.4f} ms, "
+              f"of which caused by migration I/O: avg {migration_delay_per_request:.4f} ms "
+              f"(total {migration_delay:.2f} ms)")
+    window_stats = migration_controller.executor.window_stats
+    makespans = [w['makespan_ms'] for w in window_stats]
+    if makespans:
+        print(f"Migration makespan per window: mean {sum(makespans) / len(makespans):.2f} ms, max {max(makespans):.2f} ms "
+              f"over {len(makespans)} windows (up to {migration_controller.executor.max_parallel} in parallel, "
+              f"{sum(m > WINDOW_SIZE for m in makespans)} windows longer than WINDOW_SIZE)")
+    write_summary = snapshot['by_op'].get('write') if overall['count'] else None
+    if write_back_buffer is not None:
+        print(f"Write-back buffer: {write_back_buffer.summary()}")
+        if write_summary:
+            print(f"  Write latency with buffer: {format_summary(write_summary)}")
+    if migration_controller.planner is not None:
+        print(f"Migration planner: {migration_controller.planner.summary()}")
+    for tier in tiers:
+        if tier.migration_throttle is not None:
+            print(f"Migration throttle {tier.name}: {tier.migration_throttle.bytes_granted / 2**20:.0f} MB granted, "
+                  f"{tier.migration_throttle.throttled_time:.2f} ms spent waiting for tokens")
+
     for i, tier in enumerate(tiers):
         print(f"\n--- {tier.name} ---")
         print(f"  Used Space: {tier.used_bytes / (1024*1024):.2f} MB / {tier.capacity_bytes / (1024*1024):.2f} MB")
-        print(f"  Number of Chunks: {len(tier.chunks)}")
+        print(f"  Number of Chunks: {tier.num_chunks}")
+        if len(tier.devices) > 1:
+            busy = [device.busy_time for device in tier.devices]
+            mean_busy = sum(busy) / len(busy)
+            print(f"  Device selection: {tier.device_selection}, busy time max/mean: "
+                  f"{max(busy) / mean_busy if mean_busy else 0:.2f}")
+        if tier.write_amplification is not None:
+            wa = tier.write_amplification
+            mean_wa = f"{wa.mean:.2f}" if wa.mean is not None else "-"
+            fill = tier.used_bytes / tier.capacity_bytes if tier.capacity_bytes > 0 else 1.0 # 与 WriteAmplificationModel.current() 一致
+            print(f"  SSD model: {len(tier.devices[0].channels)} channels per device, "
+                  f"stripe {tier.devices[0].stripe_lbas * LBA_SIZE_BYTES // 1024} KB; write amplification "
+                  f"{wa.current():.2f} at {fill * 100:.1f}% full (mean over writes {mean_wa})")
+        positionings = sum(device.positionings for device in tier.devices)
+        if positionings:
+            print(f"  HDD seek model ({tier.hdd_scheduling}): {positionings} accesses, "
+                  f"avg seek {sum(d.seek_time for d in tier.devices) / positionings:.3f} ms, "
+                  f"avg rotation {sum(d.rotation_time for d in tier.devices) / positionings:.3f} ms")
         for j, device in enumerate(tier.devices):
             print(f"  Device {j}:")
             print(f"    Requests Served: {device.requests_served}")
             print(f"    Total Busy Time: {device.busy_time:.2f} ms")
-            if env.now > 0 :
-                utilization = (device.busy_time / env.now) * 100
+            print(f"    Migration Requests Served: {device.migration_requests_served}, "
+                  f"Foreground Delay From Migration: {device.foreground_migration_delay:.2f} ms")
+            if sim_end_ms > 0 :
+                utilization = (device.busy_time / sim_end_ms) * 100
                 print(f"    Utilization: {utilization:.2f}%")
     print("--------------------------------------------------")
+    positionings = sum(d.positionings for d in devices)
+    return {
+        'arrival_scheduling': request_generator.arrival_scheduling,
+        'requests': request_generator.requests_generated,
+        'completed': request_generator.completed_requests,
+        'event_core': event_core_name(env),
+        'events': env.events_scheduled,
+        'events_per_request': events_per_request,
+        'wall_time_s': wall_time,
+        'avg_latency_ms': overall['mean'],
+        'p99_latency_ms': overall['p99'],
+        'iops': throughput['iops'] if throughput else None,
+        'throughput_MBps': throughput['throughput_MBps'] if throughput else None,
+        'migration_delay_ms_per_request': migration_delay_per_request,
+        'migration_makespan_max_ms': max(makespans) if makespans else 0.0,
+        'write_p99_latency_ms': write_summary['p99'] if write_summary else None,
+        'write_p999_latency_ms': write_summary['p99.9'] if write_summary else None,
+        'migration_bytes_saved': migration_controller.planner.bytes_saved if migration_controller.planner else 0,
+        'ssd_mean_write_amplification': next((t.write_amplification.mean for t in tiers
+                                              if t.write_amplification is not None), None),
+        'hdd_avg_positioning_ms': (sum(d.seek_time + d.rotation_time for d in devices) / positionings
+                                   if positionings else None),
+        'timeseries_path': timeseries_path,
+    }
 
 
 if __name__ == "__main__":
@@ -86,8 +278,10 @@ if __name__ == "__main__":
     # ...
     # 确保 traces 文件夹存在
     import os
-    if not os.path.exists(TRACE_FILE_PATH):
-      raise FileNotFoundError(f"错误：追踪文件 '{TRACE_FILE_PATH}' 不存在。程序已终止。")
+    from config import TRACE_FORMAT
+    for trace_path in TRACE_FILE_PATHS:
+        if TRACE_FORMAT.upper() != "SYNTHETIC" and not os.path.exists(trace_path):
+          raise FileNotFoundError(f"错误：追踪文件 '{trace_path}' 不存在。程序已终止。")
 
 
     run_simulation()
\ No newline at end of file
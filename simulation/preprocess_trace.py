@@ -0,0 +1,43 @@
+# preprocess_trace.py
+# 一次性把 TRACE_FILE_PATH 转换为二进制列式缓存，之后 main.py 的运行会自动 mmap 该缓存。
+# 用法: python preprocess_trace.py [trace_file ...] [--force] [--workers N]
+import argparse
+import time
+import os
+from config import TRACE_FILE_PATHS, TRACE_FORMAT, TRACE_FORMAT_OPTIONS, TRACE_BATCH_LINES, TRACE_PREPROCESS_WORKERS
+from components.trace_parser import get_parser
+from components.trace_cache import build_trace_cache, load_valid_cache_header, trace_cache_path
+from components.parallel_preprocess import parallel_build_trace_cache
+
+
+def preprocess(trace_file_path, force=False, num_workers=1):
+    cache_path = trace_cache_path(trace_file_path, TRACE_FORMAT)
+    format_options = TRACE_FORMAT_OPTIONS.get(TRACE_FORMAT, {})
+    if not force and load_valid_cache_header(trace_file_path, TRACE_FORMAT, format_options) is not None:
+        print(f"Cache for '{trace_file_path}' is up to date: {cache_path}")
+        return
+    start = time.time()
+    if num_workers > 1:
+        header = parallel_build_trace_cache(trace_file_path, TRACE_FORMAT, format_options,
+                                            num_workers, TRACE_BATCH_LINES)
+        for ws in header['worker_stats']:
+            print(f"  worker shard {ws['shard']} (pid {ws['pid']}): {ws['lines']} lines, {ws['records']} records "
+                  f"in {ws['elapsed_s']:.2f} s -> {ws['lines_per_s']:.0f} lines/s")
+    else:
+        # 这里必须使用文本解析器，不能让 get_parser 返回 (可能已过期的) 缓存
+        parser = get_parser(TRACE_FORMAT, format_options)
+        header = build_trace_cache(trace_file_path, parser, TRACE_FORMAT, TRACE_BATCH_LINES, format_options)
+    elapsed = time.time() - start
+    print(f"Wrote {header['num_rows']} records to {cache_path} "
+          f"({os.path.getsize(cache_path) / (1024 * 1024):.1f} MB) in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Convert trace files into the binary columnar cache.")
+    arg_parser.add_argument("traces", nargs="*", default=TRACE_FILE_PATHS)
+    arg_parser.add_argument("--force", action="store_true", help="rebuild even if the cache is up to date")
+    arg_parser.add_argument("--workers", type=int, default=TRACE_PREPROCESS_WORKERS,
+                            help="number of worker processes (byte-range parallel parsing)")
+    args = arg_parser.parse_args()
+    for path in args.traces:
+        preprocess(path, force=args.force, num_workers=args.workers)
@@ -0,0 +1,49 @@
+# tests/conftest.py
+# 组件都在导入时用 from config import ... 取配置，所以要在导入 main / components 之前改写 config:
+# 用一个固定随机种子生成的小 MSR trace、临时的日志/输出目录和几分钟的模拟时间。
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+SIM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SIM_DIR)
+
+import config
+
+WORK_DIR = tempfile.mkdtemp(prefix="mlds_tests_")
+TRACE_PATH = os.path.join(WORK_DIR, "trace.csv")
+LONG_HOSTNAME = "storage-node-with-a-hostname-longer-than-32-characters"
+
+
+def write_msr_trace(path, num_requests, seed=1):
+    """Timestamp,Hostname,DiskNumber,Type,Offset,Size,ResponseTime；80% 的访问落在少数热点chunk上，夹带几行无效行"""
+    rng = random.Random(seed)
+    t = 128166372000000000 # Windows filetime，100ns 为单位
+    with open(path, 'w') as f:
+        for i in range(num_requests):
+            t += rng.randint(0, 1000000) # 相邻请求最多隔 100ms
+            op = 'Read' if rng.random() < 0.7 else 'Write'
+            chunk = rng.randint(0, 40) if rng.random() < 0.8 else rng.randint(0, 30000)
+            offset = chunk * config.CHUNK_SIZE_BYTES + rng.randint(0, 2000) * 4096
+            host = LONG_HOSTNAME if i % 7 == 0 else "proj"
+            f.write(f"{t},{host},4,{op},{offset},{rng.choice([4096, 8192, 65536])},{rng.randint(100, 9000)}\n")
+            if i == 500:
+                f.write("garbage,line\n")
+            if i == 600:
+                f.write(f"{t},proj,4,Trim,0,4096,1\n")
+
+
+write_msr_trace(TRACE_PATH, 3000)
+config.TRACE_FORMAT = "MSR"
+config.TRACE_FILE_PATH = TRACE_PATH
+config.TRACE_FILE_PATHS = [TRACE_PATH]
+config.LOGS_DIR = os.path.join(WORK_DIR, "logs")
+config.OUTPUT_DIR = os.path.join(WORK_DIR, "out")
+config.SIMULATION_TIME = 60000 * 3
+config.WINDOW_SIZE = 30000
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
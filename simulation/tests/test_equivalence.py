@@ -0,0 +1,96 @@
+# tests/test_equivalence.py
+# 各种加速路径与参考路径的结果必须一致:
+#   - 向量化的批量解析 vs 逐行解析
+#   - 预处理缓存 vs 文本trace
+#   - 轻量事件内核 (heap) vs SimPy
+#   - coalesced 到达调度 (epsilon = 0) vs per_request
+#   - 解析式快速回放引擎 vs SimPy 引擎 (关闭迁移时；解析式引擎不模拟迁移I/O)
+import shutil
+
+import numpy as np
+import pytest
+
+from conftest import TRACE_PATH, LONG_HOSTNAME
+import main
+from bench_util import quiet_run
+from components import trace_parser
+from components.trace_cache import CachedTraceParser, build_trace_cache
+from components.trace_parser import MSRTraceParser, TraceBatch, TraceParser, get_parser
+
+_COMPARED_KEYS = ('requests', 'completed', 'avg_latency_ms', 'p99_latency_ms',
+                  'migration_delay_ms_per_request', 'migration_makespan_max_ms', 'migration_bytes_saved')
+
+
+def _assert_batches_equal(a, b):
+    assert len(a) == len(b)
+    for column in ('timestamp_ms', 'lba', 'size_bytes', 'is_write', 'disk'):
+        np.testing.assert_array_equal(getattr(a, column), getattr(b, column), err_msg=column)
+    assert (a.hostname is None) == (b.hostname is None)
+    if a.hostname is not None:
+        assert a.hostname.tolist() == b.hostname.tolist()
+
+
+def _read_all(parser, path):
+    return TraceBatch.concat(list(parser.iter_batches(path, 1000)))
+
+
+def _assert_results_equal(a, b, keys=_COMPARED_KEYS):
+    mismatched = {k: (a[k], b[k]) for k in keys if a[k] != b[k]}
+    assert not mismatched
+
+
+class _NoMigrationPolicy:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_migration_decisions(self, *args, **kwargs):
+        return []
+
+
+def test_batch_parsing_matches_line_parsing():
+    with open(TRACE_PATH) as f:
+        lines = f.readlines()
+    parser = MSRTraceParser()
+    batch = parser._parse_data_batch(lines)
+    _assert_batches_equal(batch, TraceParser._parse_data_batch(parser, lines))
+    assert len(batch) == 3000 # 无效行和 Trim 被丢弃
+    assert LONG_HOSTNAME in batch.hostname.tolist() # 长主机名不被截断
+
+
+def test_cache_matches_text(tmp_path, monkeypatch):
+    path = str(tmp_path / "trace.csv")
+    shutil.copy(TRACE_PATH, path)
+    text = _read_all(get_parser("MSR", {}, trace_file_path=path), path)
+    build_trace_cache(path, get_parser("MSR", {}), "MSR", 1000, {})
+    cached_parser = get_parser("MSR", {}, trace_file_path=path)
+    assert isinstance(cached_parser, CachedTraceParser)
+    _assert_batches_equal(_read_all(cached_parser, path), text)
+
+    monkeypatch.setattr(main, "TRACE_FILE_PATHS", [path])
+    from_cache = quiet_run()
+    monkeypatch.setattr(trace_parser, "TRACE_CACHE_ENABLED", False)
+    _assert_results_equal(from_cache, quiet_run())
+
+
+def test_heap_event_core_matches_simpy():
+    simpy_result = quiet_run(event_core="simpy")
+    heap_result = quiet_run(event_core="heap")
+    assert simpy_result['event_core'] != heap_result['event_core']
+    assert simpy_result['migration_makespan_max_ms'] > 0 # 比较覆盖迁移I/O
+    _assert_results_equal(simpy_result, heap_result, _COMPARED_KEYS + ('events',))
+
+
+def test_coalesced_arrivals_match_per_request():
+    per_request = quiet_run(arrival_scheduling="per_request")
+    coalesced = quiet_run(arrival_scheduling="coalesced", coalesce_epsilon_ms=0.0)
+    assert coalesced['arrival_scheduling'] == "coalesced"
+    _assert_results_equal(per_request, coalesced)
+
+
+def test_analytical_engine_matches_simpy_without_migrations(monkeypatch):
+    monkeypatch.setattr(main, "SimpleLFUPolicy", _NoMigrationPolicy)
+    simpy_result = quiet_run(engine="simpy", write_buffer=False)
+    analytical = quiet_run(engine="analytical", write_buffer=False)
+    _assert_results_equal(simpy_result, analytical, ('requests', 'completed'))
+    assert analytical['avg_latency_ms'] == pytest.approx(simpy_result['avg_latency_ms'], rel=1e-9)
+    assert analytical['p99_latency_ms'] == pytest.approx(simpy_result['p99_latency_ms'], rel=1e-9)
@@ -1,25 +1,170 @@
-import pandas as pd
+# calculate_info.py
+# 单遍流式的trace画像工具，替代原来用 pandas 把整个CSV读进内存的脚本。
+# 复用 simulation/components 中的批量解析器 (有预处理缓存时直接 mmap)，内存占用与trace长度无关，
+# 只和地址空间的chunk数成正比 (每个chunk一个计数器)。
+#
+# 输出:
+#   - 时间跨度、最大偏移、读写比例、请求大小分布
+#   - 访问过的chunk数 (footprint) 以及 chunk 访问热度分布
+#   - 推荐的 TOTAL_LBAS / TOTAL_CHUNKS，写入 <trace>.<format>.profile.json，
+#     simulation/config.py 会自动读取该文件，不再需要手工修改 TOTAL_LBAS_SYS17 之类的数字。
+#
+# 用法: python calculate_info.py [trace_file ...] [--format MSR|SYSTOR17]
+import argparse
+import json
+import os
+import sys
 
-path = "/home/cyrus/PycharmProjects/MLDS/simulation/traces/msr/proj_4.csv"
+import numpy as np
 
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulation")
+sys.path.insert(0, SIMULATION_DIR)
 
+from config import TRACE_FILE_PATHS, TRACE_FORMAT, TRACE_FORMAT_OPTIONS, TRACE_BATCH_LINES  # noqa: E402
+from config import LBA_SIZE_BYTES, CHUNK_SIZE_BYTES, LBAS_PER_CHUNK, trace_profile_path  # noqa: E402
+from components.trace_parser import get_parser  # noqa: E402
 
-# 定义列名
-column_names = ['Timestamp', 'Hostname', 'DiskNumber', 'Type', 'Offset', 'Size', 'ResponseTime']
 
+class StreamingTraceProfiler:
+    """逐批累积统计量，每批处理完即丢弃原始数据"""
+    SIZE_BUCKETS = 48 # 2^0 .. 2^47 字节
 
-df = pd.read_csv(path, header=None, names=column_names)
+    def __init__(self):
+        self.num_requests = 0
+        self.num_writes = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.min_ts = np.inf
+        self.max_ts = -np.inf
+        self.max_offset_bytes = -1
+        self.max_end_bytes = 0
+        self.size_hist = np.zeros(self.SIZE_BUCKETS, dtype=np.int64)
+        self.chunk_counts = np.zeros(0, dtype=np.int64) # 按需增长
 
-# 计算 Timestamp 的最大值和最小值
-min_timestamp = df['Timestamp'].min()
-max_timestamp = df['Timestamp'].max()
+    def update(self, batch):
+        n = len(batch)
+        if n == 0:
+            return
+        ts = batch.timestamp_ms
+        size = batch.size_bytes
+        offset_bytes = batch.lba * LBA_SIZE_BYTES
+        is_write = batch.is_write
 
-# 计算 Offset 的最大值和最小值
-min_offset = df['Offset'].min()
-max_offset = df['Offset'].max()
+        self.num_requests += n
+        self.num_writes += int(is_write.sum())
+        self.write_bytes += int(size[is_write].sum())
+        self.read_bytes += int(size[~is_write].sum())
+        if self.first_ts is None:
+            self.first_ts = float(ts[0])
+        self.last_ts = float(ts[-1])
+        self.min_ts = min(self.min_ts, float(ts.min()))
+        self.max_ts = max(self.max_ts, float(ts.max()))
+        self.max_offset_bytes = max(self.max_offset_bytes, int(offset_bytes.max()))
+        self.max_end_bytes = max(self.max_end_bytes, int((offset_bytes + size).max()))
 
-# 打印结果
-print(f"Timestamp 最小值: {min_timestamp}")
-print(f"Timestamp 最大值: {max_timestamp}")
-print(f"Offset 最小值: {min_offset}")
-print(f"Offset 最大值: {max_offset}")
\ No newline at end of file
+        size_buckets = np.minimum(np.log2(np.maximum(size, 1)).astype(np.int64), self.SIZE_BUCKETS - 1)
+        self.size_hist += np.bincount(size_buckets, minlength=self.SIZE_BUCKETS)
+
+        chunk_ids = batch.lba // LBAS_PER_CHUNK
+        counts = np.bincount(chunk_ids)
+        if len(counts) > len(self.chunk_counts):
+            grown = np.zeros(max(len(counts), 2 * len(self.chunk_counts)), dtype=np.int64)
+            grown[:len(self.chunk_counts)] = self.chunk_counts
+            self.chunk_counts = grown
+        self.chunk_counts[:len(counts)] += counts
+
+    def heat_summary(self):
+        """chunk访问热度：最热的 x% chunk 覆盖了多少访问，覆盖 y% 访问需要多少个chunk"""
+        accessed = np.sort(self.chunk_counts[self.chunk_counts > 0])[::-1]
+        if len(accessed) == 0:
+            return {}
+        cum_share = np.cumsum(accessed) / accessed.sum()
+        top_share = {}
+        for pct in (1, 5, 10, 20, 50):
+            k = max(1, int(np.ceil(len(accessed) * pct / 100)))
+            top_share[f"top_{pct}pct_chunks"] = round(float(cum_share[k - 1]), 4)
+        chunks_for_share = {}
+        for pct in (50, 80, 90, 99):
+            chunks_for_share[f"chunks_for_{pct}pct_accesses"] = int(np.searchsorted(cum_share, pct / 100) + 1)
+        count_hist = np.bincount(np.log2(accessed).astype(np.int64))
+        return {
+            'max_accesses_per_chunk': int(accessed[0]),
+            'median_accesses_per_chunk': float(np.median(accessed)),
+            'access_share_of_hottest': top_share,
+            'hottest_chunks_needed': chunks_for_share,
+            # 第 i 项: 访问次数在 [2^i, 2^(i+1)) 内的chunk数
+            'chunk_access_count_log2_hist': count_hist.tolist(),
+        }
+
+    def report(self):
+        total_chunks = int(np.ceil(self.max_end_bytes / CHUNK_SIZE_BYTES)) if self.max_end_bytes else 0
+        return {
+            'num_requests': self.num_requests,
+            'first_timestamp_ms': self.first_ts,
+            'last_timestamp_ms': self.last_ts,
+            'min_timestamp_ms': None if self.num_requests == 0 else self.min_ts,
+            'max_timestamp_ms': None if self.num_requests == 0 else self.max_ts,
+            'time_span_ms': None if self.num_requests == 0 else self.max_ts - self.min_ts,
+            'max_offset_bytes': self.max_offset_bytes,
+            'max_end_bytes': self.max_end_bytes,
+            'read_requests': self.num_requests - self.num_writes,
+            'write_requests': self.num_writes,
+            'write_ratio': round(self.num_writes / self.num_requests, 4) if self.num_requests else None,
+            'read_bytes': self.read_bytes,
+            'write_bytes': self.write_bytes,
+            # 第 i 项: 请求大小在 [2^i, 2^(i+1)) 字节内的请求数
+            'size_log2_hist': np.trim_zeros(self.size_hist, 'b').tolist(),
+            'unique_chunks': int(np.count_nonzero(self.chunk_counts)),
+            'footprint_bytes': int(np.count_nonzero(self.chunk_counts)) * CHUNK_SIZE_BYTES,
+            'chunk_heat': self.heat_summary(),
+            # 供 simulation/config.py 使用：覆盖最大访问地址、按chunk对齐的地址空间
+            'recommended_total_chunks': total_chunks,
+            'recommended_total_lbas': total_chunks * LBAS_PER_CHUNK,
+            'lba_size_bytes': LBA_SIZE_BYTES,
+            'chunk_size_bytes': CHUNK_SIZE_BYTES,
+        }
+
+
+def profile_trace(trace_file_path, trace_format):
+    parser = get_parser(trace_format, TRACE_FORMAT_OPTIONS.get(trace_format, {}), trace_file_path=trace_file_path)
+    profiler = StreamingTraceProfiler()
+    for batch in parser.iter_batches(trace_file_path, TRACE_BATCH_LINES):
+        profiler.update(batch)
+    result = profiler.report()
+    st = os.stat(trace_file_path)
+    result['trace_file_path'] = os.path.abspath(trace_file_path)
+    result['trace_format'] = trace_format.upper()
+    result['source_size'] = st.st_size # config.py 据此判断画像是否过期
+    result['source_mtime_ns'] = st.st_mtime_ns
+    return result
+
+
+def print_report(r):
+    print(f"Trace: {r['trace_file_path']} ({r['trace_format']})")
+    print(f"  Requests: {r['num_requests']}  (reads {r['read_requests']}, writes {r['write_requests']}, write ratio {r['write_ratio']})")
+    print(f"  Bytes: read {r['read_bytes'] / 2**20:.1f} MB, write {r['write_bytes'] / 2**20:.1f} MB")
+    if r['num_requests']:
+        print(f"  Timestamp (ms): min {r['min_timestamp_ms']:.3f}, max {r['max_timestamp_ms']:.3f}, "
+              f"span {r['time_span_ms'] / 60000:.2f} min")
+    print(f"  Offset: max {r['max_offset_bytes']} B, max end {r['max_end_bytes']} B")
+    print(f"  Request size log2 histogram: {r['size_log2_hist']}")
+    print(f"  Unique chunks: {r['unique_chunks']} ({r['footprint_bytes'] / 2**30:.2f} GB footprint)")
+    for k, v in r['chunk_heat'].items():
+        print(f"  {k}: {v}")
+    print(f"  Recommended TOTAL_CHUNKS = {r['recommended_total_chunks']}, TOTAL_LBAS = {r['recommended_total_lbas']}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Single-pass, constant-memory trace profiler.")
+    arg_parser.add_argument("traces", nargs="*", default=TRACE_FILE_PATHS)
+    arg_parser.add_argument("--format", default=TRACE_FORMAT)
+    args = arg_parser.parse_args()
+    for path in args.traces:
+        result = profile_trace(path, args.format)
+        print_report(result)
+        out_path = trace_profile_path(path, args.format)
+        with open(out_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"  Profile written to {out_path}")
@@ -0,0 +1,192 @@
+# reuse_distance.py
+# chunk 粒度 (CHUNK_SIZE_BYTES) 的重用距离 (LRU 栈距离) 分析，用于选择 TIER_CONFIGS 的容量，
+# 而不必跑几十次完整模拟。
+#
+# 算法: 每个chunk只在它"最近一次访问的位置"上记一个 1，存在树状数组 (Fenwick tree) 中。
+# 一次访问的重用距离 = 上次访问位置与当前位置之间 1 的个数 (即期间访问过的不同chunk数)，每次访问 O(log n)。
+# 位置数组用满时把所有存活位置按顺序重新编号 (压缩)，因此内存只与访问过的chunk数成正比。
+#
+# 对容量为 C 个chunk的 LRU 缓存，访问命中当且仅当重用距离 < C，所以一次扫描得到的距离直方图
+# 就给出了所有容量下的命中率曲线；对两级 (互斥) 的 Tier1/Tier2:
+#   Tier1 命中率 = P(d < C1),  Tier2 命中率 = P(C1 <= d < C1 + C2)
+#
+# 输出 <trace>.<format>.reuse.npz:
+#   capacities         容量 0..max_capacity (chunk 数)
+#   hit_ratio          整体命中率曲线 hit_ratio[C]
+#   distance_hist      距离直方图 (最后一格为 >= max_capacity 的距离)
+#   window_*           每个决策窗口 (WINDOW_SIZE) 的距离直方图、冷失效数、访问数，以及工作集大小 (窗口内不同chunk数)
+#
+# 用法: python reuse_distance.py [trace_file] [--format MSR] [--max-capacity-chunks N] [--window-ms W]
+import argparse
+import os
+import sys
+
+import numpy as np
+
+SIMULATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulation")
+sys.path.insert(0, SIMULATION_DIR)
+
+from config import TRACE_FILE_PATHS, TRACE_FORMAT, TRACE_FORMAT_OPTIONS, TRACE_BATCH_LINES  # noqa: E402
+from config import LBAS_PER_CHUNK, CHUNK_SIZE_BYTES, WINDOW_SIZE, TIER_CONFIGS, TRACE_CACHE_DIR  # noqa: E402
+from components.trace_parser import get_parser  # noqa: E402
+
+
+class ReuseDistanceTracker:
+    """基于树状数组的在线栈距离计算，位置空间满时压缩重编号"""
+    def __init__(self, initial_capacity=1 << 20):
+        self.capacity = initial_capacity
+        self.tree = [0] * (self.capacity + 1) # 1-indexed
+        self.last_pos = {} # chunk_id -> 最近一次访问的位置 (1-indexed)
+        self.next_pos = 1
+
+    def _add(self, i, delta):
+        tree, n = self.tree, self.capacity
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i):
+        tree = self.tree
+        s = 0
+        while i > 0:
+            s += tree[i]
+            i -= i & -i
+        return s
+
+    def _compact(self):
+        """把存活位置按原顺序重新编号为 1..k，并按需扩容"""
+        live = sorted(self.last_pos.items(), key=lambda item: item[1])
+        k = len(live)
+        self.capacity = max(self.capacity, 2 * k)
+        self.last_pos = {chunk_id: i + 1 for i, (chunk_id, _) in enumerate(live)}
+        # 前 k 个位置全为 1 的树状数组: tree[i] = |(i - lowbit(i), i] ∩ [1, k]|
+        idx = np.arange(self.capacity + 1, dtype=np.int64)
+        low = idx - (idx & -idx)
+        tree = np.clip(np.minimum(idx, k) - low, 0, None)
+        tree[0] = 0
+        self.tree = tree.tolist()
+        self.next_pos = k + 1
+
+    def access(self, chunk_id):
+        """记录一次访问，返回重用距离；首次访问 (冷失效) 返回 -1"""
+        if self.next_pos > self.capacity:
+            self._compact()
+        pos = self.next_pos
+        self.next_pos += 1
+        last = self.last_pos.get(chunk_id)
+        if last is None:
+            distance = -1
+        else:
+            distance = self._prefix(pos - 1) - self._prefix(last)
+            self._add(last, -1)
+        self._add(pos, 1)
+        self.last_pos[chunk_id] = pos
+        return distance
+
+
+def analyze(trace_file_path, trace_format, max_capacity_chunks, window_ms):
+    parser = get_parser(trace_format, TRACE_FORMAT_OPTIONS.get(trace_format, {}), trace_file_path=trace_file_path)
+    tracker = ReuseDistanceTracker()
+    num_bins = max_capacity_chunks + 1 # 最后一格: 距离 >= max_capacity_chunks
+    overflow_bin = max_capacity_chunks
+
+    window_hists, window_cold, window_accesses, window_wss, window_starts = [], [], [], [], []
+    hist = None
+    last_window_of_chunk = {}
+    current_window = None
+    trace_start = None
+
+    for batch in parser.iter_batches(trace_file_path, TRACE_BATCH_LINES):
+        if trace_start is None:
+            trace_start = float(batch.timestamp_ms[0])
+        window_ids = np.floor((batch.timestamp_ms - trace_start) / window_ms).astype(np.int64).tolist()
+        chunk_ids = (batch.lba // LBAS_PER_CHUNK).tolist()
+        for window_id, chunk_id in zip(window_ids, chunk_ids):
+            if window_id != current_window:
+                current_window = window_id
+                hist = np.zeros(num_bins, dtype=np.int64)
+                window_hists.append(hist)
+                window_cold.append(0)
+                window_accesses.append(0)
+                window_wss.append(0)
+                window_starts.append(window_id * window_ms)
+            distance = tracker.access(chunk_id)
+            if distance < 0:
+                window_cold[-1] += 1
+            else:
+                hist[min(distance, overflow_bin)] += 1
+            window_accesses[-1] += 1
+            if last_window_of_chunk.get(chunk_id) != window_id:
+                last_window_of_chunk[chunk_id] = window_id
+                window_wss[-1] += 1
+
+    window_hists = np.array(window_hists, dtype=np.int64).reshape(-1, num_bins)
+    distance_hist = window_hists.sum(axis=0)
+    total_accesses = int(np.sum(window_accesses))
+    hit_ratio = np.concatenate([[0], np.cumsum(distance_hist[:max_capacity_chunks])]) / max(total_accesses, 1)
+    return {
+        'capacities': np.arange(max_capacity_chunks + 1),
+        'hit_ratio': hit_ratio,
+        'distance_hist': distance_hist,
+        'cold_misses': int(np.sum(window_cold)),
+        'total_accesses': total_accesses,
+        'unique_chunks': len(tracker.last_pos),
+        'window_ms': window_ms,
+        'window_starts_ms': np.array(window_starts, dtype=np.float64),
+        'window_hists': window_hists,
+        'window_cold_misses': np.array(window_cold, dtype=np.int64),
+        'window_accesses': np.array(window_accesses, dtype=np.int64),
+        'window_working_set_chunks': np.array(window_wss, dtype=np.int64),
+    }
+
+
+def tier_hit_ratios(result, tier1_chunks, tier2_chunks, window_idx=None):
+    """两级互斥LRU层的命中率 (tier1, tier2, backing)，window_idx 为 None 时为整体"""
+    if window_idx is None:
+        hist, total = result['distance_hist'], result['total_accesses']
+    else:
+        hist, total = result['window_hists'][window_idx], result['window_accesses'][window_idx]
+    if total == 0:
+        return 0.0, 0.0, 0.0
+    cum = np.concatenate([[0], np.cumsum(hist)])
+    max_cap = len(hist) - 1
+    c1 = min(tier1_chunks, max_cap)
+    c12 = min(tier1_chunks + tier2_chunks, max_cap)
+    t1 = cum[c1] / total
+    t2 = (cum[c12] - cum[c1]) / total
+    return t1, t2, 1.0 - t1 - t2
+
+
+def reuse_output_path(trace_file_path, trace_format):
+    out_dir = TRACE_CACHE_DIR or os.path.dirname(os.path.abspath(trace_file_path))
+    return os.path.join(out_dir, f"{os.path.basename(trace_file_path)}.{trace_format.lower()}.reuse.npz")
+
+
+if __name__ == "__main__":
+    tier_chunks = [tc['capacity_MB'] * 1024 * 1024 // CHUNK_SIZE_BYTES for tc in TIER_CONFIGS]
+    arg_parser = argparse.ArgumentParser(description="Chunk-level reuse distance and hit-ratio curve analysis.")
+    arg_parser.add_argument("trace", nargs="?", default=TRACE_FILE_PATHS[0])
+    arg_parser.add_argument("--format", default=TRACE_FORMAT)
+    arg_parser.add_argument("--max-capacity-chunks", type=int, default=sum(tier_chunks[:-1]),
+                            help="largest Tier1+Tier2 capacity (in chunks) covered exactly by the curves")
+    arg_parser.add_argument("--window-ms", type=float, default=WINDOW_SIZE)
+    args = arg_parser.parse_args()
+
+    result = analyze(args.trace, args.format, args.max_capacity_chunks, args.window_ms)
+    out_path = reuse_output_path(args.trace, args.format)
+    np.savez_compressed(out_path, **result)
+
+    print(f"Trace: {args.trace} ({args.format})")
+    print(f"  Accesses: {result['total_accesses']}, unique chunks: {result['unique_chunks']}, "
+          f"cold misses: {result['cold_misses']}, windows: {len(result['window_accesses'])}")
+    print(f"  Working set per window (chunks): max {result['window_working_set_chunks'].max(initial=0)}, "
+          f"mean {result['window_working_set_chunks'].mean() if len(result['window_accesses']) else 0:.1f}")
+    print("  LRU hit ratio by capacity:")
+    for frac in (0.01, 0.05, 0.1, 0.25, 0.5, 1.0):
+        cap = int(args.max_capacity_chunks * frac)
+        print(f"    {cap:>8} chunks ({cap * CHUNK_SIZE_BYTES / 2**30:8.2f} GB): {result['hit_ratio'][cap]:.4f}")
+    if len(tier_chunks) >= 3:
+        t1, t2, backing = tier_hit_ratios(result, tier_chunks[0], tier_chunks[1])
+        print(f"  Configured tiers ({tier_chunks[0]} + {tier_chunks[1]} chunks): "
+              f"Tier1 {t1:.4f}, Tier2 {t2:.4f}, backing {backing:.4f}")
+    print(f"  Curves written to {out_path}")